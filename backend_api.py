@@ -0,0 +1,343 @@
+"""Spotify control through the Spotify Web API (Method A, spotipy)"""
+import os
+
+import spotipy
+from spotipy.oauth2 import SpotifyOAuth
+from spotipy.cache_handler import CacheFileHandler
+
+from backends import CommandFailed, SpotifyBackend
+from devices import DeviceRegistry
+from logs import get_logger
+from metadata import ContextMetadataCache
+from metrics import NULL_METRICS
+from now_playing import AlbumArtCache, NowPlaying
+from playback_state import PlaybackStateCache
+from rate_limit import RateLimiter, RateLimited, is_rate_limited, retry_after
+from spotify_client import InstrumentedSpotify, CachedTokenHandler, TokenRefresher
+
+
+log = get_logger("monitor")
+
+
+class ApiBackend(SpotifyBackend):
+    """Plays, pauses and skips on the user's preferred Spotify device through the Web API"""
+
+    name = "api"
+    supports_contexts = True
+
+    def __init__(self, config, metrics=NULL_METRICS, stations=None, client_id=None, client_secret=None,
+                 redirect_uri="http://localhost:8888/callback"):
+        super().__init__(config, metrics=metrics, stations=stations)
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.redirect_uri = redirect_uri
+        self.spotify = None
+        self.devices = None  # TTL-cached device list and preferred device
+        self.playback_state = None  # Locally tracked is_playing, saves a current_playback() per transition
+        self.token_refresher = None  # Renews the OAuth token and keeps the API connection warm
+        self.context_metadata = None  # Disk-cached names of the station contexts, for log lines
+        self.spotify_context = None  # Context URI of the last start_playback(context_uri=...)
+        self.album_art = None  # LRU disk cache of album art, shared with now_playing
+
+        # Client-side token bucket shared by the dispatcher and the playback sync
+        self.limiter = RateLimiter.from_config(config, metrics=metrics)
+
+    def connect(self):
+        """Initialize Spotify connection using Spotify API (Method A)"""
+        client_id, client_secret, redirect_uri = self.client_id, self.client_secret, self.redirect_uri
+        # Try to get credentials from environment variables if not provided
+        if not client_id:
+            client_id = os.getenv('SPOTIPY_CLIENT_ID')
+        if not client_secret:
+            client_secret = os.getenv('SPOTIPY_CLIENT_SECRET')
+        if not redirect_uri:
+            redirect_uri = os.getenv('SPOTIPY_REDIRECT_URI', 'http://localhost:8888/callback')
+
+        if not client_id or not client_secret:
+            log.warning("⚠ Spotify credentials not found\n"
+                        "  → Set SPOTIPY_CLIENT_ID and SPOTIPY_CLIENT_SECRET environment variables\n"
+                        "  → Spotify integration will be disabled")
+            return
+
+        try:
+            scope = "user-read-playback-state user-modify-playback-state"
+            # (connect, read) seconds; a hung request must not stall the dispatcher for long
+            timeout = (self.config.getfloat("spotify_api", "connect_timeout", fallback=2.0),
+                       self.config.getfloat("spotify_api", "read_timeout", fallback=5.0))
+            auth_manager = SpotifyOAuth(
+                client_id=client_id,
+                client_secret=client_secret,
+                redirect_uri=redirect_uri,
+                scope=scope,
+                cache_handler=CachedTokenHandler(CacheFileHandler(".spotify_cache")),
+                requests_timeout=timeout
+            )
+
+            client = InstrumentedSpotify(auth_manager=auth_manager, metrics=self.metrics, requests_timeout=timeout,
+                                         pool_maxsize=self.config.getint("spotify_api", "pool_maxsize", fallback=4))
+            self.token_refresher = TokenRefresher(
+                client,
+                margin=self.config.getfloat("spotify_api", "token_refresh_margin", fallback=300.0),
+                keepalive_interval=self.config.getfloat("spotify_api", "keepalive_interval", fallback=30.0),
+                metrics=self.metrics,
+            )
+            self.use_client(client)
+        except Exception as e:
+            log.warning(f"⚠ Failed to initialize Spotify: {e}\n"
+                        "  → Spotify integration will be disabled\n"
+                        "  → Check your credentials and internet connection")
+
+    def use_client(self, client):
+        """Adopt a spotipy client: set up the playback state cache and pick a device"""
+        self.spotify = client
+        self.playback_state = PlaybackStateCache(
+            self.spotify.current_playback,
+            limiter=self.limiter,
+            max_staleness=self.config.getfloat("spotify_api", "playback_max_staleness", fallback=10.0),
+            sync_interval=self.config.getfloat("spotify_api", "playback_sync_interval", fallback=8.0),
+        )
+
+        self.devices = DeviceRegistry.from_config(self.spotify.devices, self.config, limiter=self.limiter)
+        # Loaded from disk now, revalidated in the background once started
+        self.context_metadata = ContextMetadataCache.from_config(self.spotify, self.config,
+                                                                 limiter=self.limiter)
+        # Track info and album art for the current and next tracks, fetched ahead of skips
+        if self.config.getboolean("now_playing", "enabled", fallback=True):
+            self.album_art = AlbumArtCache.from_config(self.config, metrics=self.metrics)
+            self.now_playing = NowPlaying.from_config(self.spotify, self.config, art=self.album_art,
+                                                      limiter=self.limiter, listener=self._on_track,
+                                                      metrics=self.metrics)
+
+        self.enabled = True
+
+        # Pick a device now; the registry refreshes the list in the background from here on
+        try:
+            device = self.devices.resolve()
+        except Exception as e:
+            # Same as no device yet: the background refresh or the first command reads the list again
+            log.warning(f"⚠ Failed to read Spotify devices: {e}\n"
+                        "  → The list is read again in the background and on the next command",
+                        event="spotify_devices_failed")
+            return
+        if device:
+            state = "Active device" if device['is_active'] else "Available device"
+            log.info("✓ Spotify connected successfully\n"
+                     f"  → {state}: {device['name']}" + ("" if device['is_active'] else " (not currently active)"))
+        else:
+            log.warning("⚠ No Spotify devices found\n"
+                        "  → Open Spotify on a device (desktop app, web player, or phone)\n"
+                        "  → Spotify integration will work once a device is available")
+
+    def start(self):
+        """Start the playback sync, token refresher, device refresh and metadata revalidation"""
+        if not self.enabled:
+            return
+
+        # Keep the cached playback state honest when the user plays/pauses outside the game
+        if self.playback_state:
+            self.playback_state.start_sync()
+
+        # Renew the token and keep the connection open so the first play after idle is fast
+        if self.token_refresher:
+            self.token_refresher.start()
+
+        # Re-read the device list in the background so commands don't have to
+        if self.devices:
+            self.devices.start()
+
+        # Revalidate the station playlists' metadata off the command path
+        if self.context_metadata:
+            self.context_metadata.start(self.stations.contexts() if self.stations else [])
+
+        # Follows the playing track while the monitor has Spotify playing
+        if self.now_playing:
+            self.now_playing.start()
+
+    def stop(self):
+        if self.playback_state:
+            self.playback_state.stop_sync()
+        if self.token_refresher:
+            self.token_refresher.stop()
+        if self.devices:
+            self.devices.stop()
+        if self.context_metadata:
+            self.context_metadata.stop()
+        if self.now_playing:
+            self.now_playing.stop()
+
+    def _on_track(self, track, confirmed):
+        if self.track_listener is not None:
+            self.track_listener(track, confirmed)
+
+    def play(self, context=None):
+        """Start Spotify playback using Spotify API (Method A), switching to `context` if given"""
+        self._require_client()
+        try:
+            # Back on the station we started last: resume where it left off instead of restarting it
+            if context == self.spotify_context:
+                context = None
+
+            # Check if already playing (cached; only hits the API when stale)
+            if context is None and self._is_playing():
+                log.info("  ✓ Spotify is already playing - No action needed", event="spotify_play_skipped")
+                if self.now_playing:
+                    self.now_playing.resume()
+                return
+
+            if context:
+                # Metadata comes from the prefetched cache only; never looked up here
+                self._call_on_device(self.spotify.start_playback, context_uri=context)
+                self.spotify_context = context
+                self.playback_state.update(True)
+                if self.now_playing:
+                    self.now_playing.resume()
+                log.info(f"  ✓ Spotify switched to {self.context_metadata.describe(context)}",
+                         event="spotify_play", method="api", context=context)
+                return
+
+            # Start playback on the preferred device (or the active one if none is known)
+            device_id = self._call_on_device(self.spotify.start_playback)
+            if device_id:
+                log.info("  ✓ Spotify playback started successfully", event="spotify_play", method="api")
+            else:
+                log.info("  ✓ Spotify playback started on active device", event="spotify_play", method="api")
+            self.playback_state.update(True)
+            if self.now_playing:
+                self.now_playing.resume()
+        except spotipy.exceptions.SpotifyException as e:
+            if is_rate_limited(e):
+                # The dispatcher keeps the command and retries after Retry-After
+                raise
+            if e.http_status in (404, 409):
+                # Our idea of the player has drifted; ask the API next time
+                self.playback_state.invalidate()
+            if e.http_status == 404:
+                raise CommandFailed("No active Spotify device found\n"
+                                    "  → Please open Spotify on a device (desktop app, web player, or phone)",
+                                    event="spotify_no_device") from e
+            if e.http_status == 403:
+                raise CommandFailed("Spotify playback control denied\n"
+                                    "  → Check your Spotify app permissions",
+                                    event="spotify_forbidden", retry=False) from e
+            raise CommandFailed(f"Failed to start Spotify playback: {e}", event="spotify_play_failed") from e
+        except Exception as e:
+            if is_rate_limited(e):
+                raise
+            raise CommandFailed(f"Unexpected error starting Spotify: {e}", event="spotify_play_failed") from e
+
+    def pause(self):
+        """Stop Spotify playback using Spotify API (Method A)"""
+        self._require_client()
+        try:
+            # Check if already paused (cached; only hits the API when stale)
+            if not self._is_playing():
+                log.info("  ✓ Spotify is already paused - No action needed", event="spotify_pause_skipped")
+                if self.now_playing:
+                    self.now_playing.pause()
+                return
+
+            # Pause playback instead of stopping (preserves position)
+            device_id = self._call_on_device(self.spotify.pause_playback)
+            if device_id:
+                log.info("  ✓ Spotify playback paused successfully", event="spotify_pause", method="api")
+            else:
+                log.info("  ✓ Spotify playback paused on active device", event="spotify_pause", method="api")
+            self.playback_state.update(False)
+            if self.now_playing:
+                self.now_playing.pause()
+        except spotipy.exceptions.SpotifyException as e:
+            if is_rate_limited(e):
+                # The dispatcher keeps the command and retries after Retry-After
+                raise
+            if e.http_status in (404, 409):
+                self.playback_state.invalidate()
+            if e.http_status == 404:
+                raise CommandFailed("No active Spotify device found\n"
+                                    "  → Spotify may have been closed", event="spotify_no_device") from e
+            if e.http_status == 403:
+                raise CommandFailed("Spotify pause control denied\n"
+                                    "  → Check your Spotify app permissions",
+                                    event="spotify_forbidden", retry=False) from e
+            raise CommandFailed(f"Failed to pause Spotify playback: {e}", event="spotify_pause_failed") from e
+        except Exception as e:
+            if is_rate_limited(e):
+                raise
+            raise CommandFailed(f"Unexpected error pausing Spotify: {e}", event="spotify_pause_failed") from e
+
+    def skip(self, count):
+        """Net skip count from the hotkey debouncer (> 0 next, < 0 previous)"""
+        self._navigate("next" if count > 0 else "previous", abs(count))
+
+    def _navigate(self, direction, count=1):
+        """Skip tracks through the API (doesn't require focus)"""
+        self._require_client()
+        label = "⏭ Next track" if direction == "next" else "⏮ Previous track"
+        if count > 1:
+            label += f" x{count}"
+
+        # The API has no multi-skip, one call per track
+        try:
+            for done in range(count):
+                if direction == "next":
+                    self._call_on_device(self.spotify.next_track)
+                elif direction == "previous":
+                    self._call_on_device(self.spotify.previous_track)
+        except Exception as e:
+            if is_rate_limited(e):
+                # Tell the dispatcher how many skips are still owed
+                raise RateLimited(retry_after(e), remaining=count - done,
+                                  local=getattr(e, "local", False)) from e
+            raise CommandFailed(f"Failed to navigate track: {e}", event="spotify_skip_failed") from e
+        log.info(f"  {label}", event="spotify_skip", direction=direction, count=count)
+        # Shows the prefetched next track now; the poller confirms it shortly
+        if self.now_playing:
+            self.now_playing.skipped(count if direction == "next" else -count)
+
+    def _require_client(self):
+        if not (self.enabled and self.spotify):
+            raise CommandFailed("Spotify integration is disabled\n"
+                                "  → Set SPOTIPY_CLIENT_ID and SPOTIPY_CLIENT_SECRET environment variables",
+                                event="spotify_disabled", retry=False)
+
+    def _is_playing(self):
+        """Cached playing state; a stale one is read from the API on a token of its own"""
+        cached = self.playback_state.cached()
+        if cached is not None:
+            return cached
+        self._take_token()
+        return self.playback_state.refresh()
+
+    def _call_on_device(self, command, **kwargs):
+        """Run a player command on the preferred device; returns the device ID used
+
+        A 404 means the device is gone (e.g. Spotify was closed and reopened):
+        the device list is re-read and the command retried once on the new pick.
+        The dispatcher paid for one request; a device list read and the retry
+        take their own tokens, and raise RateLimited(local=True) if none is free.
+        """
+        if not self.devices.is_fresh():
+            self._take_token()
+        device_id = self.devices.device_id()
+        try:
+            command(device_id=device_id, **kwargs)
+            return device_id
+        except spotipy.exceptions.SpotifyException as e:
+            if e.http_status != 404:
+                raise
+            self._take_token()
+            device = self.devices.resolve(force=True)
+            if device is None:
+                raise
+            self.metrics.inc("spotify_device_retries_total")
+            log.info(f"  ↻ Retrying on Spotify device: {device['name']}", event="spotify_device_retry",
+                     device=device['name'])
+            self._take_token()
+            command(device_id=device['id'], **kwargs)
+            return device['id']
+
+    def _take_token(self):
+        """Take a bucket token for a request beyond the one the dispatcher took"""
+        if self.limiter is not None:
+            wait = self.limiter.try_acquire()
+            if wait > 0:
+                raise RateLimited(wait, local=True)
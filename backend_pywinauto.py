@@ -0,0 +1,119 @@
+"""Spotify control through window automation (Method B, pywinauto)"""
+from backends import CommandFailed, SpotifyBackend
+from logs import get_logger
+from metrics import NULL_METRICS
+from spotify_window import SpotifyWindowIndex
+
+
+log = get_logger("monitor")
+
+
+class PywinautoBackend(SpotifyBackend):
+    """Sends media keystrokes straight to the Spotify desktop window, without changing focus"""
+
+    name = "pywinauto"
+
+    def __init__(self, config, metrics=NULL_METRICS, stations=None):
+        super().__init__(config, metrics=metrics, stations=stations)
+        self.windows = None  # Cached Spotify window keyed by PID + create-time; asked on every command
+
+    def connect(self):
+        """Initialize Spotify connection using pywinauto (Method B)"""
+        if self.windows is None:
+            self.windows = SpotifyWindowIndex(
+                refresh_interval=self.config.getfloat("pywinauto", "window_refresh_interval", fallback=5.0),
+            )
+        try:
+            self.enabled = self._get_spotify_app() is not None
+            if self.enabled:
+                log.info("✓ Spotify connected successfully (Method B - pywinauto)\n"
+                         "  → Using window automation to control Spotify")
+            else:
+                log.warning("⚠ Spotify not found\n"
+                            "  → Make sure Spotify desktop app is open\n"
+                            "  → Spotify integration will work once Spotify is opened")
+        except Exception as e:
+            log.warning(f"⚠ Failed to initialize Spotify (pywinauto): {e}\n"
+                        "  → Spotify integration will be disabled")
+
+    def _get_spotify_app(self, force=False):
+        """Get Spotify application window using pywinauto (cached; force=True rescans)"""
+        if force:
+            return self.windows.rescan()
+        return self.windows.get()
+
+    def play(self, context=None):
+        """Start Spotify playback using pywinauto (Method B)"""
+        app = self._require_app()
+        try:
+            # Send Space key to play/pause (will play if paused)
+            app.send_keystrokes("{SPACE}")
+            self.metrics.inc("spotify_keystrokes_total")
+        except Exception as e:
+            self._reconnect()
+            raise CommandFailed(f"Failed to start Spotify playback: {e}\n"
+                                "  → Trying to reconnect to Spotify...", event="spotify_play_failed") from e
+        log.info("  ✓ Spotify playback started (Method B)", event="spotify_play", method="pywinauto")
+
+    def pause(self):
+        """Stop Spotify playback using pywinauto (Method B)"""
+        app = self._require_app()
+        try:
+            # Send Space key to pause
+            app.send_keystrokes("{SPACE}")
+            self.metrics.inc("spotify_keystrokes_total")
+        except Exception as e:
+            self._reconnect()
+            raise CommandFailed(f"Failed to stop Spotify playback: {e}\n"
+                                "  → Trying to reconnect to Spotify...", event="spotify_pause_failed") from e
+        log.info("  ✓ Spotify playback stopped (Method B)", event="spotify_pause", method="pywinauto")
+
+    def skip(self, count):
+        """Net skip count from the hotkey debouncer (> 0 next, < 0 previous)"""
+        self._navigate("next" if count > 0 else "previous", abs(count))
+
+    def _navigate(self, direction, count=1):
+        """Navigate to next/previous track - sends keys directly to Spotify window without changing focus"""
+        label = "⏭ Next track" if direction == "next" else "⏮ Previous track"
+        if count > 1:
+            label += f" x{count}"
+
+        # Method B: Use pywinauto send_keystrokes (same as SpotifyGlobal - no focus change needed)
+        app = self._require_app()
+        try:
+            # Ctrl+Right / Ctrl+Left - a whole batch of skips goes out in one send_keystrokes call
+            if direction == "next":
+                app.send_keystrokes("^({RIGHT})" * count)
+                self.metrics.inc("spotify_keystrokes_total")
+            elif direction == "previous":
+                app.send_keystrokes("^({LEFT})" * count)
+                self.metrics.inc("spotify_keystrokes_total")
+        except Exception as e:
+            self._reconnect()
+            raise CommandFailed(f"Failed to navigate track: {e}", event="spotify_skip_failed") from e
+        log.info(f"  {label}", event="spotify_skip", direction=direction, count=count)
+
+    def _require_app(self):
+        """The Spotify window to send keys to; raises CommandFailed if there is none
+
+        Asks the window index every time: one liveness check of the cached
+        process, so a window the background refresher replaced is used at once.
+        """
+        app = self._get_spotify_app()
+        self.enabled = app is not None
+        if app is None:
+            raise CommandFailed("Spotify not found - Make sure Spotify desktop app is open",
+                                event="spotify_unavailable")
+        return app
+
+    def _reconnect(self):
+        self.enabled = self._get_spotify_app(force=True) is not None
+
+    def start(self):
+        """Notice Spotify restarts in the background instead of on the next keypress"""
+        if self.windows is not None:
+            self.windows.start()
+
+    def stop(self):
+        if self.windows is not None:
+            self.windows.stop()
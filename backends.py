@@ -0,0 +1,93 @@
+"""Spotify control backends behind a registry that imports only the one in use
+
+Method A (Spotify Web API, spotipy) and Method B (window automation,
+pywinauto) live in their own modules; load_backend() imports the selected one
+on first use, so the other backend's dependencies never load.
+"""
+import importlib
+
+from metrics import NULL_METRICS
+
+
+# Backend name -> "module:Class"
+BACKENDS = {
+    "api": "backend_api:ApiBackend",
+    "pywinauto": "backend_pywinauto:PywinautoBackend",
+}
+
+_loaded = {}
+
+
+class CommandFailed(Exception):
+    """A backend command did not reach Spotify
+
+    The message is the user-facing warning; the dispatcher logs it once under
+    `event`. retry=False marks failures another attempt can't fix (e.g. missing
+    permissions or credentials).
+    """
+
+    def __init__(self, message, event="command_failed", retry=True):
+        super().__init__(message)
+        self.event = event
+        self.retry = retry
+
+
+def load_backend(name):
+    """Backend class for a name in BACKENDS, importing its module on first use"""
+    backend = _loaded.get(name)
+    if backend is None:
+        try:
+            target = BACKENDS[name]
+        except KeyError:
+            raise ValueError(f"unknown Spotify backend {name!r} (choose from {', '.join(BACKENDS)})") from None
+        module, _, attribute = target.partition(":")
+        backend = _loaded[name] = getattr(importlib.import_module(module), attribute)
+    return backend
+
+
+class SpotifyBackend:
+    """One way of controlling Spotify; also the CommandDispatcher's controller
+
+    Construction is cheap and never talks to Spotify; connect() does that.
+    Every command runs on the dispatcher thread and returns only once Spotify
+    took it (or needed nothing). Failures raise CommandFailed, rate limiting
+    raises for the dispatcher to reschedule; neither is logged here.
+    """
+
+    name = None
+    supports_contexts = False  # Whether play(context) can switch playlists
+
+    def __init__(self, config, metrics=NULL_METRICS, stations=None):
+        self.config = config
+        self.metrics = metrics
+        self.stations = stations
+        self.limiter = None  # Optional RateLimiter shared with the dispatcher
+        self.enabled = False
+        self.now_playing = None  # Optional NowPlaying, for backends that can see the track
+        self.track_listener = None  # track_listener(track, confirmed) when now_playing sees a new track
+
+    def connect(self):
+        """Find or authenticate with Spotify; logs and stays disabled on failure"""
+        raise NotImplementedError
+
+    def start(self):
+        """Start background helpers"""
+
+    def stop(self):
+        """Stop background helpers"""
+
+    def play(self, context=None):
+        raise NotImplementedError
+
+    def pause(self):
+        raise NotImplementedError
+
+    def skip(self, count):
+        """Net skip count from the hotkey debouncer (> 0 next, < 0 previous)"""
+        raise NotImplementedError
+
+    def next_track(self):
+        self.skip(1)
+
+    def previous_track(self):
+        self.skip(-1)
@@ -0,0 +1,97 @@
+"""Benchmark for GTA SA attach / re-attach behaviour
+
+Runs GTARadioMonitor.monitor_loop against the fake memory backend and reports:
+  - time to detect the game after it launches (attach backoff)
+  - time to recover from transient read errors (handle reuse, no re-attach)
+  - time to re-attach after the game restarts
+
+Run from the repository root:
+    python -m bench.bench_attach
+"""
+import argparse
+import sys
+import time
+from threading import Thread
+
+import logs
+from main import GTARadioMonitor
+from memory_source import FakeMemorySource
+from bench.bench_dispatcher import CountingController
+
+
+class CountingFakeMemory(FakeMemorySource):
+    """Fake game memory that counts attach attempts"""
+
+    def __init__(self, fields):
+        super().__init__(fields, running=False)
+        self.attach_attempts = 0
+
+    def attach(self):
+        self.attach_attempts += 1
+        return super().attach()
+
+
+def wait_for_snapshot(monitor, after, timeout=30):
+    """Monotonic time of the first snapshot read after `after`"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        snapshot = monitor.snapshot
+        if snapshot is not None and snapshot.timestamp > after:
+            return snapshot.timestamp
+        time.sleep(0.001)
+    raise TimeoutError("monitor never read a new snapshot")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--waits", type=float, nargs="+", default=[0.5, 2.0, 6.0],
+                        help="seconds the game stays closed before launching")
+    args = parser.parse_args()
+    logs.configure(console=False)  # Keep monitor chatter out of the report
+
+    memory = CountingFakeMemory([])
+    monitor = GTARadioMonitor(use_pywinauto=True, memory_source=memory)
+    memory.set_fields(monitor.watched_fields())
+    monitor.dispatcher.controller = CountingController()
+    monitor.running.set()
+    thread = Thread(target=monitor.monitor_loop, daemon=True)
+    thread.start()
+
+    detect = []
+    for wait in args.waits:
+        memory.running = False
+        memory.detach()
+        time.sleep(wait)
+        launched = time.monotonic()
+        memory.running = True
+        detect.append((wait, wait_for_snapshot(monitor, launched) - launched))
+
+    time.sleep(0.2)
+    attaches = memory.attach_attempts
+    faulted = time.monotonic()
+    memory.fail_reads = 2
+    recover = wait_for_snapshot(monitor, faulted) - faulted
+    reattached = memory.attach_attempts - attaches
+
+    restarted = time.monotonic()
+    memory.running = False
+    time.sleep(0.2)
+    memory.running = True
+    reattach = wait_for_snapshot(monitor, restarted + 0.2) - restarted - 0.2
+
+    monitor.stop()
+    thread.join(timeout=2)
+
+    print(f"Policy: {monitor.scheduler.policy}")
+    for wait, seconds in detect:
+        print(f"  detect after game launch (closed {wait:4.1f} s): {seconds * 1000:8.1f} ms")
+    print(f"  recover from 2 transient read errors:      {recover * 1000:8.1f} ms "
+          f"({reattached} re-attach attempts)")
+    print(f"  re-attach after 200 ms game restart:       {reattach * 1000:8.1f} ms")
+    ok = reattached == 0 and all(s <= monitor.scheduler.policy.detached_interval + 0.1 for _, s in detect)
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Benchmark for device resolution when Spotify is closed and reopened
+
+Connects the Method A backend to the local fake API with one active device,
+then "closes" Spotify and reopens it as a new, inactive device before the
+player gets back into a User Radio vehicle. Compares what the play costs:
+  - no retry: the cached device ID is used as is and the 404 loses the play
+  - retry: the 404 re-reads the device list and retries once on the new device
+  - background: the registry's refresher already found the new device
+and checks the preference rules pick the configured device type.
+
+Run from the repository root:
+    python -m bench.bench_devices
+"""
+import argparse
+import configparser
+import contextlib
+import io
+import sys
+import time
+
+import logs
+from dispatcher import PLAY
+from main import GTARadioMonitor
+from memory_source import FakeMemorySource
+from spotify_client import InstrumentedSpotify
+from bench.fake_spotify_api import FakeSpotifyServer
+
+
+COMMANDS = ("PUT /v1/me/player/play", "PUT /v1/me/player/pause", "POST /v1/me/player/next",
+            "POST /v1/me/player/previous")
+
+
+def device(device_id, name, kind, active=False):
+    return {"id": device_id, "is_active": active, "is_private_session": False, "is_restricted": False,
+            "name": name, "type": kind, "volume_percent": 50, "supports_volume": True}
+
+
+DESKTOP = device("fake-desktop-0001", "Fake Desktop", "Computer", active=True)
+REOPENED = [device("fake-phone-0001", "Fake Phone", "Smartphone"),
+            device("fake-desktop-0002", "Fake Desktop", "Computer")]
+
+
+def make_config(refresh_interval):
+    config = configparser.ConfigParser()
+    config.read_dict({
+        "dispatcher": {"hysteresis": "0"},
+        "spotify_api": {"playback_sync_interval": "0"},
+        "devices": {"ttl": "60", "refresh_interval": str(refresh_interval), "prefer_types": "Computer"},
+    })
+    return config
+
+
+def run(server, mode, settle):
+    server.set_devices([DESKTOP])
+    monitor = GTARadioMonitor(use_pywinauto=False, memory_source=FakeMemorySource([]),
+                              config=make_config(settle / 4 if mode == "background" else 0))
+    client = InstrumentedSpotify(auth="bench-token")
+    client.prefix = server.url + "/v1/"
+    monitor.backend.use_client(client)
+    if mode == "no retry":
+        backend = monitor.backend
+        backend._call_on_device = lambda command: command(device_id=backend.devices.device_id())
+    monitor.backend.devices.start()
+    monitor.dispatcher.start()
+
+    # Spotify closed and reopened while the player was on foot
+    server.set_devices([])
+    server.set_devices(REOPENED)
+    time.sleep(settle)
+
+    server.reset()
+    started = time.perf_counter()
+    monitor.dispatcher.submit(PLAY)
+    monitor.dispatcher.wait_idle(timeout=10)
+    elapsed = time.perf_counter() - started
+    monitor.dispatcher.stop()
+    monitor.backend.devices.stop()
+
+    stats = server.stats()
+    playing = stats["is_playing"]
+    target = next((d for d in REOPENED if d["id"] == monitor.backend.devices.device_id()), None)
+    return {
+        "playing": playing,
+        "commands": len([e for e in stats["log"] if e["endpoint"] in COMMANDS]),
+        "requests": len(stats["log"]),
+        "ms": elapsed * 1000,
+        "device": target["name"] + f" ({target['type']})" if target else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.03, help="fake API latency (s)")
+    parser.add_argument("--settle", type=float, default=0.4, help="seconds between the reopen and the play")
+    args = parser.parse_args()
+    logs.configure(console=False)
+
+    server = FakeSpotifyServer(latency=args.latency).start()
+    try:
+        with contextlib.redirect_stderr(io.StringIO()):
+            results = {mode: run(server, mode, args.settle) for mode in ("no retry", "retry", "background")}
+    finally:
+        server.stop()
+
+    print("Play after Spotify was closed and reopened as a new device")
+    for name, result in results.items():
+        print(f"  {name:10s}: {'playing' if result['playing'] else 'LOST   '}  "
+              f"{result['commands']} commands, {result['requests']} requests, {result['ms']:6.1f} ms  "
+              f"-> {result['device']}")
+    ok = (results["retry"]["playing"] and results["retry"]["commands"] == 2
+          and results["background"]["playing"] and results["background"]["commands"] == 1
+          and results["background"]["device"] == "Fake Desktop (Computer)")
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Benchmark for the Spotify command dispatcher
+
+Uses a fake controller that counts commands (and can simulate a slow API) to
+check that submit() never blocks the poller and that cycling past User Radio
+is coalesced into the minimum number of calls.
+
+Run from the repository root:
+    python -m bench.bench_dispatcher --api-delay 0.3
+"""
+import argparse
+import sys
+import time
+
+from dispatcher import CommandDispatcher, PLAY, PAUSE, NEXT
+
+
+class CountingController:
+    """Fake Spotify controller that records every command it receives"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    def _call(self, name):
+        if self.delay:
+            time.sleep(self.delay)
+        self.calls.append(name)
+
+    def play(self):
+        self._call("play")
+
+    def pause(self):
+        self._call("pause")
+
+    def next_track(self):
+        self._call("next")
+
+    def previous_track(self):
+        self._call("previous")
+
+
+def scenario(name, dispatcher, controller, steps, expected):
+    """Submit (command, delay_after) steps, wait for the worker and compare the calls"""
+    worst_submit = 0.0
+    for command, delay in steps:
+        start = time.perf_counter()
+        dispatcher.submit(command)
+        worst_submit = max(worst_submit, time.perf_counter() - start)
+        time.sleep(delay)
+    dispatcher.wait_idle(timeout=10)
+    calls, controller.calls = controller.calls, []
+    ok = calls == expected
+    print(f"  {name:38s} submitted={len(steps):3d}  issued={len(calls):2d}  "
+          f"worst submit={worst_submit * 1e6:7.1f} µs  {'ok' if ok else f'FAIL {calls}'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--api-delay", type=float, default=0.3, help="simulated API latency (s)")
+    parser.add_argument("--hysteresis", type=float, default=0.2)
+    args = parser.parse_args()
+
+    controller = CountingController(delay=args.api_delay)
+    dispatcher = CommandDispatcher(controller, hysteresis=args.hysteresis)
+    dispatcher.start()
+    fast = args.hysteresis / 4
+
+    print(f"hysteresis={args.hysteresis * 1000:.0f} ms, simulated API latency={args.api_delay * 1000:.0f} ms")
+    results = [
+        scenario("cycle past User Radio 10 times", dispatcher, controller,
+                 [(PLAY, fast), (PAUSE, fast)] * 10, []),
+        scenario("enter User Radio", dispatcher, controller,
+                 [(PLAY, 0)], ["play"]),
+        scenario("duplicate play requests", dispatcher, controller,
+                 [(PLAY, fast)] * 5, []),
+        scenario("leave User Radio", dispatcher, controller,
+                 [(PAUSE, 0)], ["pause"]),
+        scenario("play, then 3 skips while API is slow", dispatcher, controller,
+                 [(PLAY, 0), (NEXT, 0), (NEXT, 0), (NEXT, 0)], ["play", "next", "next", "next"]),
+    ]
+    dispatcher.stop()
+
+    print(f"issued={dispatcher.issued} coalesced play/pause={dispatcher.coalesced}")
+    ok = all(results)
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
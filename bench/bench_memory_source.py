@@ -0,0 +1,56 @@
+"""Benchmark for batched MemorySource snapshots
+
+Compares read_bytes calls per tick and snapshot throughput for the coalesced
+read plan against one read per field, using the in-process fake backend.
+
+Run from the repository root:
+    python -m bench.bench_memory_source --ticks 200000
+"""
+import argparse
+import sys
+import time
+
+from memory_source import WatchedField, FakeMemorySource
+
+
+def gta_fields(extra):
+    """The two fields the monitor watches today plus `extra` hypothetical neighbours"""
+    fields = [
+        WatchedField("radio_station", 0x8CB7A5, "B"),
+        WatchedField("vehicle_status", 0xBA18FC, "i"),
+    ]
+    for i in range(extra):
+        base = 0x8CB7A5 if i % 2 else 0xBA18FC
+        fields.append(WatchedField(f"extra_{i}", base + 8 + 4 * i, "i"))
+    return fields
+
+
+def measure(source, ticks):
+    source.attach()
+    source.read_calls = 0
+    start = time.perf_counter()
+    for _ in range(ticks):
+        source.read_snapshot()
+    elapsed = time.perf_counter() - start
+    return source.read_calls / ticks, ticks / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=200000)
+    parser.add_argument("--extra-fields", type=int, default=8)
+    args = parser.parse_args()
+
+    fields = gta_fields(args.extra_fields)
+    batched = FakeMemorySource(fields)
+    per_field = FakeMemorySource(fields, max_gap=-1)  # Never merge: one read per field
+
+    print(f"{len(fields)} watched fields")
+    for label, source in (("per-field", per_field), ("coalesced", batched)):
+        reads, rate = measure(source, args.ticks)
+        print(f"  {label:10s} {len(source.ranges):3d} ranges  {reads:5.1f} reads/tick  {rate:12,.0f} snapshots/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
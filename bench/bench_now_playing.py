@@ -0,0 +1,202 @@
+"""Benchmark for now-playing track info and the album art cache
+
+Plays through tracks on the local fake API (slow album art downloads, short
+tracks) and measures:
+  - skips: time from the skip to the new track being shown, and whether its
+    album art was already in memory by then (no fetch on the skip path);
+    every guess from the queue must match what Spotify then reports
+  - change-aware polling: current_playback() calls while tracks play out on
+    their own, and how late each change is seen, against fixed-interval
+    polling with the same worst-case lag
+  - the art cache alone: size bound, LRU order across a reload, hot-set hits
+
+Run from the repository root:
+    python -m bench.bench_now_playing --skips 10 --tracks 4
+"""
+import argparse
+import configparser
+import os
+import statistics
+import sys
+import tempfile
+import time
+from threading import Event
+
+import logs
+from main import GTARadioMonitor
+from memory_source import FakeMemorySource
+from dispatcher import PLAY, NEXT
+from now_playing import AlbumArtCache
+from spotify_client import InstrumentedSpotify
+from bench.fake_spotify_api import FakeSpotifyServer
+
+
+def make_monitor(server, art_dir, confirm_delay):
+    config = configparser.ConfigParser()
+    config.read_dict({
+        "dispatcher": {"hysteresis": "0", "skip_window": "0"},
+        "spotify_api": {"playback_sync_interval": "0"},
+        "devices": {"refresh_interval": "0"},
+        "now_playing": {"art_cache": art_dir, "confirm_delay": str(confirm_delay)},
+    })
+    monitor = GTARadioMonitor(use_pywinauto=False, memory_source=FakeMemorySource([]), config=config)
+    client = InstrumentedSpotify(auth="bench-token")
+    client.prefix = server.url + "/v1/"
+    monitor.backend.use_client(client)
+    return monitor
+
+
+class Shown:
+    """Track listener recording when each track was shown and whether its art was ready"""
+
+    def __init__(self, now_playing):
+        self.now_playing = now_playing
+        self.events = []  # (time, track id, confirmed, art in cache)
+        self.changed = Event()
+
+    def __call__(self, track, confirmed):
+        # time.monotonic() is system-wide, comparable with the fake API's request log
+        self.events.append((time.monotonic(), track["id"], confirmed,
+                            self.now_playing.art_path(track) is not None))
+        self.changed.set()
+
+    def wait(self, confirmed=None, timeout=10):
+        """Wait for the next event (optionally a confirmed/unconfirmed one)"""
+        deadline = time.monotonic() + timeout
+        seen = len(self.events)
+        while time.monotonic() < deadline:
+            self.changed.wait(0.01)
+            self.changed.clear()
+            for event in self.events[seen:]:
+                if confirmed is None or event[2] == confirmed:
+                    return event
+        return None
+
+
+def player_requests(server):
+    return sum(1 for e in server.stats()["log"] if e["endpoint"] == "GET /v1/me/player")
+
+
+def art_downloads(server):
+    return sum(1 for e in server.stats()["log"] if e["endpoint"] == "GET /_art")
+
+
+def bench_skips(monitor, server, shown, skips, gap):
+    now_playing = monitor.backend.now_playing
+    latencies, art_ready, matched = [], 0, 0
+    time.sleep(gap)
+    for _ in range(skips):
+        started = time.monotonic()
+        monitor.dispatcher.submit(NEXT)
+        event = shown.wait(confirmed=False)
+        if event is None:
+            continue
+        latencies.append(event[0] - started)
+        art_ready += event[3]
+        monitor.dispatcher.wait_idle(timeout=5)
+        time.sleep(gap)  # Confirm poll, queue read and art prefetch for the next skip
+        if now_playing.current["id"] == event[1] and int(event[1]) == server.stats()["track"]:
+            matched += 1
+    return latencies, art_ready, matched
+
+
+def bench_playthrough(monitor, server, shown, tracks, duration):
+    """Let `tracks` tracks end on their own; returns (player requests, changes seen, lag of each)"""
+    stats = server.stats()
+    # The current track started when the last skip reached the fake API
+    began = [e["t"] for e in stats["log"] if e["endpoint"] == "POST /v1/me/player/next"][-1]
+    first = stats["track"]
+    server.reset()
+    seen = len(shown.events)
+    time.sleep(max(0.0, began + tracks * duration + duration / 2 - time.monotonic()))
+    polls = player_requests(server)
+    changes = [event for event in shown.events[seen:] if event[2]]
+    lags = [event[0] - (began + (int(event[1]) - first) * duration) for event in changes]
+    return polls, len(changes), lags
+
+
+def bench_cache(directory, image_bytes, max_images, hot_items, images):
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url)
+        return bytes(image_bytes)
+
+    cache = AlbumArtCache(directory, max_bytes=max_images * image_bytes, hot_items=hot_items, fetch=fetch)
+    urls = [f"https://art.example/{index}.jpg" for index in range(images)]
+    for url in urls:
+        cache.prefetch(url)
+        time.sleep(0.002)  # Distinct mtimes
+    on_disk = len([name for name in os.listdir(directory) if name.endswith(".img")])
+    kept = [url for url in urls if url in cache]
+    memory = sum(1 for url in urls[-hot_items:] if cache.key(url) in cache._hot and cache.get(url))
+    # Touch the oldest survivor, reload from disk, add one more: the next-oldest goes, not the touched one
+    oldest, runner_up = kept[0], kept[1]
+    cache.get(oldest)
+    reloaded = AlbumArtCache(directory, max_bytes=max_images * image_bytes, hot_items=hot_items, fetch=fetch)
+    reloaded.prefetch("https://art.example/new.jpg")
+    lru_kept = oldest in reloaded and runner_up not in reloaded
+    refetched = reloaded.prefetch(urls[-1])
+    return {"size": reloaded.size, "bound": max_images * image_bytes, "on_disk": on_disk, "kept": len(kept),
+            "memory_hits": memory, "lru_kept": lru_kept, "refetched": refetched, "fetches": len(fetched)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--skips", type=int, default=10)
+    parser.add_argument("--tracks", type=int, default=4, help="tracks to let play out on their own")
+    parser.add_argument("--track-duration", type=int, default=3000, help="ms per track on the fake API")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake API latency, s")
+    parser.add_argument("--art-latency", type=float, default=0.3, help="album art download latency, s")
+    args = parser.parse_args()
+    logs.configure(console=False)
+
+    server = FakeSpotifyServer(latency=args.latency, art_latency=args.art_latency,
+                               track_duration=args.track_duration).start()
+    try:
+        with tempfile.TemporaryDirectory() as art_dir:
+            monitor = make_monitor(server, art_dir, confirm_delay=0.2)
+            now_playing = monitor.backend.now_playing
+            shown = Shown(now_playing)
+            monitor.backend.track_listener = shown
+            monitor.dispatcher.start()
+            now_playing.start()
+            monitor.dispatcher.submit(PLAY)
+            shown.wait(confirmed=True)
+
+            gap = 0.2 + 2 * args.latency + 2 * args.art_latency + 0.3
+            latencies, art_ready, matched = bench_skips(monitor, server, shown, args.skips, gap)
+            downloads = art_downloads(server)
+            polls, changes, lags = bench_playthrough(monitor, server, shown, args.tracks,
+                                                     args.track_duration / 1000)
+            now_playing.stop()
+            monitor.dispatcher.stop()
+        with tempfile.TemporaryDirectory() as directory:
+            cache = bench_cache(directory, image_bytes=40000, max_images=10, hot_items=4, images=25)
+    finally:
+        server.stop()
+
+    worst_lag = max(lags) if lags else 0.0
+    fixed = args.tracks * args.track_duration / 1000 / worst_lag if worst_lag else float("inf")
+    print(f"{args.skips} skips, fake API latency {args.latency * 1000:.0f} ms, "
+          f"album art download {args.art_latency * 1000:.0f} ms")
+    print(f"  skip -> track shown: p50={statistics.median(latencies) * 1000:6.1f} ms  "
+          f"max={max(latencies) * 1000:6.1f} ms  (one next_track call)")
+    print(f"  album art already cached when shown: {art_ready}/{len(latencies)}   "
+          f"shown track confirmed by Spotify: {matched}/{len(latencies)}   art downloads: {downloads}")
+    print(f"  {args.tracks} tracks of {args.track_duration / 1000:g} s played out: {polls} current_playback() calls, "
+          f"{changes} changes seen, lag p50={statistics.median(lags) * 1000 if lags else 0:.0f} ms "
+          f"max={worst_lag * 1000:.0f} ms")
+    print(f"    fixed-interval polling with the same worst-case lag: ~{fixed:.0f} calls")
+    print(f"  art cache: {cache['kept']}/25 kept, {cache['on_disk']} files, {cache['size']} <= {cache['bound']} bytes, "
+          f"hot-set hits {cache['memory_hits']}/4, LRU order kept across reload: {cache['lru_kept']}, "
+          f"{cache['fetches']} fetches")
+    ok = (len(latencies) == args.skips and art_ready == args.skips and matched == args.skips
+          and changes >= args.tracks and polls < fixed and cache["size"] <= cache["bound"]
+          and cache["kept"] == 10 and cache["memory_hits"] == 4 and cache["lru_kept"] and not cache["refetched"])
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Benchmark for the adaptive polling scheduler
+
+Drives a PollScheduler-paced loop against a simulated game and checks that:
+  - CPU usage stays near idle while the player is on foot
+  - radio station changes in a vehicle are detected under a latency target
+
+Run from the repository root:
+    python -m bench.bench_polling --duration 5 --latency-target 0.1
+"""
+import argparse
+import random
+import sys
+import time
+from threading import Event, Thread
+
+from polling import PollingPolicy, PollScheduler, ON_FOOT, IN_VEHICLE
+
+
+class SimulatedGame:
+    """Stand-in for the two memory values the monitor watches"""
+
+    def __init__(self):
+        self.in_vehicle = False
+        self.station = 0
+        self.changed_at = None
+
+    def set_station(self, station):
+        self.changed_at = time.perf_counter()
+        self.station = station
+
+
+def run_monitor(game, scheduler, running, latencies):
+    """Same shape as GTARadioMonitor.monitor_loop, minus Spotify"""
+    last_station = game.station
+    while running.is_set():
+        in_vehicle = game.in_vehicle
+        scheduler.update(IN_VEHICLE if in_vehicle else ON_FOOT)
+        if in_vehicle and game.station != last_station:
+            last_station = game.station
+            latencies.append(time.perf_counter() - game.changed_at)
+            scheduler.mark_activity()
+        scheduler.wait()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per phase")
+    parser.add_argument("--latency-target", type=float, default=0.1, help="max p95 detection latency (s)")
+    parser.add_argument("--cpu-target", type=float, default=1.0, help="max on-foot CPU usage (%%)")
+    args = parser.parse_args()
+
+    policy = PollingPolicy()
+    scheduler = PollScheduler(policy)
+    game = SimulatedGame()
+    running = Event()
+    running.set()
+    latencies = []
+    thread = Thread(target=run_monitor, args=(game, scheduler, running, latencies), daemon=True)
+    thread.start()
+
+    # Phase 1: on foot, let the fast-polling burst expire before measuring
+    time.sleep(policy.burst_duration)
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    time.sleep(args.duration)
+    cpu_pct = 100.0 * (time.process_time() - cpu_start) / (time.perf_counter() - wall_start)
+
+    # Phase 2: in vehicle, flip the station at random moments
+    game.in_vehicle = True
+    deadline = time.perf_counter() + args.duration
+    station = 0
+    while time.perf_counter() < deadline:
+        time.sleep(random.uniform(0.1, 0.7))
+        station = 12 if station != 12 else 0
+        game.set_station(station)
+    time.sleep(policy.vehicle_interval * 2)
+
+    running.clear()
+    scheduler.wake()
+    thread.join(timeout=2)
+
+    print(f"Policy: {policy}")
+    print(f"On foot CPU usage:   {cpu_pct:.3f}% (target < {args.cpu_target}%)")
+    if latencies:
+        p50, p95 = percentile(latencies, 50), percentile(latencies, 95)
+        print(f"Detection latency:   p50={p50 * 1000:.1f} ms  p95={p95 * 1000:.1f} ms  "
+              f"max={max(latencies) * 1000:.1f} ms over {len(latencies)} changes "
+              f"(target p95 < {args.latency_target * 1000:.0f} ms)")
+    else:
+        p95 = float("inf")
+        print("Detection latency:   no changes detected")
+
+    ok = cpu_pct < args.cpu_target and p95 < args.latency_target
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Benchmark for rate-limit handling in the Method A dispatcher
+
+Drives the monitor's dispatcher and Spotify API backend with a burst-heavy
+workload (play/pause flips, skip bursts, Spotify reopening as a new device,
+whose 404 re-read and retry go through the bucket too) against the local
+fake API answering every player request with 429 during scheduled windows and
+whenever the client exceeds a per-second request limit.
+Checks that no command is lost - Spotify ends in the last requested state and
+moved exactly as many tracks as the dispatcher reports - and compares how many
+429s the client provoked with and without the token bucket.
+
+Run from the repository root:
+    python -m bench.bench_rate_limit --duration 12 --throttle-period 4 --throttle-duration 1.5 --max-rate 6
+"""
+import argparse
+import configparser
+import contextlib
+import io
+import random
+import sys
+import time
+
+import logs
+from dispatcher import PLAY, PAUSE, NEXT, PREVIOUS
+from main import GTARadioMonitor
+from memory_source import FakeMemorySource
+from spotify_client import InstrumentedSpotify
+from bench.fake_spotify_api import FakeSpotifyServer
+
+
+def make_config(rate, burst):
+    config = configparser.ConfigParser()
+    config.read_dict({
+        "dispatcher": {"hysteresis": "0.1", "skip_window": "0.05"},
+        "spotify_api": {"playback_sync_interval": "0"},
+        "rate_limit": {"rate": str(rate), "burst": str(burst)},
+    })
+    return config
+
+
+def build_monitor(server, config, limited):
+    monitor = GTARadioMonitor(use_pywinauto=False, memory_source=FakeMemorySource([]), config=config)
+    if not limited:
+        monitor.backend.limiter = monitor.dispatcher.limiter = None
+    client = InstrumentedSpotify(auth="bench-token")
+    client.prefix = server.url + "/v1/"
+    monitor.backend.use_client(client)
+    return monitor
+
+
+def new_device(server, number):
+    """Replace the device list with a fresh active device, as when Spotify is reopened"""
+    server.set_devices([{"id": f"fake-desktop-{number:04d}", "is_active": True, "is_private_session": False,
+                         "is_restricted": False, "name": "Fake Desktop", "type": "Computer",
+                         "volume_percent": 50, "supports_volume": True}])
+
+
+def workload(dispatcher, server, duration, seed):
+    """Random play/pause flips, skip bursts and device changes; returns the last play/pause sent"""
+    rng = random.Random(seed)
+    state = PLAY
+    dispatcher.submit(state)
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        roll = rng.random()
+        if roll < 0.15:
+            state = PAUSE if state == PLAY else PLAY
+            dispatcher.submit(state)
+        elif roll < 0.85:
+            for _ in range(rng.randint(1, 6)):
+                dispatcher.submit(NEXT if rng.random() < 0.7 else PREVIOUS)
+        else:
+            new_device(server, rng.randrange(10000))
+        time.sleep(rng.uniform(0.02, 0.12))
+    return state
+
+
+def run(server, args, limited):
+    monitor = build_monitor(server, make_config(args.rate, args.burst), limited)
+    server.reset()
+    before = server.stats()
+    monitor.dispatcher.start()
+    last = workload(monitor.dispatcher, server, args.duration, args.seed)
+    # Every press is sent eventually, at the limited rate: a Web API skip is one request per track
+    settled = monitor.dispatcher.wait_idle(timeout=120)
+    monitor.dispatcher.stop()
+    after = server.stats()
+
+    statuses = [entry["status"] for entry in after["log"]]
+    return {
+        "settled": settled,
+        "state_ok": after["is_playing"] == (last == PLAY),
+        "tracks_ok": after["track"] - before["track"] == monitor.dispatcher.tracks_skipped,
+        "requests": len(statuses),
+        "throttled": statuses.count(429),
+        "commands": sum(monitor.dispatcher.issued.values()),
+        "tracks": monitor.dispatcher.tracks_skipped,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=12.0, help="seconds of workload per run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.02, help="fake API latency (s)")
+    parser.add_argument("--throttle-period", type=float, default=4.0, help="seconds between 429 windows")
+    parser.add_argument("--throttle-duration", type=float, default=1.5, help="length of each 429 window (s)")
+    parser.add_argument("--max-rate", type=int, default=6, help="fake API requests/s before 429s")
+    parser.add_argument("--rate", type=float, default=5.0, help="token bucket rate (commands/s)")
+    parser.add_argument("--burst", type=int, default=10)
+    args = parser.parse_args()
+    logs.configure(console=False)
+
+    server = FakeSpotifyServer(latency=args.latency, throttle_period=args.throttle_period,
+                               throttle_duration=args.throttle_duration, max_rate=args.max_rate).start()
+    try:
+        with contextlib.redirect_stderr(io.StringIO()):
+            results = {"retry only": run(server, args, limited=False),
+                       "token bucket": run(server, args, limited=True)}
+    finally:
+        server.stop()
+
+    print(f"{args.duration:g} s of bursty commands, 429 for {args.throttle_duration:g} s "
+          f"every {args.throttle_period:g} s and above {args.max_rate} requests/s")
+    ok = True
+    for name, result in results.items():
+        run_ok = result["settled"] and result["state_ok"] and result["tracks_ok"]
+        ok = ok and run_ok
+        print(f"  {name:12s}: {result['requests']:4d} requests, {result['throttled']:3d} got 429, "
+              f"{result['commands']:3d} commands, {result['tracks']:+4d} tracks, "
+              f"final state {'ok' if result['state_ok'] else 'WRONG'}, "
+              f"track count {'ok' if result['tracks_ok'] else 'WRONG'}")
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""Benchmark for game-version detection and signature scanning
+
+Builds a synthetic gta_sa.exe module image (PE header, random code bytes,
+planted references to the watched addresses and many near-miss decoys of the
+signatures' anchor bytes) and measures:
+  - scan throughput of the bytes.find-based scanner over the whole image,
+    against a byte-by-byte Python loop over a slice of it
+  - AddressResolver.resolve() on the first attach (reads the image and scans)
+    and on a later startup (address cache hit, no scan)
+and checks the derived signatures find the planted addresses again.
+
+Run from the repository root:
+    python -m bench.bench_signatures --size-mb 14
+"""
+import argparse
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+
+import logs
+from game_version import AddressResolver, Signature, VERSION_CHECKS, derive_signature, scan
+from memory_source import FakeMemorySource, WatchedField
+
+
+IMAGE_BASE = 0x400000
+
+# Made-up build: the addresses the scan has to find, and code around references to them
+PLANTED = {
+    "radio_station": (0x8D2E15, "0F B6 05 ?? ?? ?? ?? 3C 0C 0F 94 C0 @ 3"),
+    "vehicle_status": (0xBA6A3C, "8B 0D ?? ?? ?? ?? 85 C9 7E ?? 8B 41 @ 2"),
+}
+
+
+def pe_header(size, timestamp):
+    header = bytearray(0x1000)
+    header[:2] = b"MZ"
+    struct.pack_into("<I", header, 0x3C, 0x80)
+    header[0x80:0x84] = b"PE\0\0"
+    struct.pack_into("<HHI", header, 0x84, 0x14C, 4, timestamp)
+    optional = 0x80 + 24
+    struct.pack_into("<HI", header, optional, 0x10B, 0)
+    struct.pack_into("<I", header, optional + 28, IMAGE_BASE)
+    struct.pack_into("<III", header, optional + 56, size, 0x1000, 0)
+    return header
+
+
+def build_image(size, seed, decoys):
+    """Random module image with the PLANTED references and `decoys` anchor-only look-alikes"""
+    rng = random.Random(seed)
+    image = bytearray(rng.randbytes(size))
+    image[:0x1000] = pe_header(size, timestamp=0x5A3B1C2D)
+    for address, _, _ in VERSION_CHECKS:
+        # Make sure no known-build check matches by accident
+        offset = address - IMAGE_BASE
+        if offset + 4 <= size:
+            image[offset:offset + 4] = b"\0\0\0\0"
+    for name, (address, text) in PLANTED.items():
+        signature = Signature.parse(name, text)
+        anchor_at, anchor = signature.anchor
+        for _ in range(decoys):
+            at = rng.randrange(0x1000, size - 64)
+            image[at:at + len(anchor)] = anchor
+        at = rng.randrange(size // 2, size - 64)
+        tokens = text.partition("@")[0].split()
+        for index, token in enumerate(tokens):
+            if token != "??":
+                image[at + index] = int(token, 16)
+        struct.pack_into("<I", image, at + signature.offset, address)
+    return bytes(image)
+
+
+def naive_find(image, signature, limit):
+    """Byte-by-byte Python matcher (what the scanner avoids), over the first `limit` bytes"""
+    mask = [None] * signature.length
+    for at, run in signature.runs:
+        for index, byte in enumerate(run):
+            mask[at + index] = byte
+    for begin in range(min(limit, len(image) - signature.length)):
+        for index, byte in enumerate(mask):
+            if byte is not None and image[begin + index] != byte:
+                break
+        else:
+            return begin
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=14.0, help="synthetic module size")
+    parser.add_argument("--decoys", type=int, default=2000, help="anchor look-alikes per signature")
+    parser.add_argument("--naive-kb", type=int, default=512, help="bytes scanned by the Python loop")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logs.configure(console=False)
+
+    size = int(args.size_mb * 1024 * 1024)
+    image = build_image(size, args.seed, args.decoys)
+    signatures = [Signature.parse(name, text) for name, (_, text) in PLANTED.items()]
+    expected = {name: address for name, (address, _) in PLANTED.items()}
+
+    started = time.perf_counter()
+    found = scan(image, signatures)
+    scan_seconds = time.perf_counter() - started
+
+    limit = args.naive_kb * 1024
+    started = time.perf_counter()
+    for signature in signatures:
+        naive_find(image, signature, limit)
+    naive_seconds = time.perf_counter() - started
+
+    derived = {name: derive_signature(image, address) for name, address in expected.items()}
+    rederived = scan(image, [Signature.parse(name, text) for name, text in derived.items() if text])
+
+    with tempfile.TemporaryDirectory() as directory:
+        resolver = AddressResolver(signatures, cache_path=os.path.join(directory, "addresses.json"))
+        fields = [WatchedField("radio_station", 0x8CB7A5, "B"), WatchedField("vehicle_status", 0xBA18FC, "i")]
+        memory = FakeMemorySource(fields, image=image, image_base=IMAGE_BASE)
+        started = time.perf_counter()
+        cold = resolver.resolve(memory)
+        cold_seconds = time.perf_counter() - started
+
+        resolver = AddressResolver(signatures, cache_path=resolver.cache_path)
+        started = time.perf_counter()
+        warm = resolver.resolve(memory)
+        warm_seconds = time.perf_counter() - started
+        warm_scans = resolver.scans
+
+    megabytes = size / (1024 * 1024)
+    print(f"Synthetic {megabytes:.1f} MB module, {len(signatures)} signatures, {args.decoys} decoys each")
+    print(f"  bytes.find scan : {scan_seconds * 1000:8.1f} ms  {megabytes / scan_seconds:9.1f} MB/s  "
+          f"found {', '.join(f'{name}={address:#x}' for name, address in found.items())}")
+    print(f"  python loop     : {naive_seconds * 1000:8.1f} ms  "
+          f"{limit * len(signatures) / (1024 * 1024) / naive_seconds / len(signatures):9.2f} MB/s  "
+          f"(first {args.naive_kb} KB only)")
+    print(f"  resolve, first attach : {cold_seconds * 1000:7.1f} ms  ({cold.version}, from {cold.source})")
+    print(f"  resolve, next startup : {warm_seconds * 1000:7.1f} ms  ({warm.version}, from {warm.source}, "
+          f"{warm_scans} scans)")
+    for name, text in derived.items():
+        print(f"  derived {name}: {text}")
+    ok = (found == expected and rederived == expected and cold.addresses == expected and cold.source == "scan"
+          and warm.source == "cache" and warm.addresses == expected and warm_scans == 0)
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
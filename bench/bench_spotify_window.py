@@ -0,0 +1,101 @@
+"""Benchmark for the cached Spotify window index (Method B)
+
+Compares the per-keypress cost of a full process scan + window connect (the
+old _get_spotify_app) with the cached, PID + create-time validated lookup,
+and checks that a Spotify restart is picked up by the background refresher
+and that the backend's next keystroke goes to the new window.
+
+Run from the repository root:
+    python -m bench.bench_spotify_window --processes 400 --lookups 2000
+"""
+import argparse
+import configparser
+import sys
+import time
+
+import logs
+from backend_pywinauto import PywinautoBackend
+from processes import FakeProcessEnumerator
+from spotify_window import SpotifyWindowIndex
+from bench.fakes import FakeSpotifyWindow
+
+
+class FakeWindowConnector:
+    """Stand-in for findwindows.find_window + Application.connect"""
+
+    def __init__(self, enumerator, cost):
+        self.enumerator = enumerator
+        self.cost = cost
+        self.main_pid = None
+        self.calls = 0
+        self.windows = {}  # pid -> FakeSpotifyWindow
+
+    def __call__(self, pid):
+        self.calls += 1
+        time.sleep(self.cost)
+        if pid != self.main_pid:
+            raise RuntimeError("no main window")
+        return self.windows.setdefault(pid, FakeSpotifyWindow())
+
+
+def launch_spotify(enumerator, connector, helpers=5):
+    """Spotify runs one main process plus several helpers with the same name"""
+    procs = [enumerator.spawn("Spotify.exe") for _ in range(helpers + 1)]
+    connector.main_pid = procs[-1].pid
+    return procs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=400, help="unrelated processes on the box")
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--connect-cost", type=float, default=0.001, help="seconds per window connect attempt")
+    args = parser.parse_args()
+    logs.configure(console=False)
+
+    enumerator = FakeProcessEnumerator(f"proc{i}.exe" for i in range(args.processes))
+    connector = FakeWindowConnector(enumerator, args.connect_cost)
+    spotify = launch_spotify(enumerator, connector)
+    index = SpotifyWindowIndex(enumerator, connect=connector, refresh_interval=0.05)
+
+    start = time.perf_counter()
+    for _ in range(max(1, args.lookups // 100)):
+        index.rescan()
+    uncached = (time.perf_counter() - start) / max(1, args.lookups // 100)
+
+    start = time.perf_counter()
+    for _ in range(args.lookups):
+        window = index.get()
+    cached = (time.perf_counter() - start) / args.lookups
+
+    print(f"{len(enumerator.processes)} processes, {len(spotify)} Spotify.exe")
+    print(f"  full scan + connect: {uncached * 1000:8.3f} ms per lookup")
+    print(f"  cached lookup:       {cached * 1000:8.3f} ms per lookup ({uncached / cached:,.0f}x faster)")
+
+    backend = PywinautoBackend(configparser.ConfigParser())
+    backend.windows = index
+    backend.play()
+
+    # Restart Spotify: the refresher should notice the dead PID and rescan on its own
+    index.start()
+    for proc in spotify:
+        enumerator.kill(proc.pid)
+    launch_spotify(enumerator, connector)
+    rescans_before = index.rescans
+    deadline = time.perf_counter() + 2
+    while index.rescans == rescans_before and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    index.stop()
+    new_window = index.get()
+    detected = window is not new_window and new_window is not None
+    backend.pause()
+    delivered = new_window is not None and [keys for _, keys in new_window.keystrokes] == ["{SPACE}"]
+    ok = detected and delivered and len(window.keystrokes) == 1
+    print(f"  restart detected by refresher: {'yes' if detected else 'no'} -> pid {connector.main_pid}")
+    print(f"  next keystroke after restart sent to the new window: {'yes' if delivered else 'no'}")
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
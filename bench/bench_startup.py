@@ -0,0 +1,76 @@
+"""Benchmark for startup time and lazy backend loading
+
+Measures, in fresh interpreters:
+  - `import main`, and which heavy libraries it pulls in (spotipy, pywinauto,
+    keyboard and http.server must not be among them)
+  - `python main.py --profile-startup` for each Spotify method: launch to
+    "monitor ready" against [startup] budget_ms (no GTA SA or Spotify needed;
+    the API method starts without credentials)
+
+Run from the repository root:
+    python -m bench.bench_startup --runs 5
+"""
+import argparse
+import configparser
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+
+HEAVY = ("spotipy", "pywinauto", "keyboard", "http.server")
+
+IMPORT_MAIN = """
+import sys, time
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+print(elapsed * 1000, *[name for name in %r if name in sys.modules])
+""" % (HEAVY,)
+
+
+def run(command, env=None):
+    return subprocess.run(command, capture_output=True, text=True, env=env, timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    config = configparser.ConfigParser()
+    config.read("config.ini")
+    budget = config.getfloat("startup", "budget_ms", fallback=0)
+
+    imports, loaded = [], set()
+    for _ in range(args.runs):
+        fields = run([sys.executable, "-c", IMPORT_MAIN]).stdout.split()
+        imports.append(float(fields[0]))
+        loaded.update(fields[1:])
+
+    ready = {}
+    ok = not loaded
+    for method in ("pywinauto", "api"):
+        env = dict(os.environ, SPOTIFY_METHOD=method, SPOTIPY_CLIENT_ID="", SPOTIPY_CLIENT_SECRET="")
+        ready[method] = []
+        for _ in range(args.runs):
+            result = run([sys.executable, "main.py", "--profile-startup"], env=env)
+            match = re.search(r"-> monitor ready: ([\d.]+) ms", result.stdout)
+            if match is None:
+                print(f"{method}: no startup report (exit {result.returncode})\n{result.stdout}{result.stderr}")
+                return 1
+            ready[method].append(float(match.group(1)))
+            ok = ok and result.returncode == 0
+
+    print(f"import main: p50={statistics.median(imports):6.1f} ms  "
+          f"heavy modules loaded: {', '.join(sorted(loaded)) or 'none'}")
+    for method, values in ready.items():
+        print(f"  {method:9s} launch -> monitor ready: p50={statistics.median(values):6.1f} ms  "
+              f"max={max(values):6.1f} ms  (budget {budget:.0f} ms)")
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
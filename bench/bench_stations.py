@@ -0,0 +1,136 @@
+"""Benchmark for per-station Spotify contexts and the prefetched metadata cache
+
+Maps the eleven game stations to playlists, albums and artists on the local
+fake API (whose metadata lookups are deliberately slow) and measures:
+  - prefetch: requests and time to fill the metadata cache cold, to revalidate
+    it after a restart (ETag -> 304) and after one playlist changed
+  - switching: time from the station change in the game-state snapshot to the
+    play request with the new context_uri reaching Spotify, which must not
+    include any metadata lookup
+
+Run from the repository root:
+    python -m bench.bench_stations --metadata-latency 0.25
+"""
+import argparse
+import configparser
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import logs
+from main import GTARadioMonitor
+from memory_source import FakeMemorySource
+from metadata import ContextMetadataCache
+from spotify_client import InstrumentedSpotify
+from stations import STATION_NAMES, USER_RADIO
+from bench.fake_spotify_api import FakeSpotifyServer
+
+
+KINDS = ("playlist", "playlist", "album", "artist")
+
+
+def station_contexts():
+    """{station: context URI} for the eleven game stations"""
+    return {station: f"spotify:{KINDS[station % len(KINDS)]}:{station:022d}"
+            for station in STATION_NAMES if station != USER_RADIO}
+
+
+def make_client(server):
+    client = InstrumentedSpotify(auth="bench-token")
+    client.prefix = server.url + "/v1/"
+    return client
+
+
+def metadata_requests(server):
+    return [e for e in server.stats()["log"] if e["endpoint"].split("/")[-2] in ("playlists", "albums", "artists")]
+
+
+def prefetch(server, path, uris):
+    server.reset()
+    cache = ContextMetadataCache(make_client(server), path=path, revalidate_after=0)
+    started = time.perf_counter()
+    cache.prefetch(uris)
+    elapsed = time.perf_counter() - started
+    statuses = [e["status"] for e in metadata_requests(server)]
+    return {"ms": elapsed * 1000, "200": statuses.count(200), "304": statuses.count(304),
+            "named": sum(1 for uri in uris if cache.get(uri))}
+
+
+def switching(server, path, contexts, switches, interval):
+    config = configparser.ConfigParser()
+    config.read_dict({
+        "dispatcher": {"hysteresis": "0"},
+        "spotify_api": {"playback_sync_interval": "0"},
+        "devices": {"refresh_interval": "0"},
+        "stations": {**{str(station): uri for station, uri in contexts.items()},
+                     "metadata_cache": path, "metadata_revalidate": "0"},
+    })
+    monitor = GTARadioMonitor(use_pywinauto=False, memory_source=FakeMemorySource([]), config=config)
+    monitor.backend.use_client(make_client(server))
+    monitor.dispatcher.start()
+    snapshot_type = FakeMemorySource(monitor.watched_fields()).snapshot_type
+
+    # Metadata revalidation running in the background the whole time
+    server.reset()
+    monitor.backend.context_metadata.start(list(contexts.values()))
+    latencies = []
+    stations = sorted(contexts)
+    for index in range(switches):
+        station = stations[index % len(stations)]
+        snapshot = snapshot_type()
+        snapshot.timestamp = time.monotonic()
+        snapshot.radio_station = station
+        snapshot.vehicle_status = 1
+        started = time.perf_counter()
+        monitor.process_snapshot(snapshot)
+        monitor.dispatcher.wait_idle(timeout=10)
+        latencies.append(time.perf_counter() - started)
+        time.sleep(interval)
+    monitor.backend.context_metadata.stop()
+    monitor.dispatcher.stop()
+    stats = server.stats()
+    return {"p50_ms": statistics.median(latencies) * 1000, "max_ms": max(latencies) * 1000,
+            "context_ok": stats["context"] == contexts[stations[(switches - 1) % len(stations)]]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.02, help="fake API latency (s)")
+    parser.add_argument("--metadata-latency", type=float, default=0.25, help="extra latency of metadata lookups (s)")
+    parser.add_argument("--switches", type=int, default=22)
+    parser.add_argument("--interval", type=float, default=0.3, help="seconds between station changes")
+    args = parser.parse_args()
+    logs.configure(console=False)
+
+    contexts = station_contexts()
+    uris = list(dict.fromkeys(contexts.values()))
+    server = FakeSpotifyServer(latency=args.latency, metadata_latency=args.metadata_latency).start()
+    try:
+        with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stderr(io.StringIO()):
+            path = os.path.join(directory, "metadata.json")
+            results = {"cold start": prefetch(server, path, uris), "restart": prefetch(server, path, uris)}
+            server.bump(uris[0])
+            results["1 changed"] = prefetch(server, path, uris)
+            switch = switching(server, path, contexts, args.switches, args.interval)
+    finally:
+        server.stop()
+
+    print(f"{len(uris)} station contexts, metadata lookups {args.metadata_latency * 1000:.0f} ms + "
+          f"{args.latency * 1000:.0f} ms")
+    for name, result in results.items():
+        print(f"  prefetch {name:10s}: {result['ms']:7.1f} ms  {result['200']:2d} x 200  {result['304']:2d} x 304  "
+              f"({result['named']} named)")
+    print(f"  station switch -> play(context_uri): p50={switch['p50_ms']:6.1f} ms  max={switch['max_ms']:6.1f} ms  "
+          f"final context {'ok' if switch['context_ok'] else 'WRONG'}")
+    ok = (results["restart"]["200"] == 0 and results["1 changed"]["200"] == 1
+          and switch["context_ok"] and switch["max_ms"] < args.metadata_latency * 1000)
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""Benchmark for the status push API
+
+Drives the monitor's state logic with fast station changes while many
+subscribers listen on the status server, one of them never reading, and
+measures:
+  - the cost of process_snapshot() with the server publishing, against no server
+  - delivery latency from the event to the subscribers
+  - that every reading subscriber got every event and the stalled one was
+    disconnected instead of holding anything up
+  - a next / toggle round trip over the same socket
+  - that a play which failed (Spotify closed) is not pushed as a "play" event
+
+The subscribers run in this process too; far above --rate 500 their own JSON
+parsing can't keep up, and the server rightly disconnects them.
+
+Run from the repository root:
+    python -m bench.bench_status_server --subscribers 50 --events 3000
+"""
+import argparse
+import asyncio
+import configparser
+import json
+import socket
+import statistics
+import sys
+import time
+from threading import Thread
+
+import logs
+from main import GTARadioMonitor
+from memory_source import FakeMemorySource
+from processes import FakeProcessEnumerator
+from spotify_window import SpotifyWindowIndex
+from stations import USER_RADIO
+from bench.bench_dispatcher import CountingController
+
+
+def make_monitor(enabled, buffer):
+    config = configparser.ConfigParser()
+    config.read_dict({
+        "dispatcher": {"hysteresis": "0", "skip_window": "0"},
+        "status_server": {"enabled": str(enabled).lower(), "port": "0", "buffer": str(buffer)},
+    })
+    monitor = GTARadioMonitor(use_pywinauto=True, memory_source=FakeMemorySource([]), config=config)
+    monitor.dispatcher.controller = CountingController()
+    monitor.dispatcher.start()
+    if monitor.status_server:
+        monitor.status_server.start()
+    return monitor
+
+
+def drive(monitor, events, rate):
+    """Feed snapshots cycling through the stations; returns per-call seconds"""
+    snapshot_type = FakeMemorySource(monitor.watched_fields()).snapshot_type
+    costs = []
+    started = time.perf_counter()
+    for index in range(events):
+        snapshot = snapshot_type()
+        snapshot.timestamp = time.monotonic()
+        snapshot.radio_station = index % USER_RADIO + 1
+        snapshot.vehicle_status = 1
+        began = time.perf_counter()
+        monitor.process_snapshot(snapshot)
+        costs.append(time.perf_counter() - began)
+        delay = started + (index + 1) / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    monitor.dispatcher.wait_idle(timeout=10)
+    return costs
+
+
+class Subscribers:
+    """Reading subscribers on their own asyncio loop, counting lines and latency"""
+
+    def __init__(self, port, count):
+        self.port = port
+        self.count = count
+        self.received = [0] * count
+        self.station_events = [0] * count
+        self.commands = []  # play/pause/skip events seen by the first subscriber
+        self.latencies = []
+        self.loop = asyncio.new_event_loop()
+        self.tasks = []
+        self.connected = 0
+        self.thread = Thread(target=self.loop.run_forever, daemon=True)
+
+    async def _read(self, index):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        self.connected += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                event = json.loads(line)
+                self.received[index] += 1
+                if event["event"] == "station_changed":
+                    self.station_events[index] += 1
+                    self.latencies.append(time.time() - event["time"])
+                elif index == 0 and event["event"] in ("play", "pause", "skip"):
+                    self.commands.append(event["event"])
+        finally:
+            writer.close()
+
+    def start(self):
+        self.thread.start()
+        for index in range(self.count):
+            self.tasks.append(asyncio.run_coroutine_threadsafe(self._read(index), self.loop))
+        while self.connected < self.count:
+            time.sleep(0.01)
+
+    def join(self, timeout=5):
+        """Wait for every subscriber to see the server close"""
+        for task in self.tasks:
+            task.result(timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+        self.loop.close()
+
+
+def command(port, *lines):
+    """Send commands on a fresh connection; returns (replies, seconds)"""
+    with socket.create_connection(("127.0.0.1", port)) as sock:
+        stream = sock.makefile("rwb")
+        json.loads(stream.readline())  # hello
+        replies = []
+        started = time.perf_counter()
+        for line in lines:
+            stream.write(line.encode() + b"\n")
+            stream.flush()
+            while True:
+                reply = json.loads(stream.readline())
+                if "reply" in reply:
+                    replies.append(reply)
+                    break
+        return replies, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=50)
+    parser.add_argument("--events", type=int, default=3000, help="station changes to publish")
+    parser.add_argument("--rate", type=float, default=500, help="station changes per second")
+    parser.add_argument("--buffer", type=int, default=256, help="events queued per subscriber")
+    args = parser.parse_args()
+    logs.configure(console=False)
+
+    baseline = make_monitor(False, args.buffer)
+    base_costs = drive(baseline, args.events, args.rate)
+    baseline.dispatcher.stop()
+
+    monitor = make_monitor(True, args.buffer)
+    server = monitor.status_server
+    subscribers = Subscribers(server.port, args.subscribers)
+    subscribers.start()
+    stalled = socket.socket()
+    stalled.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    stalled.connect(("127.0.0.1", server.port))
+    while server.subscribers < args.subscribers + 1:
+        time.sleep(0.01)
+
+    costs = drive(monitor, args.events, args.rate)
+    time.sleep(0.5)
+    # End on User Radio so the commands are accepted
+    snapshot = FakeMemorySource(monitor.watched_fields()).snapshot_type()
+    snapshot.timestamp, snapshot.radio_station, snapshot.vehicle_status = time.monotonic(), USER_RADIO, 1
+    monitor.process_snapshot(snapshot)
+    monitor.dispatcher.wait_idle(timeout=5)
+    calls = len(monitor.dispatcher.controller.calls)
+    replies, round_trip = command(server.port, "status", "next", '{"command": "toggle"}', "bogus")
+    monitor.dispatcher.wait_idle(timeout=5)
+    issued = monitor.dispatcher.controller.calls[calls:]
+    # The real backend with Spotify closed: the play fails and subscribers must not hear of it
+    backend = monitor.backend
+    backend.windows = SpotifyWindowIndex(FakeProcessEnumerator([]), refresh_interval=0)
+    monitor.dispatcher.controller = backend
+    monitor.dispatcher.retry_backoff = 0.05
+    time.sleep(0.2)
+    seen, plays = len(subscribers.commands), monitor.dispatcher.issued["play"]
+    command(server.port, "toggle")
+    monitor.dispatcher.wait_idle(timeout=5)
+    time.sleep(0.2)
+    refused = monitor.dispatcher.issued["play"] == plays and monitor.dispatcher.state == "pause"
+    leaked = subscribers.commands[seen:]
+    dropped = server.dropped
+    monitor.stop()
+    subscribers.join()
+    stalled.close()
+
+    def micros(values, pct):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))] * 1e6
+
+    expected = args.events
+    complete = sum(1 for count in subscribers.station_events if count == expected)
+    latencies = sorted(subscribers.latencies)
+    print(f"{args.subscribers} reading subscribers + 1 stalled, {expected} station changes at {args.rate:g}/s, "
+          f"buffer {args.buffer}")
+    print(f"  process_snapshot, no server : p50={micros(base_costs, 50):6.1f} us  p99={micros(base_costs, 99):7.1f} us")
+    print(f"  process_snapshot, publishing: p50={micros(costs, 50):6.1f} us  p99={micros(costs, 99):7.1f} us  "
+          f"max={max(costs) * 1000:.2f} ms")
+    print(f"  delivery latency: p50={statistics.median(latencies) * 1000:.1f} ms  "
+          f"p99={latencies[int(0.99 * (len(latencies) - 1))] * 1000:.1f} ms  (event times have 1 ms resolution)")
+    print(f"  subscribers with every event: {complete}/{args.subscribers}   disconnected: {dropped} (the stalled one)")
+    print(f"  commands: {[(r['reply'], r['ok']) for r in replies]} -> Spotify {issued} in {round_trip * 1000:.1f} ms")
+    print(f"  play with Spotify closed: not counted as sent={refused}  events pushed: {leaked or 'none'}")
+    ok = (complete == args.subscribers and dropped == 1 and [r["ok"] for r in replies] == [True, True, True, False]
+          and issued == ["next", "pause"] and replies[0].get("user_radio") is True and refused and not leaked)
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
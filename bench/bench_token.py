@@ -0,0 +1,122 @@
+"""Benchmark for the pooled Spotify session and background token refresh
+
+Runs the Method A client against the local fake API with a simulated
+connection handshake, an idle timeout that drops kept-alive connections and a
+slow token endpoint, then times the first play after a long idle period:
+  - cold: stock behaviour, the play pays for a reconnect and a token refresh
+  - warm: with TokenRefresher, the token is renewed and the connection kept
+    open in the background, so the play costs the same as a steady-state call
+
+Run from the repository root:
+    python -m bench.bench_token --idle 12
+"""
+import argparse
+import contextlib
+import io
+import statistics
+import sys
+import time
+
+from spotipy.cache_handler import MemoryCacheHandler
+from spotipy.oauth2 import SpotifyOAuth
+
+import logs
+from spotify_client import InstrumentedSpotify, CachedTokenHandler, TokenRefresher
+from bench.fake_spotify_api import FakeSpotifyServer
+
+
+SCOPE = "user-read-playback-state user-modify-playback-state"
+
+
+def make_client(server, expires_in, timeout):
+    token_info = {"access_token": "fake-access-0", "token_type": "Bearer", "expires_in": expires_in,
+                  "expires_at": int(time.time()) + expires_in, "refresh_token": "fake-refresh-token",
+                  "scope": SCOPE}
+    auth = SpotifyOAuth(client_id="bench", client_secret="bench", redirect_uri="http://127.0.0.1:8888/callback",
+                        scope=SCOPE, cache_handler=CachedTokenHandler(MemoryCacheHandler(token_info)),
+                        requests_timeout=timeout)
+    auth.OAUTH_TOKEN_URL = server.url + "/api/token"
+    client = InstrumentedSpotify(auth_manager=auth, requests_timeout=timeout)
+    client.prefix = server.url + "/v1/"
+    return client
+
+
+def timed(call):
+    start = time.perf_counter()
+    call()
+    return time.perf_counter() - start
+
+
+def run(server, args, warm):
+    server.reset()
+    client = make_client(server, args.expires_in, (args.connect_timeout, args.read_timeout))
+    refresher = None
+    if warm:
+        refresher = TokenRefresher(client, margin=args.margin, keepalive_interval=args.keepalive,
+                                   interval=args.keepalive)
+        refresher.start()
+
+    steady = []
+    for _ in range(args.calls):
+        steady.append(timed(client.start_playback))
+        steady.append(timed(client.pause_playback))
+
+    time.sleep(args.idle)
+    stats = server.stats()
+    first = timed(client.start_playback)
+    after = server.stats()
+    if refresher:
+        refresher.stop()
+
+    log = after["log"][len(stats["log"]):]
+    return {
+        "steady_ms": statistics.median(steady) * 1000,
+        "first_ms": first * 1000,
+        "token_requests_on_play": len([e for e in log if e["endpoint"] == "POST /api/token"]),
+        "new_connections_on_play": after["connections"] - stats["connections"] - 1,  # minus the /_stats call
+        "background_refreshes": refresher.refreshes if refresher else 0,
+        "keepalive_pings": refresher.pings if refresher else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--idle", type=float, default=12.0, help="seconds without commands before the play")
+    parser.add_argument("--calls", type=int, default=10, help="steady-state play/pause pairs")
+    parser.add_argument("--latency", type=float, default=0.02, help="fake API latency (s)")
+    parser.add_argument("--connect-latency", type=float, default=0.15, help="simulated handshake cost (s)")
+    parser.add_argument("--idle-timeout", type=float, default=3.0, help="server closes idle connections (s)")
+    parser.add_argument("--token-latency", type=float, default=0.2, help="token endpoint latency (s)")
+    parser.add_argument("--expires-in", type=int, default=70,
+                        help="token lifetime; spotipy refreshes inline once under 60 s remain")
+    parser.add_argument("--margin", type=float, default=65.0, help="TokenRefresher margin (s)")
+    parser.add_argument("--keepalive", type=float, default=1.0, help="TokenRefresher keep-alive interval (s)")
+    parser.add_argument("--connect-timeout", type=float, default=2.0)
+    parser.add_argument("--read-timeout", type=float, default=5.0)
+    args = parser.parse_args()
+    logs.configure(console=False)
+
+    server = FakeSpotifyServer(latency=args.latency, connect_latency=args.connect_latency,
+                               idle_timeout=args.idle_timeout, token_latency=args.token_latency,
+                               token_expires_in=args.expires_in).start()
+    try:
+        with contextlib.redirect_stderr(io.StringIO()):
+            results = {"cold": run(server, args, warm=False), "warm": run(server, args, warm=True)}
+    finally:
+        server.stop()
+
+    print(f"First play after {args.idle:g} s idle (handshake {args.connect_latency * 1000:.0f} ms, "
+          f"token endpoint {args.token_latency * 1000:.0f} ms, idle timeout {args.idle_timeout:g} s)")
+    for name, result in results.items():
+        print(f"  {name}: steady p50={result['steady_ms']:6.1f} ms  first after idle={result['first_ms']:6.1f} ms  "
+              f"token requests on play={result['token_requests_on_play']}  "
+              f"new connections on play={result['new_connections_on_play']}  "
+              f"(background refreshes={result['background_refreshes']}, pings={result['keepalive_pings']})")
+    warm = results["warm"]
+    ok = warm["token_requests_on_play"] == 0 and warm["first_ms"] < warm["steady_ms"] * 2 + 10
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
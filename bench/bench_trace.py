@@ -0,0 +1,132 @@
+"""Benchmark for game-state trace recording and replay
+
+Records hours of scripted play at the monitor's real polling cadence, then checks:
+  - trace size with change-only recording vs writing every tick
+  - raw decode throughput (records/s) of the memory-mapped reader
+  - as-fast-as-possible replay through GTARadioMonitor.process_snapshot and its
+    dispatcher on trace time, and that the play/pause commands it sends are the
+    ones the original script calls for after hysteresis
+
+Run from the repository root:
+    python -m bench.bench_trace --hours 3
+"""
+import argparse
+import configparser
+import os
+import sys
+import tempfile
+import time
+
+import logs
+from main import GTARadioMonitor
+from memory_source import FakeMemorySource
+from polling import PollingPolicy
+from traces import TraceReader, TraceWriter, replay as replay_trace
+from bench.fakes import gameplay_script, expected_transitions
+
+
+def record_session(path, fields, events, policy, changes_only):
+    """Poll the scripted game at vehicle/idle cadence with synthetic time and record each tick"""
+    memory = FakeMemorySource(fields)
+    memory.attach()
+    duration = events[-1][0] + policy.idle_interval  # One more tick to see the last write
+    t, cursor, ticks = 0.0, 0, 0
+    with TraceWriter(path, fields, changes_only=changes_only, start_time=0.0) as writer:
+        while t <= duration:
+            while cursor < len(events) and events[cursor][0] <= t:
+                for name, value in events[cursor][1].items():
+                    memory.set(name, value)
+                cursor += 1
+            snapshot = memory.read_snapshot()
+            snapshot.timestamp = t
+            writer.record(snapshot)
+            ticks += 1
+            t += policy.vehicle_interval if snapshot.vehicle_status > 0 else policy.idle_interval
+        records = writer.records
+    return ticks, records, os.path.getsize(path)
+
+
+def decode_throughput(path, repeat):
+    with TraceReader(path) as reader:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in reader.iter_raw():
+                pass
+            best = min(best, time.perf_counter() - start)
+        return len(reader) / best if best else float("inf")
+
+
+class SentCommands:
+    """Stands in for the Spotify backend: records each play/pause with the trace time it was sent"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.sent = []
+
+    def play(self, context=None):
+        self.sent.append((self.clock(), True))
+
+    def pause(self):
+        self.sent.append((self.clock(), False))
+
+    def next_track(self):
+        pass
+
+    def previous_track(self):
+        pass
+
+
+def replay(path):
+    """Feed every record through the monitor and its dispatcher; returns (commands sent, hysteresis, seconds)"""
+    with TraceReader(path) as reader:
+        monitor = GTARadioMonitor(use_pywinauto=False, memory_source=FakeMemorySource(reader.fields),
+                                  config=configparser.ConfigParser())
+        dispatcher = monitor.dispatcher
+        dispatcher.controller = SentCommands(lambda: dispatcher.clock())
+
+        start = time.perf_counter()
+        replay_trace(reader, monitor)
+        elapsed = time.perf_counter() - start
+    return dispatcher.controller.sent, dispatcher.hysteresis, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hours", type=float, default=3.0, help="hours of scripted play to record")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="decode passes (best is reported)")
+    args = parser.parse_args()
+    logs.configure(console=False)  # Keep monitor chatter out of the report
+
+    fields = GTARadioMonitor(use_pywinauto=False, memory_source=FakeMemorySource([]),
+                             config=configparser.ConfigParser()).watched_fields()
+    events = gameplay_script(args.hours * 3600, seed=args.seed)
+    policy = PollingPolicy()
+
+    with tempfile.TemporaryDirectory() as directory:
+        changes_path = os.path.join(directory, "changes.gtat")
+        full_path = os.path.join(directory, "full.gtat")
+        ticks, changed, changes_size = record_session(changes_path, fields, events, policy, True)
+        _, full, full_size = record_session(full_path, fields, events, policy, False)
+
+        rate = decode_throughput(full_path, args.repeat)
+        sent, hysteresis, elapsed = replay(changes_path)
+
+    # The dispatcher's own hysteresis on trace time decides what is sent
+    expected = expected_transitions(events, hysteresis)
+    matched = [state for _, state in sent] == [state for _, state in expected]
+
+    print(f"{args.hours:g} h of scripted play, {ticks:,} polling ticks")
+    print(f"  change-only trace: {changed:8,} records {changes_size / 1024:9.1f} KB")
+    print(f"  every-tick trace:  {full:8,} records {full_size / 1024:9.1f} KB")
+    print(f"  decode: {rate / 1e6:.1f} M records/s (iter_raw, best of {args.repeat})")
+    print(f"  replay: {changed:,} records in {elapsed * 1000:.1f} ms "
+          f"({args.hours * 3600 / elapsed:,.0f}x real time)")
+    print(f"  play/pause sent: {len(sent)} replayed / {len(expected)} in script "
+          f"-> {'OK' if matched else 'MISMATCH'}")
+    return 0 if matched else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,457 @@
+"""Local stand-in for the Spotify Web API endpoints the monitor uses
+
+Implements GET /v1/me/player, GET /v1/me/player/devices, PUT /v1/me/player/play,
+PUT /v1/me/player/pause, POST /v1/me/player/next and POST /v1/me/player/previous
+with configurable latency, error injection and scheduled 429 windows, plus an OAuth token endpoint at
+POST /api/token. connect_latency is charged to the first request on every new
+connection (a stand-in for the TCP/TLS handshake) and idle_timeout closes
+kept-alive connections that sit idle, like a real load balancer. Every request
+is logged with a time.monotonic() arrival timestamp (system-wide on Linux and
+Windows, so it is comparable across processes) and can be read back from GET /_stats.
+PUT /_devices replaces the device list (e.g. [] to simulate closing Spotify).
+GET /v1/playlists|albums|artists/<id> serve generated metadata with an ETag
+(304 on If-None-Match) after metadata_latency; POST /_bump?uri=... changes a
+context's snapshot. PUT /v1/me/player/play honours a context_uri body.
+Player commands with a device_id transfer playback to that device, or 404 if
+it is not in the list. Tracks run for track_duration ms and then advance on
+their own; GET /v1/me/player/queue lists the next tracks, and their album art
+is served from GET /_art/<album>.jpg (art_size bytes after art_latency).
+
+Standalone:
+    python -m bench.fake_spotify_api --port 8999 --latency 0.08 --error-every 10
+"""
+import argparse
+import collections
+import json
+import math
+import random
+import re
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+
+_METADATA = re.compile(r"^/v1/(playlist|album|artist)s/([0-9A-Za-z]{22})$")
+
+
+class FakeSpotifyState:
+    """Player state, request log and fault injection settings shared by all handler threads"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, error_every=0, error_status=503,
+                 retry_after=1, seed=0, connect_latency=0.0, idle_timeout=0.0, token_latency=0.0,
+                 token_expires_in=3600, throttle_period=0.0, throttle_duration=0.0, max_rate=0,
+                 metadata_latency=0.0, track_duration=180000, art_latency=0.0, art_size=40000):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate      # Probability of failing any player request
+        self.error_every = error_every    # Fail every Nth player request (0 = never)
+        self.error_status = error_status  # Status used for injected failures
+        self.retry_after = retry_after    # Retry-After header value for injected 429s
+        self.random = random.Random(seed)
+        self.connect_latency = connect_latency    # Extra delay on a connection's first request
+        self.idle_timeout = idle_timeout          # Close connections idle this long (0 = never)
+        self.token_latency = token_latency        # Delay of POST /api/token
+        self.token_expires_in = token_expires_in  # expires_in of issued access tokens
+        self.throttle_period = throttle_period      # Every this many seconds...
+        self.throttle_duration = throttle_duration  # ...answer player requests with 429 for this long
+        self.max_rate = max_rate                    # Player requests per second before 429s (0 = unlimited)
+        self.recent = collections.deque()
+        self.metadata_latency = metadata_latency    # Extra delay of playlist/album/artist lookups
+        self.versions = collections.Counter()       # Context URI -> snapshot number
+        self.context = None                         # Last context_uri started
+        self.track_duration = track_duration        # Length of every track, ms
+        self.art_latency = art_latency              # Extra delay of album art downloads
+        self.art_size = art_size                    # Bytes per album art image
+        self.started = time.monotonic()
+        self.connections = 0
+        self.tokens = 0
+        self.lock = Lock()
+        self.is_playing = False
+        self.track = 0
+        self.position = 0.0  # Seconds into the track at `resumed`
+        self.resumed = time.monotonic()
+        self.devices = [{
+            "id": "fake-desktop-0001", "is_active": True, "is_private_session": False,
+            "is_restricted": False, "name": "Fake Desktop", "type": "Computer",
+            "volume_percent": 50, "supports_volume": True,
+        }]
+        self.requests = 0
+        self.log = []
+
+    def throttled(self, now):
+        """Seconds to wait if this request is rate limited (scheduled window or over max_rate), else 0"""
+        if self.max_rate:
+            while self.recent and now - self.recent[0] >= 1.0:
+                self.recent.popleft()
+            if len(self.recent) >= self.max_rate:
+                return 1.0
+            self.recent.append(now)
+        if not self.throttle_period or not self.throttle_duration:
+            return 0.0
+        into = (now - self.started) % self.throttle_period
+        return max(0.0, self.throttle_duration - into)
+
+    def should_fail(self):
+        self.requests += 1
+        if self.error_every and self.requests % self.error_every == 0:
+            return True
+        return self.error_rate > 0 and self.random.random() < self.error_rate
+
+    def metadata(self, kind, context_id):
+        """(body, etag) for a generated playlist, album or artist"""
+        uri = f"spotify:{kind}:{context_id}"
+        version = self.versions[uri]
+        body = {"id": context_id, "uri": uri, "name": f"Fake {kind.title()} {context_id[:6]} v{version}",
+                "images": [{"url": f"https://i.example/{context_id}-{version}.jpg", "width": 640, "height": 640}]}
+        if kind == "playlist":
+            body.update(snapshot_id=f"snapshot-{version}", owner={"display_name": "fake-user"},
+                        tracks={"total": 50 + version})
+        elif kind == "album":
+            body.update(artists=[{"name": "Fake Artist"}], total_tracks=12)
+        return body, f'"{uri}:{version}"'
+
+    def progress(self, now=None):
+        """Seconds into the current track, advancing to the next track(s) when one ends"""
+        now = time.monotonic() if now is None else now
+        position = self.position + (now - self.resumed if self.is_playing else 0.0)
+        duration = self.track_duration / 1000
+        if duration > 0 and position >= duration:
+            ended = int(position // duration)
+            self.track += ended
+            position -= ended * duration
+        self.position, self.resumed = position, now
+        return position
+
+    def seek_track(self, track):
+        self.progress()
+        self.track = track
+        self.position = 0.0
+
+    def item(self, track, base):
+        """Track object; two tracks per album, art served by this server"""
+        album = track // 2
+        return {"id": f"{track:022d}", "name": f"Fake Track {track}", "uri": f"spotify:track:{track:022d}",
+                "duration_ms": self.track_duration, "artists": [{"name": "Fake Artist"}],
+                "album": {"id": f"{album:022d}", "name": f"Fake Album {album}",
+                          "images": [{"url": f"{base}/_art/{album}.jpg?size={size}", "width": size, "height": size}
+                                     for size in (640, 300, 64)]}}
+
+    def player(self, base=""):
+        device = next((d for d in self.devices if d["is_active"]), None)
+        if device is None:
+            return None
+        progress = self.progress()
+        return {
+            "device": device,
+            "is_playing": self.is_playing,
+            "progress_ms": int(progress * 1000),
+            "shuffle_state": False,
+            "repeat_state": "off",
+            "currently_playing_type": "track",
+            "item": self.item(self.track, base),
+        }
+
+    def queue(self, base="", length=20):
+        self.progress()
+        return {"currently_playing": self.item(self.track, base),
+                "queue": [self.item(self.track + offset, base) for offset in range(1, length + 1)]}
+
+
+class FakeSpotifyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None  # Set on the server-specific subclass
+
+    def setup(self):
+        super().setup()
+        with self.state.lock:
+            self.state.connections += 1
+            self.connection_id = self.state.connections
+        self.fresh = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body=None, headers=None):
+        data = b"" if body is None else json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        if data:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+
+    def _error(self, status, message):
+        headers = {"Retry-After": self.state.retry_after} if status == 429 else None
+        self._reply(status, {"error": {"status": status, "message": message}}, headers)
+
+    def _handle(self, method):
+        arrived = time.monotonic()
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        path, _, query = self.path.partition("?")
+        state = self.state
+
+        if path == "/_stats":
+            with state.lock:
+                state.progress()
+                return self._reply(200, {"log": state.log, "is_playing": state.is_playing,
+                                         "track": state.track, "connections": state.connections,
+                                         "tokens": state.tokens, "context": state.context})
+        if path == "/_reset" and method == "POST":
+            with state.lock:
+                state.log = []
+                state.requests = 0
+                state.started = time.monotonic()
+                state.recent.clear()
+            return self._reply(204)
+        if path == "/_bump" and method == "POST":
+            with state.lock:
+                state.versions[urllib.parse.parse_qs(query)["uri"][0]] += 1
+            return self._reply(204)
+        if path == "/_devices" and method == "PUT":
+            with state.lock:
+                state.devices = json.loads(body or b"[]")
+                if not any(d["is_active"] for d in state.devices):
+                    state.progress()
+                    state.is_playing = False
+            return self._reply(204)
+
+        delay = state.latency + (state.random.uniform(0, state.jitter) if state.jitter else 0)
+        if self.fresh:
+            delay += state.connect_latency
+            self.fresh = False
+        if path == "/api/token":
+            delay += state.token_latency
+        metadata = _METADATA.match(path)
+        if metadata:
+            delay += state.metadata_latency
+        if path.startswith("/_art/"):
+            delay += state.art_latency
+        if delay:
+            time.sleep(delay)
+
+        with state.lock:
+            endpoint = f"{method} {path}"
+            if path == "/api/token" and method == "POST":
+                state.tokens += 1
+                state.log.append({"t": arrived, "endpoint": endpoint, "status": 200,
+                                  "connection": self.connection_id})
+                return self._reply(200, {"access_token": f"fake-access-{state.tokens}", "token_type": "Bearer",
+                                         "expires_in": state.token_expires_in,
+                                         "refresh_token": "fake-refresh-token"})
+            if method == "HEAD":
+                state.log.append({"t": arrived, "endpoint": endpoint, "status": 404,
+                                  "connection": self.connection_id})
+                return self._reply(404)
+            if path.startswith("/_art/") and method == "GET":
+                state.log.append({"t": arrived, "endpoint": "GET /_art", "status": 200,
+                                  "connection": self.connection_id})
+                data = bytes(state.art_size)
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return
+            if metadata and method == "GET":
+                body, etag = state.metadata(*metadata.groups())
+                status = 304 if self.headers.get("If-None-Match") == etag else 200
+                state.log.append({"t": arrived, "endpoint": f"GET /v1/{metadata.group(1)}s/{{id}}",
+                                  "status": status, "connection": self.connection_id})
+                return self._reply(status, body if status == 200 else None, {"ETag": etag})
+            throttled = state.throttled(arrived) if path.startswith("/v1/me/player") else 0.0
+            if throttled:
+                state.log.append({"t": arrived, "endpoint": endpoint, "status": 429,
+                                  "connection": self.connection_id})
+                return self._reply(429, {"error": {"status": 429, "message": "API rate limit exceeded"}},
+                                   {"Retry-After": max(1, math.ceil(throttled))})
+            failed = path.startswith("/v1/me/player") and state.should_fail()
+            status = state.error_status if failed else self._route(method, path, urllib.parse.parse_qs(query), body)
+            state.log.append({"t": arrived, "endpoint": endpoint, "status": status,
+                              "connection": self.connection_id})
+            if failed:
+                return self._error(status, "Injected failure")
+            if status == 200 and path == "/v1/me/player/devices":
+                return self._reply(200, {"devices": state.devices})
+            base = f"http://{self.headers.get('Host', '127.0.0.1')}"
+            if status == 200 and path == "/v1/me/player":
+                player = state.player(base)
+                return self._reply(200, player) if player else self._reply(204)
+            if status == 200 and path == "/v1/me/player/queue":
+                return self._reply(200, state.queue(base))
+            if status == 404:
+                return self._error(404, "Player command failed: No active device found")
+            if status == 405:
+                return self._error(405, "Method not allowed")
+            return self._reply(status)
+
+    def _route(self, method, path, params, body=b""):
+        """Apply a player command to the fake state; returns the HTTP status"""
+        state = self.state
+        routes = {
+            ("GET", "/v1/me/player"): 200,
+            ("GET", "/v1/me/player/devices"): 200,
+            ("GET", "/v1/me/player/queue"): 200,
+            ("PUT", "/v1/me/player/play"): 204,
+            ("PUT", "/v1/me/player/pause"): 204,
+            ("POST", "/v1/me/player/next"): 204,
+            ("POST", "/v1/me/player/previous"): 204,
+        }
+        status = routes.get((method, path))
+        if status is None:
+            return 404 if method == "GET" else 405
+        if status == 204 and "device_id" in params:
+            target = next((d for d in state.devices if d["id"] == params["device_id"][0]), None)
+            if target is None:
+                return 404
+            for device in state.devices:
+                device["is_active"] = device is target
+        if status == 204 and not any(d["is_active"] for d in state.devices):
+            return 404
+        if path.endswith("/play"):
+            state.progress()
+            state.is_playing = True
+            context = json.loads(body).get("context_uri") if body else None
+            if context:
+                state.context = context
+                state.seek_track(0)
+        elif path.endswith("/pause"):
+            state.progress()
+            state.is_playing = False
+        elif path.endswith("/next"):
+            state.seek_track(state.track + 1)
+        elif path.endswith("/previous"):
+            state.seek_track(state.track - 1)
+        return status
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_HEAD(self):
+        self._handle("HEAD")
+
+
+def make_server(host="127.0.0.1", port=0, **settings):
+    """Create (but don't start) a ThreadingHTTPServer serving a fresh FakeSpotifyState"""
+    state = FakeSpotifyState(**settings)
+    handler = type("Handler", (FakeSpotifyHandler,), {"state": state, "timeout": state.idle_timeout or None})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+
+class FakeSpotifyServer:
+    """Runs the fake API in a thread or in a child process (so its CPU isn't billed to the monitor)"""
+
+    def __init__(self, in_process=False, **settings):
+        self.in_process = in_process
+        self.settings = settings
+        self.port = None
+        self._server = None
+        self._process = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        if self.in_process:
+            self._server = make_server(**self.settings)
+            self.port = self._server.server_address[1]
+            Thread(target=self._server.serve_forever, daemon=True).start()
+            return self
+
+        args = [sys.executable, "-m", "bench.fake_spotify_api", "--port", "0"]
+        for name, value in self.settings.items():
+            args += [f"--{name.replace('_', '-')}", str(value)]
+        self._process = subprocess.Popen(args, stdout=subprocess.PIPE, text=True)
+        line = self._process.stdout.readline().split()
+        if not line or line[0] != "PORT":
+            self.stop()
+            raise RuntimeError("fake Spotify API failed to start")
+        self.port = int(line[1])
+        return self
+
+    def stats(self):
+        with urllib.request.urlopen(self.url + "/_stats") as response:
+            return json.loads(response.read())
+
+    def set_devices(self, devices):
+        request = urllib.request.Request(self.url + "/_devices", data=json.dumps(devices).encode(), method="PUT")
+        urllib.request.urlopen(request).close()
+
+    def bump(self, uri):
+        """Change a context so its ETag and snapshot_id no longer match"""
+        request = urllib.request.Request(self.url + "/_bump?" + urllib.parse.urlencode({"uri": uri}), method="POST")
+        urllib.request.urlopen(request).close()
+
+    def reset(self):
+        request = urllib.request.Request(self.url + "/_reset", method="POST")
+        urllib.request.urlopen(request).close()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait(timeout=5)
+            self._process = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8999)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, 0..jitter seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of an injected failure")
+    parser.add_argument("--error-every", type=int, default=0, help="fail every Nth player request")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After for injected 429s")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--connect-latency", type=float, default=0.0, help="extra delay on a new connection")
+    parser.add_argument("--idle-timeout", type=float, default=0.0, help="close idle connections (0 = never)")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="delay of POST /api/token")
+    parser.add_argument("--token-expires-in", type=int, default=3600, help="lifetime of issued tokens")
+    parser.add_argument("--throttle-period", type=float, default=0.0, help="seconds between scheduled 429 windows")
+    parser.add_argument("--throttle-duration", type=float, default=0.0, help="length of each 429 window (s)")
+    parser.add_argument("--max-rate", type=int, default=0, help="player requests per second before 429s")
+    parser.add_argument("--metadata-latency", type=float, default=0.0, help="delay of playlist/album/artist lookups")
+    parser.add_argument("--track-duration", type=int, default=180000, help="length of every track, ms")
+    parser.add_argument("--art-latency", type=float, default=0.0, help="delay of album art downloads")
+    parser.add_argument("--art-size", type=int, default=40000, help="bytes per album art image")
+    args = parser.parse_args()
+
+    server = make_server(port=args.port, latency=args.latency, jitter=args.jitter,
+                         error_rate=args.error_rate, error_every=args.error_every,
+                         error_status=args.error_status, retry_after=args.retry_after, seed=args.seed,
+                         connect_latency=args.connect_latency, idle_timeout=args.idle_timeout,
+                         token_latency=args.token_latency, token_expires_in=args.token_expires_in,
+                         throttle_period=args.throttle_period, throttle_duration=args.throttle_duration,
+                         max_rate=args.max_rate, metadata_latency=args.metadata_latency,
+                         track_duration=args.track_duration, art_latency=args.art_latency,
+                         art_size=args.art_size)
+    print(f"PORT {server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
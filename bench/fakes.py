@@ -0,0 +1,105 @@
+"""Scripted game memory and a fake Spotify window for the offline benchmarks"""
+import random
+import time
+
+from memory_source import FakeMemorySource
+
+
+USER_RADIO = 12
+
+
+class ScriptedMemorySource(FakeMemorySource):
+    """Fake game memory that plays back a timed script of field writes
+
+    events is a list of (seconds_from_start, {field: value}); writes become
+    visible to the first read at or after their scheduled time, exactly as a
+    real memory change would.
+    """
+
+    def __init__(self, fields, events, clock=time.monotonic):
+        super().__init__(fields)
+        self.events = sorted(events, key=lambda event: event[0])
+        self.clock = clock
+        self.started = None
+        self._next = 0
+
+    def start(self):
+        self.started = self.clock()
+        self._next = 0
+
+    @property
+    def finished(self):
+        return self.started is not None and self._next >= len(self.events)
+
+    def read_snapshot(self):
+        if self.started is not None:
+            elapsed = self.clock() - self.started
+            while self._next < len(self.events) and self.events[self._next][0] <= elapsed:
+                for name, value in self.events[self._next][1].items():
+                    self.set(name, value)
+                self._next += 1
+        return super().read_snapshot()
+
+
+def gameplay_script(duration, seed=0, cycle_step=0.05):
+    """A deterministic drive: walk, get in, tune to User Radio, cycle stations, get out, repeat"""
+    rng = random.Random(seed)
+    events = [(0.0, {"vehicle_status": 0, "radio_station": 0})]
+    t = 0.0
+
+    def at(delay, **values):
+        nonlocal t
+        t += delay
+        events.append((t, values))
+
+    while t < duration:
+        at(rng.uniform(1.0, 2.0), vehicle_status=1, radio_station=rng.choice((1, 3, 5)))
+        at(rng.uniform(0.5, 1.0), radio_station=USER_RADIO)            # play
+        at(rng.uniform(1.0, 2.0), radio_station=0)                     # pause
+        for station in (10, 11, USER_RADIO, 13, 0):                    # cycle past User Radio quickly
+            at(cycle_step, radio_station=station)
+        at(rng.uniform(0.5, 1.0), radio_station=USER_RADIO)            # play
+        at(rng.uniform(1.0, 2.0), vehicle_status=0)                    # leave the car -> pause
+    return events
+
+
+def expected_transitions(events, hysteresis):
+    """User Radio on/off flips the dispatcher should send: (time, is_user_radio) pairs
+
+    Mirrors the monitor's rule (in vehicle and station == 12) and drops flips
+    that revert within the hysteresis window.
+    """
+    flips = []
+    in_vehicle, station, active = False, 0, False
+    for t, values in events:
+        in_vehicle = values.get("vehicle_status", int(in_vehicle)) > 0
+        station = values.get("radio_station", station)
+        now_active = in_vehicle and station == USER_RADIO
+        if now_active != active:
+            flips.append((t, now_active))
+            active = now_active
+    return settle(flips, hysteresis)
+
+
+def settle(flips, hysteresis):
+    """Drop (time, state) flips that revert within the hysteresis window, like the dispatcher"""
+    settled, committed = [], False
+    for index, (t, state) in enumerate(flips):
+        held = flips[index + 1][0] - t if index + 1 < len(flips) else float("inf")
+        if held >= hysteresis and state != committed:
+            settled.append((t, state))
+            committed = state
+    return settled
+
+
+class FakeSpotifyWindow:
+    """Records pywinauto-style keystrokes with monotonic timestamps"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.keystrokes = []
+
+    def send_keystrokes(self, keys):
+        if self.latency:
+            time.sleep(self.latency)
+        self.keystrokes.append((time.monotonic(), keys))
@@ -0,0 +1,269 @@
+"""Offline end-to-end benchmark for GTARadioMonitor
+
+Drives the real monitor loop, dispatcher and Spotify backend against scripted
+game memory and either a local fake Spotify Web API (Method A, run in a child
+process) or a fake Spotify window (Method B). No Windows, GTA SA, network or
+Spotify account needed. Reports:
+  - detection latency (memory change -> monitor notices) percentiles
+  - end-to-end latency (memory change -> play/pause call completed) percentiles
+  - API calls / keystrokes per User Radio transition
+  - CPU seconds per hour of simulated play
+  - hotkey throughput and the commands it produced
+
+Run from the repository root:
+    python -m bench.run --method api --duration 30 --latency 0.08 --json bench_output.json
+"""
+import argparse
+import configparser
+import contextlib
+import io
+import json
+import subprocess
+import sys
+import time
+from threading import Thread
+
+import logs
+from main import GTARadioMonitor
+from metrics import Metrics
+from processes import FakeProcessEnumerator
+from spotify_client import InstrumentedSpotify
+from spotify_window import SpotifyWindowIndex
+from bench.fakes import ScriptedMemorySource, FakeSpotifyWindow, gameplay_script, expected_transitions
+from bench.fake_spotify_api import FakeSpotifyServer
+
+
+SKIP_COMMANDS = ("POST /v1/me/player/next", "POST /v1/me/player/previous")
+
+
+class RecordingController:
+    """Wraps the monitor's Spotify backend and timestamps completed play/pause calls"""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.completed = []
+
+    def play(self, context=None):
+        self.inner.play(context)
+        self.completed.append((time.monotonic(), True))
+
+    def pause(self):
+        self.inner.pause()
+        self.completed.append((time.monotonic(), False))
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+
+def percentiles(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def pick(pct):
+        return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+    return {"p50": pick(50) * 1000, "p95": pick(95) * 1000, "p99": pick(99) * 1000,
+            "max": ordered[-1] * 1000, "n": len(ordered)}
+
+
+def match_latencies(expected, observed, origin):
+    """Delay from each expected (t, state) to the first later observation with that state"""
+    latencies, cursor = [], 0
+    for t, state in expected:
+        scheduled = origin + t
+        while cursor < len(observed) and (observed[cursor][0] < scheduled or observed[cursor][1] != state):
+            cursor += 1
+        if cursor == len(observed):
+            break
+        latencies.append(observed[cursor][0] - scheduled)
+        cursor += 1
+    return latencies
+
+
+def load_config(path, hysteresis):
+    config = configparser.ConfigParser()
+    config.read(path)
+    if hysteresis is not None:
+        if not config.has_section("dispatcher"):
+            config.add_section("dispatcher")
+        config.set("dispatcher", "hysteresis", str(hysteresis))
+    # Background sync would add unrelated GETs to the call counts
+    if not config.has_section("spotify_api"):
+        config.add_section("spotify_api")
+    config.set("spotify_api", "playback_sync_interval", "0")
+    return config
+
+
+def build_monitor(args, config, events, server, window):
+    memory = ScriptedMemorySource([], events)
+    monitor = GTARadioMonitor(use_pywinauto=args.method == "pywinauto", memory_source=memory,
+                              config=config, metrics=Metrics())
+    memory.set_fields(monitor.watched_fields())
+
+    if args.method == "api":
+        client = InstrumentedSpotify(auth="bench-token", metrics=monitor.metrics)
+        client.prefix = server.url + "/v1/"
+        monitor.backend.use_client(client)
+    else:
+        backend = monitor.backend
+        backend.windows = SpotifyWindowIndex(FakeProcessEnumerator(["Spotify.exe"]),
+                                             connect=lambda pid: window, refresh_interval=0)
+        backend.enabled = backend.windows.get() is not None
+
+    detections = []
+    activated, deactivated = monitor.on_user_radio_activated, monitor.on_user_radio_deactivated
+
+    def on_activated():
+        detections.append((time.monotonic(), True))
+        activated()
+
+    def on_deactivated():
+        detections.append((time.monotonic(), False))
+        deactivated()
+
+    monitor.on_user_radio_activated = on_activated
+    monitor.on_user_radio_deactivated = on_deactivated
+    monitor.dispatcher.controller = RecordingController(monitor.dispatcher.controller)
+    return monitor, memory, detections
+
+
+def run_scenario(monitor, memory):
+    """Play the whole script through the monitor; returns (cpu seconds, wall seconds)"""
+    monitor.running.set()
+    monitor.dispatcher.start()
+    thread = Thread(target=monitor.monitor_loop, daemon=True)
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    memory.start()
+    thread.start()
+    while not memory.finished:
+        time.sleep(0.05)
+    time.sleep(1.0)  # Let the last transition settle
+    monitor.dispatcher.wait_idle(timeout=10)
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    monitor.running.clear()
+    monitor.scheduler.wake()
+    thread.join(timeout=2)
+    return cpu, wall
+
+
+def run_hotkeys(monitor, presses, burst):
+    """Press RIGHT/LEFT in bursts while User Radio is on; returns press rate and commands issued"""
+    monitor.is_user_radio = True
+    monitor.dispatcher.submit("play")
+    monitor.dispatcher.wait_idle(timeout=10)
+    issued_before = dict(monitor.dispatcher.issued)
+    skipped_before = monitor.dispatcher.tracks_skipped
+
+    elapsed = 0.0
+    for index in range(0, presses, burst):
+        start = time.perf_counter()
+        for offset in range(min(burst, presses - index)):
+            handler = monitor._on_left_arrow_pressed if offset % 4 == 3 else monitor._on_right_arrow_pressed
+            handler()
+        elapsed += time.perf_counter() - start
+        monitor.dispatcher.wait_idle(timeout=10)
+
+    issued = {k: monitor.dispatcher.issued[k] - issued_before[k] for k in ("next", "previous")}
+    return {"presses": presses, "presses_per_second": presses / elapsed if elapsed else None,
+            "skip_commands": issued["next"] + issued["previous"],
+            "tracks_skipped": monitor.dispatcher.tracks_skipped - skipped_before}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--method", choices=("api", "pywinauto"), default="api")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of scripted gameplay")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--config", default="config.ini")
+    parser.add_argument("--hysteresis", type=float, default=None, help="override [dispatcher] hysteresis")
+    parser.add_argument("--latency", type=float, default=0.08, help="fake API latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="fake API latency jitter (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fake API failure probability")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--hotkey-presses", type=int, default=200)
+    parser.add_argument("--hotkey-burst", type=int, default=5)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+    logs.configure(console=False)  # Keep monitor chatter out of the report
+
+    config = load_config(args.config, args.hysteresis)
+    hysteresis = config.getfloat("dispatcher", "hysteresis", fallback=0.2)
+    events = gameplay_script(args.duration, seed=args.seed)
+    expected = expected_transitions(events, hysteresis)
+
+    server = window = None
+    if args.method == "api":
+        server = FakeSpotifyServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                   error_status=args.error_status, seed=args.seed).start()
+    else:
+        window = FakeSpotifyWindow(latency=args.latency)
+
+    try:
+        quiet = io.StringIO()
+        with contextlib.redirect_stdout(quiet), contextlib.redirect_stderr(quiet):
+            monitor, memory, detections = build_monitor(args, config, events, server, window)
+            if server:
+                server.reset()
+            cpu, wall = run_scenario(monitor, memory)
+            if server:
+                log = server.stats()["log"]
+                transition_calls = len([e for e in log if e["endpoint"] not in SKIP_COMMANDS])
+                server.reset()
+            else:
+                transition_calls = len(window.keystrokes)
+            completed = list(monitor.dispatcher.controller.completed)
+            hotkeys = run_hotkeys(monitor, args.hotkey_presses, args.hotkey_burst)
+            if server:
+                hotkeys["api_calls"] = len([e for e in server.stats()["log"] if e["endpoint"] in SKIP_COMMANDS])
+            monitor.stop()
+    finally:
+        if server:
+            server.stop()
+
+    results = {
+        "commit": git_commit(),
+        "method": args.method,
+        "settings": {"duration": args.duration, "seed": args.seed, "hysteresis": hysteresis,
+                     "latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate,
+                     "policy": repr(monitor.scheduler.policy)},
+        "transitions_expected": len(expected),
+        "transitions_sent": len(completed),
+        "detection_latency_ms": percentiles(match_latencies(expected, detections, memory.started)),
+        "end_to_end_latency_ms": percentiles(match_latencies(expected, completed, memory.started)),
+        "calls_per_transition": transition_calls / len(expected) if expected else None,
+        "cpu_seconds_per_hour": cpu / wall * 3600,
+        "hotkeys": hotkeys,
+    }
+
+    unit = "API calls" if args.method == "api" else "keystrokes"
+    print(f"Method {args.method}, {args.duration:.0f} s scripted play, commit {results['commit']}")
+    print(f"  transitions: {results['transitions_sent']} sent / {results['transitions_expected']} expected")
+    for name in ("detection_latency_ms", "end_to_end_latency_ms"):
+        stats = results[name]
+        if stats:
+            print(f"  {name:24s} p50={stats['p50']:7.1f}  p95={stats['p95']:7.1f}  "
+                  f"p99={stats['p99']:7.1f}  max={stats['max']:7.1f}  (n={stats['n']})")
+    if results["calls_per_transition"] is not None:
+        print(f"  {unit} per transition:  {results['calls_per_transition']:.2f}")
+    print(f"  CPU per hour of play:    {results['cpu_seconds_per_hour']:.1f} s")
+    print(f"  hotkeys: {hotkeys['presses']} presses at {hotkeys['presses_per_second']:,.0f}/s -> "
+          f"{hotkeys['skip_commands']} skip commands, {hotkeys['tracks_skipped']:+d} tracks"
+          + (f", {hotkeys['api_calls']} API calls" if "api_calls" in hotkeys else ""))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"  results written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Stress test for the hotkey debouncer
+
+Floods GTARadioMonitor's LEFT/RIGHT handlers with synthetic key events from
+several threads and asserts that no thread is started per keypress and that
+the presses reach the controller as the fewest, correctly netted commands.
+
+Run from the repository root:
+    python -m bench.stress_hotkeys --presses 20000 --threads 4
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+
+import logs
+from main import GTARadioMonitor
+from memory_source import FakeMemorySource
+from dispatcher import CommandDispatcher, PLAY
+from bench.bench_dispatcher import CountingController
+
+
+class BatchingController(CountingController):
+    """Fake pywinauto-style backend: any number of skips in one call"""
+
+    def skip(self, count):
+        self._call(f"skip{count:+d}")
+
+
+def make_monitor(controller, skip_window):
+    monitor = GTARadioMonitor(use_pywinauto=True, memory_source=FakeMemorySource([]))
+    monitor.dispatcher = CommandDispatcher(controller, hysteresis=0.0, skip_window=skip_window,
+                                           max_skip_batch=1000000)
+    monitor.dispatcher.start()
+    monitor.is_user_radio = True
+    monitor.dispatcher.submit(PLAY)
+    monitor.dispatcher.wait_idle(timeout=5)
+    controller.calls.clear()
+    return monitor
+
+
+def flood(monitor, presses, threads):
+    """Press keys from `threads` threads at once; returns (net presses, peak thread count, seconds)"""
+    plans = [[random.choice((1, -1)) for _ in range(presses // threads)] for _ in range(threads)]
+    handlers = {1: monitor._on_right_arrow_pressed, -1: monitor._on_left_arrow_pressed}
+    peak = threading.active_count()
+    start_gate = threading.Barrier(threads + 1)
+
+    def press_keys(plan):
+        start_gate.wait()
+        for delta in plan:
+            handlers[delta]()
+
+    workers = [threading.Thread(target=press_keys, args=(plan,)) for plan in plans]
+    for worker in workers:
+        worker.start()
+    start_gate.wait()
+    started = time.perf_counter()
+    while any(worker.is_alive() for worker in workers):
+        peak = max(peak, threading.active_count())
+    elapsed = time.perf_counter() - started
+    for worker in workers:
+        worker.join()
+    return sum(map(sum, plans)), peak, elapsed
+
+
+def run(name, controller, args):
+    monitor = make_monitor(controller, args.skip_window)
+    baseline = threading.active_count()
+    net, peak, elapsed = flood(monitor, args.presses, args.threads)
+    monitor.dispatcher.wait_idle(timeout=10)
+    monitor.dispatcher.stop()
+
+    dispatcher = monitor.dispatcher
+    calls = len(controller.calls)
+    extra_threads = peak - baseline - args.threads
+    ok = (extra_threads <= 0 and dispatcher.tracks_skipped == net
+          and (calls <= 2 if isinstance(controller, BatchingController) else calls <= abs(net) + 2))
+    print(f"  {name:22s} presses={dispatcher.skips.presses:6d}  net={net:+5d}  "
+          f"commands={calls:4d}  extra threads={max(0, extra_threads)}  "
+          f"{dispatcher.skips.presses / elapsed:12,.0f} presses/s  {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--presses", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--skip-window", type=float, default=0.3)
+    args = parser.parse_args()
+    logs.configure(console=False)  # Keep monitor chatter out of the report
+
+    print(f"{args.presses} presses from {args.threads} threads, skip window {args.skip_window * 1000:.0f} ms")
+    results = [
+        run("batching backend", BatchingController(), args),
+        run("one-call-per-track", CountingController(), args),
+    ]
+    ok = all(results)
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
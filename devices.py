@@ -0,0 +1,138 @@
+"""Cached Spotify Connect device list and preferred-device choice for the API backend (Method A)"""
+import time
+from threading import Event, Lock, Thread
+
+from logs import get_logger
+from rate_limit import BACKGROUND_RESERVE, is_rate_limited, retry_after
+
+
+log = get_logger("devices")
+
+
+def parse_list(value):
+    """'Computer, Smartphone' -> ['computer', 'smartphone']"""
+    return [item.strip().lower() for item in (value or "").split(",") if item.strip()]
+
+
+class DeviceRegistry:
+    """Remembers the Spotify device list for `ttl` seconds and picks the device to control
+
+    Devices are ranked by the preference rules: the active device first (if
+    prefer_active), then the first match in prefer_names, then in prefer_types,
+    then the order Spotify lists them. Restricted devices (which reject Web API
+    commands) are never picked. A background refresher re-reads the list every
+    refresh_interval seconds so commands find a current device without asking
+    the API first; with a RateLimiter it only does so when tokens are spare.
+    """
+
+    def __init__(self, fetch, ttl=60.0, refresh_interval=30.0, prefer_active=True, prefer_names=(),
+                 prefer_types=(), clock=time.monotonic, limiter=None):
+        self.fetch = fetch  # Callable returning a devices()-style dict
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.prefer_active = prefer_active
+        self.prefer_names = [name.lower() for name in prefer_names]
+        self.prefer_types = [kind.lower() for kind in prefer_types]
+        self.clock = clock
+        self.limiter = limiter
+        self._lock = Lock()
+        self._devices = None
+        self._device = None
+        self._updated_at = float("-inf")
+        self._stop = Event()
+        self._thread = None
+        self.fetches = 0
+
+    @classmethod
+    def from_config(cls, fetch, config, section="devices", **kwargs):
+        return cls(
+            fetch,
+            ttl=config.getfloat(section, "ttl", fallback=60.0),
+            refresh_interval=config.getfloat(section, "refresh_interval", fallback=30.0),
+            prefer_active=config.getboolean(section, "prefer_active", fallback=True),
+            prefer_names=parse_list(config.get(section, "prefer_names", fallback="")),
+            prefer_types=parse_list(config.get(section, "prefer_types", fallback="")),
+            **kwargs,
+        )
+
+    def rank(self, device, index):
+        """Sort key for a device at `index` in Spotify's list; lower is better"""
+        name = (device.get("name") or "").lower()
+        kind = (device.get("type") or "").lower()
+        return (
+            0 if self.prefer_active and device.get("is_active") else 1,
+            self.prefer_names.index(name) if name in self.prefer_names else len(self.prefer_names),
+            self.prefer_types.index(kind) if kind in self.prefer_types else len(self.prefer_types),
+            index,
+        )
+
+    def choose(self, devices):
+        """Preferred controllable device from a device list, or None"""
+        candidates = [(self.rank(device, index), device) for index, device in enumerate(devices)
+                      if device.get("id") and not device.get("is_restricted")]
+        return min(candidates, key=lambda item: item[0])[1] if candidates else None
+
+    def is_fresh(self):
+        with self._lock:
+            return self._devices is not None and self.clock() - self._updated_at <= self.ttl
+
+    def refresh(self):
+        """Fetch the device list from the API and re-pick the preferred device"""
+        self.fetches += 1
+        devices = (self.fetch() or {}).get("devices") or []
+        device = self.choose(devices)
+        with self._lock:
+            previous = self._device
+            self._devices = devices
+            self._device = device
+            self._updated_at = self.clock()
+        if device and (previous is None or previous["id"] != device["id"]):
+            state = "active" if device.get("is_active") else "not active"
+            log.info(f"  ✓ Using Spotify device: {device.get('name')} ({state})",
+                     event="spotify_device", device=device.get("name"), type=device.get("type"))
+        elif device is None and previous is not None:
+            log.warning("  ⚠ No Spotify devices available\n"
+                        "  → Open Spotify on a device to continue", event="spotify_no_device")
+        return device
+
+    def resolve(self, force=False):
+        """Preferred device from the cache, re-reading the list when stale or forced"""
+        if not force:
+            with self._lock:
+                if self._devices is not None and self.clock() - self._updated_at <= self.ttl:
+                    return self._device
+        return self.refresh()
+
+    def device_id(self):
+        """ID of the preferred device, or None to let Spotify use the active one"""
+        device = self.resolve()
+        return device["id"] if device else None
+
+    def invalidate(self):
+        """Forget the cached list; the next lookup goes to the API"""
+        with self._lock:
+            self._devices = None
+            self._updated_at = float("-inf")
+
+    def start(self):
+        """Start the background refresher"""
+        if self._thread is not None or self.refresh_interval <= 0:
+            return
+        self._stop = Event()
+        self._thread = Thread(target=self._refresh_loop, args=(self._stop,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _refresh_loop(self, stop):
+        while not stop.wait(self.refresh_interval):
+            if self.limiter is not None and self.limiter.try_acquire(BACKGROUND_RESERVE) > 0:
+                continue
+            try:
+                self.refresh()
+            except Exception as e:
+                # Keep the old list; commands re-resolve on a 404 anyway
+                if self.limiter is not None and is_rate_limited(e):
+                    self.limiter.penalize(retry_after(e))
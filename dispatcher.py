@@ -0,0 +1,397 @@
+"""Non-blocking Spotify command dispatcher with play/pause coalescing"""
+import queue
+import time
+from threading import Event, Lock, Thread
+
+from backends import CommandFailed
+from hotkeys import SkipDebouncer
+from logs import get_logger
+from metrics import NULL_METRICS
+from rate_limit import is_rate_limited, retry_after
+
+
+log = get_logger("dispatcher")
+
+
+PLAY = "play"
+PAUSE = "pause"
+NEXT = "next"
+PREVIOUS = "previous"
+
+# When several commands are ready the lowest runs first; lower priorities also
+# keep this many tokens in the rate limiter's bucket for the ones above them
+PRIORITY = {PLAY: 0, PAUSE: 0, NEXT: 1, PREVIOUS: 1}
+RESERVE = {0: 0, 1: 1}
+
+_STOP = object()
+_WAKE = object()  # Tells the worker to look at the skip debouncer
+
+# Outcomes of one controller call
+_DONE = "done"
+_RETRY = "retry"    # Rate limited: keep the command and try again once allowed
+_FAILED = "failed"  # Try again after retry_backoff, up to max_retries times
+_REFUSED = "refused"  # Failed in a way another attempt can't fix
+
+
+class CommandDispatcher:
+    """Runs Spotify commands on a worker thread so the poller and hotkeys never block
+
+    The controller is any object with play(), pause(), next_track() and
+    previous_track(), plus optionally skip(count) to send several skips in one
+    go. Play/pause requests only describe the desired state: the worker waits
+    until that state has held for `hysteresis` seconds and then issues at most
+    one command, so play-then-pause within the window costs nothing. Track
+    skips go through a SkipDebouncer and are sent as a net count once any
+    pending play/pause has settled. A PLAY may name a Spotify context URI,
+    passed to play(context); a PLAY for a different context counts as a change
+    even while playing.
+
+    With a RateLimiter every command takes a token first, in PRIORITY order:
+    play/pause before skips, and skips leave one token for a play/pause.
+    A command refused with HTTP 429 is kept and retried after Retry-After
+    unless a newer request supersedes it (a pause cancels a throttled play, new
+    presses add to a throttled skip count); other failures are retried up to
+    max_retries times, except a CommandFailed with retry=False. A play/pause
+    only counts as sent once the controller returned, so after a failure the
+    same request is sent again instead of being coalesced away.
+
+    listener(command, **details), if given, is called on the worker thread
+    after each play, pause or skip the controller completed (with context= or
+    count=), never for a failed one.
+    """
+
+    def __init__(self, controller, hysteresis=0.2, initial_state=PAUSE, skip_window=0.3,
+                 max_skip_batch=10, clock=time.monotonic, metrics=NULL_METRICS, limiter=None,
+                 max_retries=2, retry_backoff=0.5, listener=None):
+        self.controller = controller
+        self.listener = listener
+        self.hysteresis = hysteresis
+        self.clock = clock
+        self.metrics = metrics
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue = queue.Queue()
+        self._committed = initial_state  # Last play/pause actually sent to the controller
+        self._desired = None             # Pending play/pause waiting out the hysteresis window
+        self._desired_since = 0.0
+        self._desired_trace = None       # (read_at, detected_at) of the change behind _desired
+        self._desired_context = None     # Context URI of a pending PLAY
+        self._committed_context = None   # Context URI of the last PLAY sent
+        self._attempts = 0               # Failed attempts at sending _desired
+        self._retry_at = 0.0             # Don't retry _desired before this
+        self.skips = SkipDebouncer(window=skip_window, clock=clock)
+        self.max_skip_batch = max_skip_batch
+        self._skip_carry = 0             # Net skips still owed after a rate-limited attempt
+        self._blocked_until = 0.0        # Retry-After without a limiter
+        self._throttled_until = None     # Set when this pass had to wait for the limiter
+        self._pending = 0
+        self._lock = Lock()
+        self._idle = Event()
+        self._idle.set()
+        self._thread = None
+        self.issued = {PLAY: 0, PAUSE: 0, NEXT: 0, PREVIOUS: 0}
+        self.requested = 0      # Play/pause requests received
+        self.tracks_skipped = 0  # Net tracks moved by the issued skip commands
+
+    @property
+    def coalesced(self):
+        """Play/pause requests that were merged away instead of being sent"""
+        return self.requested - self.issued[PLAY] - self.issued[PAUSE]
+
+    @property
+    def state(self):
+        """PLAY or PAUSE: the pending play/pause if there is one, else the last one sent"""
+        desired = self._desired
+        return self._committed if desired is None else desired
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2):
+        if self._thread is None:
+            return
+        self._queue.put((_STOP, None, None))
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def submit(self, command, trace=None, context=None):
+        """Queue a command; never blocks on the controller
+
+        trace is an optional (memory_read_at, detected_at) pair of clock()
+        timestamps used for end-to-end latency metrics; context is the Spotify
+        context URI a PLAY should start (None resumes whatever was playing).
+        """
+        with self._lock:
+            self._pending += 1
+            self._idle.clear()
+        if command in (NEXT, PREVIOUS):
+            # Timestamp the press on the caller's thread; the worker only collects it
+            self.skips.press(1 if command == NEXT else -1)
+            command = _WAKE
+        self._queue.put((command, trace, context))
+
+    def wait_idle(self, timeout=None):
+        """Block until every submitted command has been issued or coalesced away"""
+        return self._idle.wait(timeout)
+
+    def _run(self):
+        while True:
+            try:
+                command, trace, context = self._queue.get(timeout=self._next_timeout())
+            except queue.Empty:
+                command, trace, context = None, None, None
+
+            if command is _STOP:
+                break
+            self._step(command, trace, context)
+
+    def run_pending(self):
+        """Handle queued commands and the work due by clock() on the calling thread
+
+        For a dispatcher that was never started and runs on a simulated clock
+        (see traces.replay); returns seconds until more work is due, or None.
+        """
+        while True:
+            try:
+                command, trace, context = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._step(command, trace, context)
+        self._step(None, None, None)
+        return self._next_timeout()
+
+    def _step(self, command, trace, context):
+        """Take one queued command (None after a timeout) and send whatever is due"""
+        if command is not None:
+            if command is not _WAKE:
+                self._accept(command, trace, context)
+            with self._lock:
+                self._pending -= 1
+
+        # Highest priority first; a command waiting for tokens blocks the ones below it
+        self._throttled_until = None
+        self._commit_if_settled()
+        self._flush_skips()
+
+        with self._lock:
+            if self._pending == 0 and not self._has_work():
+                self._idle.set()
+
+    def _has_work(self):
+        return self._desired is not None or self._skip_carry != 0 or self.skips.due() is not None
+
+    def _next_timeout(self):
+        """Seconds until the worker has something to do, None if only a new command can wake it"""
+        now = self.clock()
+        due = []
+        if self._desired is not None:
+            due.append(max(self._settle_time(), self._retry_at))
+        else:
+            # Skips wait for a pending play/pause, so they only count once it settled
+            skip_due = self.skips.due()
+            if skip_due is not None:
+                due.append(skip_due)
+            if self._skip_carry:
+                due.append(now)
+        if not due:
+            return None
+        at = min(due)
+        if self._throttled_until is not None:
+            at = max(at, self._throttled_until)
+        return max(0.0, at - now)
+
+    def _settle_time(self):
+        if self._desired is None:
+            return None
+        return self._desired_since + self.hysteresis
+
+    def _accept(self, command, trace, context=None):
+        if command in (PLAY, PAUSE):
+            self.requested += 1
+            context = context if command == PLAY else None
+            if command != self._desired or context != self._desired_context:
+                self._desired = command
+                self._desired_since = self.clock()
+                self._desired_trace = trace
+                self._desired_context = context
+                self._attempts = 0
+                self._retry_at = 0.0
+        else:
+            log.warning(f"  ⚠ Unknown Spotify command: {command}", event="unknown_command", command=command)
+
+    def _acquire(self, command):
+        """Take a rate-limit token for a command; False (and note how long to wait) if none is free"""
+        if self._throttled_until is not None:
+            # Something more important is already waiting for a token
+            return False
+        wait = self._blocked_until - self.clock()
+        if wait <= 0 and self.limiter is not None:
+            wait = self.limiter.try_acquire(RESERVE[PRIORITY[command]])
+        if wait > 0:
+            self._throttled_until = self.clock() + wait
+            self.metrics.inc("dispatcher_throttled_total", {"command": command})
+            return False
+        return True
+
+    def _commit_if_settled(self):
+        if self._desired is None:
+            return
+        now = self.clock()
+        if now < self._settle_time() or now < self._retry_at:
+            return
+        desired = self._desired
+        context = self._desired_context
+        # The state may have flipped and come back inside the window - then there is nothing to send
+        if desired == self._committed and (desired == PAUSE or context == self._committed_context):
+            self._desired = None
+            self.metrics.inc("dispatcher_coalesced_total")
+            return
+        if not self._acquire(desired):
+            return
+
+        outcome = self._execute(desired, self._desired_trace, context)
+        if outcome == _DONE:
+            self._committed = desired
+            if desired == PLAY:
+                self._committed_context = context
+            self._desired = None
+        elif outcome in (_FAILED, _REFUSED):
+            self._attempts += 1
+            if outcome == _REFUSED or self._attempts > self.max_retries:
+                self._drop(desired, self._attempts)
+                self._desired = None
+            else:
+                self._retry_at = self.clock() + self.retry_backoff * self._attempts
+
+    def _flush_skips(self):
+        if self._desired is not None:
+            # Hold skips until we know whether Spotify ends up playing
+            return
+        count = self._skip_carry + self.skips.collect()
+        self._skip_carry = 0
+        if not count:
+            return
+        if self._committed != PLAY:
+            # Skips only make sense while playing
+            self.skips.discard()
+            return
+        # At most max_skip_batch tracks per command; the rest goes out one skip_window later
+        limit = self.max_skip_batch
+        batch = max(-limit, min(limit, count))
+        self.skips.defer(count - batch)
+        count = batch
+        command = NEXT if count > 0 else PREVIOUS
+        if not self._acquire(command):
+            self._skip_carry = count
+            return
+        self._skip(count)
+
+    def _skip(self, count):
+        """Send a net skip count with as few controller calls as the backend allows"""
+        command = NEXT if count > 0 else PREVIOUS
+        step = 1 if count > 0 else -1
+        started = self.clock()
+        done = 0
+        try:
+            batch = getattr(self.controller, "skip", None)
+            if batch is not None:
+                batch(count)
+                done = count
+                self.issued[command] += 1
+            else:
+                single = self.controller.next_track if count > 0 else self.controller.previous_track
+                for _ in range(abs(count)):
+                    single()
+                    done += step
+                    self.issued[command] += 1
+            self._succeeded()
+            self.metrics.inc("spotify_commands_total", {"command": command})
+            self.metrics.observe("spotify_command_seconds", self.clock() - started, {"command": command})
+            if self.listener is not None:
+                self.listener(command, count=count)
+        except Exception as e:
+            if is_rate_limited(e):
+                # Owe whatever did not go through; presses made meanwhile are added to it
+                remaining = getattr(e, "remaining", None)
+                if remaining is None:
+                    remaining = count - done
+                else:
+                    remaining *= step
+                done = count - remaining
+                self._skip_carry = remaining
+                self._rate_limited(command, e)
+            else:
+                self._report(command, e)
+        finally:
+            self.tracks_skipped += done
+
+    def _execute(self, command, trace=None, context=None):
+        dispatched = self.clock()
+        try:
+            if command == PLAY and context is not None:
+                self.controller.play(context)
+            elif command == PLAY:
+                self.controller.play()
+            elif command == PAUSE:
+                self.controller.pause()
+            self.issued[command] += 1
+            self._succeeded()
+            if self.metrics.enabled:
+                self._record(command, trace, dispatched, self.clock())
+            if self.listener is not None:
+                self.listener(command, context=context)
+            return _DONE
+        except Exception as e:
+            if is_rate_limited(e):
+                self._rate_limited(command, e)
+                return _RETRY
+            return _FAILED if self._report(command, e) else _REFUSED
+
+    def _report(self, command, error):
+        """Log a failed command once; returns whether another attempt could help"""
+        if isinstance(error, CommandFailed):
+            # The backend's message already says what went wrong and what to do
+            log.warning(f"  ⚠ {error}", event=error.event, command=command, error=str(error.__cause__ or error))
+            return error.retry
+        log.warning(f"  ⚠ Spotify command '{command}' failed: {error}",
+                    event="command_failed", command=command, error=str(error))
+        return True
+
+    def _succeeded(self):
+        if self.limiter is not None:
+            self.limiter.succeeded()
+
+    def _rate_limited(self, command, error):
+        wait = retry_after(error)
+        if getattr(error, "local", False):
+            # The backend ran out of tokens for a follow-up request; no 429 was seen
+            self._throttled_until = self.clock() + wait
+            self.metrics.inc("dispatcher_throttled_total", {"command": command})
+            return
+        if self.limiter is not None:
+            self.limiter.penalize(wait)
+        else:
+            self._blocked_until = max(self._blocked_until, self.clock() + wait)
+        self.metrics.inc("dispatcher_retries_total", {"command": command})
+        log.warning(f"  ⏳ Spotify rate limit hit - retrying {command} in {wait:g} s",
+                    event="rate_limited", command=command, retry_after=wait)
+
+    def _drop(self, command, attempts):
+        self.metrics.inc("dispatcher_dropped_total", {"command": command})
+        log.warning(f"  ⚠ Giving up on Spotify command '{command}' after {attempts} attempts",
+                    event="command_dropped", command=command, attempts=attempts)
+
+    def _record(self, command, trace, dispatched, completed):
+        labels = {"command": command}
+        self.metrics.inc("spotify_commands_total", labels)
+        self.metrics.observe("spotify_command_seconds", completed - dispatched, labels)
+        if trace is None:
+            return
+        read_at, detected_at = trace
+        self.metrics.observe("radio_read_to_detect_seconds", detected_at - read_at, labels)
+        self.metrics.observe("radio_detect_to_dispatch_seconds", dispatched - detected_at, labels)
+        self.metrics.observe("radio_end_to_end_seconds", completed - read_at, labels)
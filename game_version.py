@@ -0,0 +1,313 @@
+"""GTA SA build detection and memory-address resolution
+
+The watched addresses differ between builds of gta_sa.exe. On attach the
+monitor hashes the module's PE headers; a resolved address table is cached on
+disk under that hash, so the work below only happens once per build:
+  1. the entry-point bytes tell the known builds apart, and v1.0 US has a
+     built-in address table
+  2. otherwise the module image is read once and searched for byte
+     signatures ([signatures] in config.ini) that reference each address
+
+Signatures are hex bytes with ?? wildcards and the offset of the 4-byte
+absolute address inside a match, e.g. "A0 ?? ?? ?? ?? 3C 0C @ 1". They can be
+derived from a build whose address is known:
+
+    python -m game_version signature gta_sa.dump --address 0x8CB7A5
+"""
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+
+from logs import get_logger
+
+
+log = get_logger("game")
+
+
+HEADER_SIZE = 0x1000
+UNKNOWN = "unknown"
+
+# Builds told apart by their entry-point bytes: (address, expected uint32, version)
+VERSION_CHECKS = (
+    (0x82457C, 0x94BF, "1.0 US"),
+    (0x8245BC, 0x94BF, "1.0 EU"),
+    (0x8252FC, 0x94BF, "1.01 US"),
+    (0x82533C, 0x94BF, "1.01 EU"),
+    (0x85EC4A, 0x94BF, "3.0 Steam"),
+)
+
+# Builds whose addresses are known without scanning
+KNOWN_ADDRESSES = {
+    "1.0 US": {
+        "radio_station": 0x8CB7A5,   # Current radio station
+        "vehicle_status": 0xBA18FC,  # Player in vehicle check (> 0 = in vehicle)
+    },
+}
+
+
+class ModuleHeader:
+    """The PE header fields that identify a build, plus a hash of the whole header page"""
+    __slots__ = ("timestamp", "size_of_image", "image_base", "checksum", "hash")
+
+    def __init__(self, timestamp, size_of_image, image_base, checksum, digest):
+        self.timestamp = timestamp
+        self.size_of_image = size_of_image
+        self.image_base = image_base
+        self.checksum = checksum
+        self.hash = digest
+
+    def __repr__(self):
+        return (f"ModuleHeader(timestamp={self.timestamp:#x}, size_of_image={self.size_of_image:#x}, "
+                f"hash={self.hash})")
+
+
+def parse_pe_header(data):
+    """ModuleHeader from the first page of a mapped PE module; ValueError if it isn't one"""
+    if len(data) < 0x40 or data[:2] != b"MZ":
+        raise ValueError("no MZ header")
+    pe = struct.unpack_from("<I", data, 0x3C)[0]
+    if pe + 0x60 > len(data) or data[pe:pe + 4] != b"PE\0\0":
+        raise ValueError("no PE signature")
+    timestamp = struct.unpack_from("<I", data, pe + 8)[0]
+    optional = pe + 24
+    image_base, = struct.unpack_from("<I", data, optional + 28)
+    size_of_image, size_of_headers, checksum = struct.unpack_from("<III", data, optional + 56)
+    digest = hashlib.sha1(data[:min(len(data), size_of_headers or len(data))]).hexdigest()
+    return ModuleHeader(timestamp, size_of_image, image_base, checksum, digest)
+
+
+class Signature:
+    """A byte pattern with wildcards that locates one absolute address in a module image
+
+    Matching is done with bytes.find on the longest literal run of the pattern
+    (C speed), then the remaining literal runs are compared as slices at each
+    candidate, so the image is never walked byte by byte in Python.
+    """
+
+    def __init__(self, name, pattern, offset=0):
+        self.name = name
+        self.pattern = pattern
+        self.offset = offset
+        tokens = pattern.split()
+        if not tokens:
+            raise ValueError("empty signature")
+        self.length = len(tokens)
+        if offset < 0 or offset + 4 > self.length:
+            raise ValueError(f"address offset {offset} is outside the {self.length}-byte pattern")
+        self.runs = []  # [(position, literal bytes)]
+        start = None
+        for index, token in enumerate(tokens + ["??"]):
+            if token in ("?", "??"):
+                if start is not None:
+                    self.runs.append((start, bytes.fromhex("".join(tokens[start:index]))))
+                    start = None
+            elif start is None:
+                start = index
+        if not self.runs:
+            raise ValueError("signature has no literal bytes")
+        self.anchor = max(self.runs, key=lambda run: len(run[1]))
+        self.others = [run for run in self.runs if run is not self.anchor]
+
+    @classmethod
+    def parse(cls, name, text):
+        """'A0 ?? ?? ?? ?? 3C 0C @ 1' -> Signature (the address offset defaults to 0)"""
+        pattern, _, offset = text.partition("@")
+        return cls(name, pattern.strip(), int(offset.strip() or 0, 0))
+
+    def matches(self, image, start=0):
+        """Offsets of every match in the image"""
+        anchor_at, anchor = self.anchor
+        find = image.find
+        position = find(anchor, start + anchor_at)
+        while position != -1:
+            begin = position - anchor_at
+            if begin + self.length <= len(image) and all(
+                    image[begin + at:begin + at + len(run)] == run for at, run in self.others):
+                yield begin
+            position = find(anchor, position + 1)
+
+    def find(self, image, start=0):
+        """Address referenced by the first match, or None"""
+        for begin in self.matches(image, start):
+            return struct.unpack_from("<I", image, begin + self.offset)[0]
+        return None
+
+    def __repr__(self):
+        return f"Signature({self.name!r}, {self.pattern!r}, offset={self.offset})"
+
+
+def scan(image, signatures):
+    """{name: address} for every signature found in the image"""
+    found = {}
+    for signature in signatures:
+        if signature.name in found:
+            continue  # An earlier pattern for the same field already matched
+        address = signature.find(image)
+        if address is not None:
+            found[signature.name] = address
+    return found
+
+
+def derive_signature(image, address, before=6, after=6):
+    """Shortest unique pattern around a reference to `address`, as signature text, or None"""
+    needle = struct.pack("<I", address)
+    position = image.find(needle)
+    candidates = []
+    while position != -1:
+        candidates.append(position)
+        position = image.find(needle, position + 1)
+    for width in range(2, max(before, after) + 1):
+        for position in candidates:
+            begin = max(0, position - min(width, before))
+            end = min(len(image), position + 4 + min(width, after))
+            tokens = [f"{byte:02X}" for byte in image[begin:end]]
+            tokens[position - begin:position - begin + 4] = ["??"] * 4
+            text = f"{' '.join(tokens)} @ {position - begin}"
+            signature = Signature.parse("derived", text)
+            if len(list(signature.matches(image))) == 1:
+                return text
+    return None
+
+
+class ResolvedAddresses:
+    """Address table for one attached build and where it came from (cache, known, scan or default)"""
+    __slots__ = ("version", "addresses", "source", "module_hash")
+
+    def __init__(self, version, addresses, source, module_hash=None):
+        self.version = version
+        self.addresses = addresses
+        self.source = source
+        self.module_hash = module_hash
+
+    def __repr__(self):
+        return f"ResolvedAddresses({self.version!r}, source={self.source!r}, hash={self.module_hash})"
+
+
+class AddressResolver:
+    """Finds the watched addresses for whichever gta_sa.exe build is attached"""
+
+    def __init__(self, signatures=(), cache_path=".gta_addresses.json", default_version="1.0 US"):
+        self.signatures = list(signatures)
+        self.cache_path = cache_path
+        self.default_version = default_version
+        self._cache = None
+        self.scans = 0
+
+    @classmethod
+    def from_config(cls, config, section="game", signatures_section="signatures"):
+        signatures = []
+        if config.has_section(signatures_section):
+            for key, value in config.items(signatures_section):
+                # Several patterns for one field: radio_station, radio_station.2, ...
+                try:
+                    signatures.append(Signature.parse(key.split(".")[0], value))
+                except ValueError as e:
+                    log.warning(f"⚠ Ignoring [{signatures_section}] {key}: {e}", event="signature_invalid",
+                                signature=key)
+        return cls(signatures, cache_path=config.get(section, "address_cache", fallback=".gta_addresses.json")
+                   .strip() or None)
+
+    @property
+    def fields(self):
+        return tuple(KNOWN_ADDRESSES[self.default_version])
+
+    def _load_cache(self):
+        if self._cache is None:
+            self._cache = {}
+            if self.cache_path and os.path.exists(self.cache_path):
+                try:
+                    with open(self.cache_path, encoding="utf-8") as f:
+                        self._cache = json.load(f)
+                except (OSError, ValueError) as e:
+                    log.warning(f"⚠ Ignoring unreadable address cache {self.cache_path}: {e}",
+                                event="address_cache_invalid", error=str(e))
+        return self._cache
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        temp = self.cache_path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(self._cache, f, indent=1)
+        os.replace(temp, self.cache_path)
+
+    def detect_version(self, source):
+        for address, expected, version in VERSION_CHECKS:
+            try:
+                if struct.unpack("<I", source.read_bytes(address, 4))[0] == expected:
+                    return version
+            except Exception:
+                # Outside this build's image
+                continue
+        return UNKNOWN
+
+    def resolve(self, source):
+        """ResolvedAddresses for the attached game, or None if the backend can't read its module"""
+        module = source.module()
+        if module is None:
+            return None
+        base, size = module
+        header = parse_pe_header(source.read_bytes(base, min(HEADER_SIZE, size)))
+        cache = self._load_cache()
+        entry = cache.get(header.hash)
+        if entry and set(entry["addresses"]) >= set(self.fields):
+            return ResolvedAddresses(entry["version"], entry["addresses"], "cache", header.hash)
+
+        version = self.detect_version(source)
+        if version in KNOWN_ADDRESSES:
+            result = ResolvedAddresses(version, dict(KNOWN_ADDRESSES[version]), "known", header.hash)
+        else:
+            addresses = {}
+            if self.signatures:
+                self.scans += 1
+                addresses = scan(source.read_bytes(base, size), self.signatures)
+            missing = [name for name in self.fields if name not in addresses]
+            if missing:
+                # Nothing reliable to cache; fall back without remembering it
+                fallback = dict(KNOWN_ADDRESSES[self.default_version])
+                fallback.update(addresses)
+                return ResolvedAddresses(version, fallback, "default", header.hash)
+            result = ResolvedAddresses(version, addresses, "scan", header.hash)
+
+        cache[header.hash] = {"version": result.version, "addresses": result.addresses,
+                              "timestamp": header.timestamp, "size_of_image": header.size_of_image,
+                              "source": result.source}
+        try:
+            self._save_cache()
+        except OSError as e:
+            log.warning(f"⚠ Failed to save address cache {self.cache_path}: {e}", event="address_cache_failed",
+                        error=str(e))
+        return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GTA SA module tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    info = commands.add_parser("info", help="print the PE header identity of a module dump")
+    info.add_argument("path")
+    derive = commands.add_parser("signature", help="derive a signature for a known address from a module dump")
+    derive.add_argument("path")
+    derive.add_argument("--address", type=lambda text: int(text, 0), required=True)
+    derive.add_argument("--width", type=int, default=12, help="max bytes of context on each side")
+    args = parser.parse_args(argv)
+
+    with open(args.path, "rb") as f:
+        image = f.read()
+    if args.command == "info":
+        header = parse_pe_header(image[:HEADER_SIZE])
+        print(f"timestamp={header.timestamp:#010x} size_of_image={header.size_of_image:#x} "
+              f"image_base={header.image_base:#x} checksum={header.checksum:#x} hash={header.hash}")
+        return 0
+    text = derive_signature(image, args.address, args.width, args.width)
+    if text is None:
+        print(f"no unique reference to {args.address:#x} found", file=sys.stderr)
+        return 1
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
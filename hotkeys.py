@@ -0,0 +1,66 @@
+"""Timestamp-based debouncing for the track-skip hotkeys"""
+import time
+from collections import deque
+
+
+class SkipDebouncer:
+    """Turns bursts of LEFT/RIGHT presses into a net skip count
+
+    press() only appends (timestamp, delta) to a deque, which is atomic, so
+    hotkey threads never wait on the consumer or start a thread. The consumer calls
+    collect(): the first press of a burst is released immediately, later
+    presses accumulate until no key has been pressed for `window` seconds and
+    are then released as a single net count (RIGHT x5, LEFT x2 -> +3).
+    """
+
+    def __init__(self, window=0.3, clock=time.monotonic):
+        self.window = window
+        self.clock = clock
+        self._events = deque()
+        self._net = 0
+        self._last_press = float("-inf")
+        self.presses = 0
+
+    def press(self, delta):
+        """Record a keypress (+1 next, -1 previous); safe to call from any thread"""
+        self._events.append((self.clock(), delta))
+
+    def collect(self, now=None):
+        """Net skip count that is ready to be sent now (0 if nothing is due)"""
+        if now is None:
+            now = self.clock()
+        ready = 0
+        events = self._events
+        while events:
+            timestamp, delta = events.popleft()
+            self.presses += 1
+            if timestamp - self._last_press >= self.window and self._net == 0:
+                # Leading edge of a new burst: send right away
+                ready += delta
+            else:
+                self._net += delta
+            self._last_press = timestamp
+
+        if self._net and now - self._last_press >= self.window:
+            ready += self._net
+            self._net = 0
+        return ready
+
+    def defer(self, count):
+        """Put back skips the consumer could not send yet; released one window from now"""
+        if count:
+            self._net += count
+            self._last_press = self.clock()
+
+    def due(self):
+        """Monotonic time when the accumulated count will be released, or None"""
+        if self._events:
+            return self.clock()
+        if self._net:
+            return self._last_press + self.window
+        return None
+
+    def discard(self):
+        """Drop everything pending (e.g. Spotify got paused meanwhile)"""
+        self._events.clear()
+        self._net = 0
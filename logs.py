@@ -0,0 +1,284 @@
+"""Queue-backed structured logging: callers only enqueue, one background thread writes
+
+Records carry a level, source, optional event name and free-form fields. The
+writer prints the message to the console, optionally appends the full record to
+a JSON-lines file with size-based rotation, and collapses identical warnings and
+errors repeated within dedup_window seconds into a single "repeated N times" line.
+
+    log = get_logger("monitor")
+    log.warning(f"✗ Error reading game memory: {e}", event="memory_read_failed", retry=2)
+"""
+import atexit
+import json
+import os
+import sys
+import time
+from queue import Queue, Empty, Full
+from threading import Lock, Thread, current_thread
+
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: "debug", INFO: "info", WARNING: "warning", ERROR: "error"}
+LEVELS = {name: level for level, name in LEVEL_NAMES.items()}
+
+_STOP = object()
+
+
+class LogRecord:
+    """One structured log event, built on the calling thread"""
+    __slots__ = ("time", "level", "source", "event", "message", "fields", "thread")
+
+    def __init__(self, level, source, message, event=None, fields=None):
+        self.time = time.time()
+        self.level = level
+        self.source = source
+        self.event = event
+        self.message = message
+        self.fields = fields
+        self.thread = current_thread().name
+
+    @property
+    def key(self):
+        """Identity used to detect repeats"""
+        return (self.level, self.source, self.event, self.message)
+
+    def as_dict(self):
+        data = {
+            "time": round(self.time, 6),
+            "level": LEVEL_NAMES.get(self.level, str(self.level)),
+            "source": self.source,
+            "thread": self.thread,
+            "message": self.message,
+        }
+        if self.event:
+            data["event"] = self.event
+        if self.fields:
+            data.update(self.fields)
+        return data
+
+
+class RotatingJsonFile:
+    """Appends one JSON object per line, rotating to path.1 .. path.<backups> past max_bytes"""
+
+    def __init__(self, path, max_bytes=1048576, backups=3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self.size = self._file.tell()
+
+    def write(self, data):
+        line = json.dumps(data, ensure_ascii=False, default=str) + "\n"
+        size = len(line.encode("utf-8"))
+        if self.max_bytes and self.size and self.size + size > self.max_bytes:
+            self.rotate()
+        self._file.write(line)
+        self.size += size
+
+    def rotate(self):
+        self._file.close()
+        if self.backups > 0:
+            for index in range(self.backups - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        self._file = open(self.path, "w", encoding="utf-8")
+        self.size = 0
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class LogPipeline:
+    """Bounded record queue drained by a daemon writer thread
+
+    emit() never blocks: when the queue is full the record is dropped and
+    counted, and the writer reports the drop count once it catches up.
+    """
+
+    def __init__(self, console=True, level=INFO, path=None, max_bytes=1048576, backups=3,
+                 dedup_window=10.0, queue_size=10000, stream=None):
+        self.console = console
+        self.level = level
+        self.dedup_window = dedup_window
+        self.stream = stream  # None = whatever sys.stdout is at write time
+        self.file = RotatingJsonFile(path, max_bytes, backups) if path else None
+        self.queue = Queue(queue_size)
+        self.dropped = 0
+        self.written = 0
+        self.suppressed = 0
+        self._reported_drops = 0
+        self._recent = {}  # record key -> [first seen, repeats suppressed since]
+        self._thread = None
+        self._lock = Lock()
+
+    def emit(self, record):
+        if self._thread is None:
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            self.dropped += 1
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def flush(self, timeout=2.0):
+        """Wait until everything enqueued so far has been written"""
+        deadline = time.monotonic() + timeout
+        while self._thread is not None and self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def close(self, timeout=2.0):
+        """Write out pending records and stop the writer"""
+        thread = self._thread
+        if thread is not None:
+            try:
+                self.queue.put(_STOP, timeout=timeout)
+            except Full:
+                pass
+            thread.join(timeout)
+            self._thread = None
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def _run(self):
+        while True:
+            try:
+                record = self.queue.get(timeout=1.0)
+            except Empty:
+                self._expire(time.time())
+                continue
+            try:
+                if record is _STOP:
+                    self._expire(float("inf"))
+                    return
+                self._handle(record)
+                if self.queue.empty():
+                    self._expire(time.time())
+                    if self.file:
+                        self.file.flush()
+            except Exception as e:
+                # The writer must survive a bad record or a full disk
+                sys.__stderr__.write(f"log writer error: {e}\n")
+            finally:
+                self.queue.task_done()
+
+    def _handle(self, record):
+        if self.dropped != self._reported_drops:
+            lost, self._reported_drops = self.dropped - self._reported_drops, self.dropped
+            self._write(LogRecord(WARNING, "logs", f"⚠ Log queue full - {lost} records dropped",
+                                  event="log_records_dropped", fields={"count": lost}))
+
+        if record.level >= WARNING and self.dedup_window > 0:
+            seen = self._recent.get(record.key)
+            if seen is not None and record.time - seen[0] < self.dedup_window:
+                seen[1] += 1
+                self.suppressed += 1
+                return
+            if seen is not None:
+                self._report_repeats(record.key, seen)
+            self._recent[record.key] = [record.time, 0]
+        self._write(record)
+
+    def _expire(self, now):
+        """Report and forget repeat counters whose window has passed"""
+        for key, seen in list(self._recent.items()):
+            if now - seen[0] >= self.dedup_window:
+                self._report_repeats(key, seen)
+                del self._recent[key]
+
+    def _report_repeats(self, key, seen):
+        if seen[1]:
+            level, source, event, message = key
+            first_line = message.splitlines()[0] if message else ""
+            self._write(LogRecord(level, source, f"  ↻ {first_line.strip()} (repeated {seen[1]} more times)",
+                                  event="log_repeated", fields={"repeats": seen[1], "repeated_event": event}))
+            seen[1] = 0
+
+    def _write(self, record):
+        if self.console:
+            stream = self.stream or sys.stdout
+            stream.write(record.message + "\n")
+            stream.flush()
+        if self.file:
+            self.file.write(record.as_dict())
+        self.written += 1
+
+
+class Logger:
+    """Per-source front end; every call just builds a record and enqueues it"""
+
+    def __init__(self, source, pipeline=None):
+        self.source = source
+        self._pipeline = pipeline
+
+    @property
+    def pipeline(self):
+        return self._pipeline or _default
+
+    def log(self, level, message, event=None, **fields):
+        pipeline = self.pipeline
+        if level >= pipeline.level:
+            pipeline.emit(LogRecord(level, self.source, message, event, fields or None))
+
+    def debug(self, message, event=None, **fields):
+        self.log(DEBUG, message, event, **fields)
+
+    def info(self, message, event=None, **fields):
+        self.log(INFO, message, event, **fields)
+
+    def warning(self, message, event=None, **fields):
+        self.log(WARNING, message, event, **fields)
+
+    def error(self, message, event=None, **fields):
+        self.log(ERROR, message, event, **fields)
+
+
+_default = LogPipeline()
+
+
+def get_logger(source):
+    """Logger that writes through the shared pipeline (see configure())"""
+    return Logger(source)
+
+
+def configure(config=None, section="logging", **overrides):
+    """Replace the shared pipeline using the [logging] section of config.ini plus keyword overrides"""
+    global _default
+    options = {}
+    if config is not None and config.has_section(section):
+        options = {
+            "console": config.getboolean(section, "console", fallback=True),
+            "level": LEVELS.get(config.get(section, "level", fallback="info").strip().lower(), INFO),
+            "path": config.get(section, "file", fallback="").strip() or None,
+            "max_bytes": config.getint(section, "max_bytes", fallback=1048576),
+            "backups": config.getint(section, "backups", fallback=3),
+            "dedup_window": config.getfloat(section, "dedup_window", fallback=10.0),
+        }
+    options.update(overrides)
+    previous, _default = _default, LogPipeline(**options)
+    previous.close()
+    return _default
+
+
+def shutdown(timeout=2.0):
+    """Flush and stop the shared pipeline's writer"""
+    _default.close(timeout)
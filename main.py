@@ -1,469 +1,469 @@
-import psutil
-import pymem
+import sys
+import startup
+
+# Installed before anything else is imported so --profile-startup can time every import
+PROFILER = startup.StartupProfiler.from_argv(sys.argv) if __name__ == "__main__" else startup.NULL_PROFILER
+
 import time
 import os
-import spotipy
-from spotipy.oauth2 import SpotifyOAuth
+import argparse
+import configparser
 from threading import Thread, Event
-from pywinauto import Application, findwindows
-import keyboard
 from dotenv import load_dotenv
+from polling import PollingPolicy, PollScheduler, ON_FOOT, IN_VEHICLE
+from memory_source import WatchedField, PymemMemorySource
+from game_version import AddressResolver
+from backends import load_backend
+from stations import StationMap, station_name
+from dispatcher import CommandDispatcher, PLAY, PAUSE, NEXT, PREVIOUS
+from metrics import metrics_from_config, MetricsServer, SummaryReporter
+from traces import TraceWriter
+import logs
 
 load_dotenv()
+
+log = logs.get_logger("monitor")
  
 
 
 class GTARadioMonitor:
-    def __init__(self, spotify_client_id=None, spotify_client_secret=None, spotify_redirect_uri="http://localhost:8888/callback", use_pywinauto=True):
+    def __init__(self, spotify_client_id=None, spotify_client_secret=None, spotify_redirect_uri="http://localhost:8888/callback", use_pywinauto=True, polling_policy=None, memory_source=None, config=None, metrics=None, profiler=startup.NULL_PROFILER):
         self.process_name = "gta_sa.exe"
-        self.pm = None
         self.is_user_radio = False
         self.running = Event()
+        self.config = config or configparser.ConfigParser()
+        
+        # Hot-path instrumentation; a no-op object unless [metrics] enabled = true
+        self.metrics = metrics or metrics_from_config(self.config)
+        self.metrics_server = None
+        self.metrics_reporter = None
         
-        # Memory addresses for GTA SA v1.0 US
+        # Adaptive polling: fast after changes / in vehicle, slow on foot, long when detached
+        self.scheduler = PollScheduler(polling_policy)
+        
+        # Memory addresses for GTA SA v1.0 US; replaced on attach if another build is detected
         self.radio_base_address = 0x8CB7A5  # Current radio station address for v1.0
         self.vehicle_check_address = 0xBA18FC  # Player in vehicle check (> 0 = in vehicle, 0 = on foot)
+        self.address_resolver = (AddressResolver.from_config(self.config)
+                                 if self.config.getboolean("game", "detect_version", fallback=True) else None)
+        self.game_version = None
+        
+        # All watched addresses are fetched together once per tick into self.snapshot
+        self.memory = memory_source or PymemMemorySource(self.process_name, self.watched_fields())
+        self.snapshot = None
+        self.read_failures = 0  # Consecutive failed reads on the current handle
+        self.recorder = None  # Optional TraceWriter, see [trace] in config.ini
         
-        # Spotify integration - Method A (Spotify API)
-        self.spotify = None
-        self.spotify_device_id = None
-        self.spotify_enabled = False
+        # Stations Spotify plays for and the context each one starts, see [stations] in config.ini
+        self.stations = StationMap.from_config(self.config, log=log)
+        self.spotify_station = None  # Station the current/last Spotify playback was started for
         
-        # Spotify integration - Method B (pywinauto)
+        # Spotify integration: Method A (Spotify API) or Method B (pywinauto); only the
+        # selected backend's module and dependencies are imported
         self.use_pywinauto = use_pywinauto
-        self.spotify_app = None
-        self.spotify_pywinauto_enabled = False
+        with profiler.phase("load backend"):
+            backend = load_backend("pywinauto" if use_pywinauto else "api")
+        kwargs = {} if use_pywinauto else {"client_id": spotify_client_id, "client_secret": spotify_client_secret,
+                                           "redirect_uri": spotify_redirect_uri}
+        self.backend = backend(self.config, metrics=self.metrics, stations=self.stations, **kwargs)
+        self.backend.track_listener = self._on_track_changed
+        
+        # Spotify calls run on the dispatcher thread so polling never waits on them
+        self.dispatcher = CommandDispatcher(
+            self.backend,
+            hysteresis=self.config.getfloat("dispatcher", "hysteresis", fallback=0.2),
+            skip_window=self.config.getfloat("dispatcher", "skip_window", fallback=0.3),
+            max_skip_batch=self.config.getint("dispatcher", "max_skip_batch", fallback=10),
+            metrics=self.metrics,
+            limiter=self.backend.limiter,
+            listener=self._on_spotify_command,
+        )
         
-        # Keyboard tracking
-        self.last_arrow_left = False
-        self.last_arrow_right = False
+        # Optional push API for overlays and companion tools, see [status_server] in config.ini
+        self.status_server = None
+        self._published = (False, None)  # (in vehicle, station) last pushed to subscribers
+        if self.config.getboolean("status_server", "enabled", fallback=False):
+            # Imported here: asyncio is only needed when the push API is on
+            from status_server import StatusServer
+            self.status_server = StatusServer.from_config(self.config, status=self.status,
+                                                          handler=self.handle_command, metrics=self.metrics)
         
         # Initialize Spotify connection
-        if self.use_pywinauto:
-            self._init_spotify_pywinauto()
-        else:
-            self._init_spotify(spotify_client_id, spotify_client_secret, spotify_redirect_uri)
+        if self.stations.contexts() and not self.backend.supports_contexts:
+            log.warning("⚠ Station playlists in [stations] need Method A (Spotify API)\n"
+                        "  → Mapped stations will resume whatever Spotify last played")
+        with profiler.phase("connect Spotify"):
+            self.backend.connect()
+    
+    def watched_fields(self):
+        """Memory fields read from the game on every tick"""
+        return [
+            WatchedField("radio_station", self.radio_base_address, "B"),
+            WatchedField("vehicle_status", self.vehicle_check_address, "i"),
+        ]
     
-    def _init_spotify_pywinauto(self):
-        """Initialize Spotify connection using pywinauto (Method B)"""
+    def find_gta_process(self):
+        """Find and attach to GTA SA process"""
         try:
-            self.spotify_app = self._get_spotify_app()
-            if self.spotify_app:
-                self.spotify_pywinauto_enabled = True
-                print("✓ Spotify connected successfully (Method B - pywinauto)")
-                print("  → Using window automation to control Spotify")
-            else:
-                print("⚠ Spotify not found")
-                print("  → Make sure Spotify desktop app is open")
-                print("  → Spotify integration will work once Spotify is opened")
+            if self.memory.attach():
+                self.metrics.inc("gta_attaches_total")
+                log.info(f"✓ Successfully attached to GTA SA process ({self.process_name})",
+                         event="game_attached", process=self.process_name)
+                self._resolve_addresses()
+                # Opened only now so the header holds the addresses of this build
+                self._open_recorder()
+                if self.status_server:
+                    self.status_server.publish("game_attached", version=self.game_version)
+                return True
         except Exception as e:
-            print(f"⚠ Failed to initialize Spotify (pywinauto): {e}")
-            print("  → Spotify integration will be disabled")
-    
-    def _get_spotify_app(self):
-        """Get Spotify application window using pywinauto"""
-        for process in psutil.process_iter():
-            if "spotify.exe" in process.name().lower():
-                try:
-                    # We iterate to get rid of helper processes with the same name.
-                    # Only the main Spotify window returns find_window()
-                    spotify = findwindows.find_window(process=process.pid)
-                    app = Application(backend="win32").connect(handle=spotify)
-                    return app.top_window()
-                except Exception:
-                    pass
-        return None
-    
-    def _init_spotify(self, client_id, client_secret, redirect_uri):
-        """Initialize Spotify connection using Spotify API (Method A)"""
-        # Try to get credentials from environment variables if not provided
-        if not client_id:
-            client_id = os.getenv('SPOTIPY_CLIENT_ID')
-        if not client_secret:
-            client_secret = os.getenv('SPOTIPY_CLIENT_SECRET')
-        if not redirect_uri:
-            redirect_uri = os.getenv('SPOTIPY_REDIRECT_URI', 'http://localhost:8888/callback')
-        
-        if not client_id or not client_secret:
-            print("⚠ Spotify credentials not found")
-            print("  → Set SPOTIPY_CLIENT_ID and SPOTIPY_CLIENT_SECRET environment variables")
-            print("  → Spotify integration will be disabled")
+            log.error(f"✗ Failed to attach to GTA SA process: {e}\n"
+                      "  → Make sure you're running as Administrator",
+                      event="game_attach_failed", error=str(e))
+            self.memory.detach()
+        return False
+    
+    def _resolve_addresses(self):
+        """Switch the watched addresses to the ones for the attached game build"""
+        if not self.address_resolver:
             return
         
         try:
-            scope = "user-read-playback-state user-modify-playback-state"
-            auth_manager = SpotifyOAuth(
-                client_id=client_id,
-                client_secret=client_secret,
-                redirect_uri=redirect_uri,
-                scope=scope,
-                cache_path=".spotify_cache"
-            )
-            
-            self.spotify = spotipy.Spotify(auth_manager=auth_manager)
-            
-            # Get available devices
-            devices = self.spotify.devices()
-            if devices['devices']:
-                # Use the first active device, or first available device
-                active_device = next((d for d in devices['devices'] if d['is_active']), None)
-                if active_device:
-                    self.spotify_device_id = active_device['id']
-                    print("✓ Spotify connected successfully")
-                    print(f"  → Active device: {active_device['name']}")
-                else:
-                    self.spotify_device_id = devices['devices'][0]['id']
-                    print("✓ Spotify connected successfully")
-                    print(f"  → Available device: {devices['devices'][0]['name']} (not currently active)")
-                self.spotify_enabled = True
-            else:
-                print("⚠ No Spotify devices found")
-                print("  → Open Spotify on a device (desktop app, web player, or phone)")
-                print("  → Spotify integration will work once a device is available")
+            resolved = self.address_resolver.resolve(self.memory)
         except Exception as e:
-            print(f"⚠ Failed to initialize Spotify: {e}")
-            print("  → Spotify integration will be disabled")
-            print("  → Check your credentials and internet connection")
+            log.warning(f"⚠ Failed to detect GTA SA version: {e}\n"
+                        "  → Using the v1.0 US memory addresses", event="game_version_failed", error=str(e))
+            return
+        if resolved is None:
+            return
         
-    def find_gta_process(self):
-        """Find and attach to GTA SA process"""
-        for proc in psutil.process_iter(['name']):
-            if proc.info['name'].lower() == self.process_name.lower():
-                try:
-                    self.pm = pymem.Pymem(self.process_name)
-                    print(f"✓ Successfully attached to GTA SA process ({self.process_name})")
-                    return True
-                except Exception as e:
-                    print(f"✗ Failed to attach to GTA SA process: {e}")
-                    print("  → Make sure you're running as Administrator")
-                    return False
-        return False
+        self.game_version = resolved.version
+        if resolved.source == "default":
+            log.warning(f"⚠ No memory addresses known for GTA SA version {resolved.version} "
+                        f"(module {resolved.module_hash[:12]})\n"
+                        "  → Using the v1.0 US memory addresses; add [signatures] in config.ini for this build",
+                        event="game_version_unknown", module_hash=resolved.module_hash)
+        else:
+            log.info(f"✓ GTA SA version: {resolved.version} (addresses from {resolved.source})",
+                     event="game_version", version=resolved.version, source=resolved.source)
+        
+        radio = resolved.addresses.get("radio_station", self.radio_base_address)
+        vehicle = resolved.addresses.get("vehicle_status", self.vehicle_check_address)
+        if (radio, vehicle) != (self.radio_base_address, self.vehicle_check_address):
+            self.radio_base_address = radio
+            self.vehicle_check_address = vehicle
+            self.memory.set_fields(self.watched_fields())
     
     def read_radio_station(self):
-        """Read current radio station from memory"""
-        try:
-            station_id = self.pm.read_uchar(self.radio_base_address)
-            return station_id
-        except Exception as e:
-            print(f"✗ Error reading radio station from memory: {e}")
+        """Read current radio station from the latest memory snapshot"""
+        if self.snapshot is None:
             return None
+        return self.snapshot.radio_station
     
     def is_player_in_vehicle(self):
         """Check if player is in a vehicle (> 0 = in vehicle, 0 = on foot)"""
-        if self.pm is None:
-            return False
-        
-        try:
-            vehicle_status = self.pm.read_int(self.vehicle_check_address)
-            return vehicle_status > 0
-        except Exception as e:
-            print(f"✗ Error reading vehicle status from memory: {e}")
+        if self.snapshot is None:
             return False
+        return self.snapshot.vehicle_status > 0
     
     def check_user_radio(self):
-        """Check if User Radio is active AND playing"""
+        """Check if User Radio (or another station mapped in [stations]) is active AND playing"""
         station = self.read_radio_station()
         
         if station is None:
             return False
         
         # When radio is OFF (not playing), the value is typically 0 or 13
-        # When it's playing User Radio, it's 12
-        # So we only return True when it's exactly 12 (User Radio actively playing)
-        return station == 12
+        # When it's playing User Radio, it's 12; 1-11 are the game's own stations
+        # So we only return True for stations Spotify plays for (User Radio unless configured)
+        return self.stations.plays_spotify(station)
     
     def monitor_loop(self):
         """Main monitoring loop"""
-        print("=" * 60)
-        print("GTA San Andreas Radio Monitor with Spotify Integration")
-        print("=" * 60)
-        print("Starting monitor...")
+        log.info("=" * 60 + "\nGTA San Andreas Radio Monitor with Spotify Integration\n" + "=" * 60 +
+                 "\nStarting monitor...")
         
         while self.running.is_set():
-            if self.pm is None:
+            if not self.memory.attached:
                 if not self.find_gta_process():
-                    print("⏳ Waiting for GTA SA to start...")
-                    time.sleep(5)
+                    if self.scheduler.attach_failures == 0:
+                        log.info("⏳ Waiting for GTA SA to start...", event="game_waiting")
+                    # Capped exponential backoff between attach attempts
+                    self.scheduler.attach_failed()
+                    self.scheduler.wait()
                     continue
             
             try:
-                # Only check radio when player is in a vehicle
-                if not self.is_player_in_vehicle():
-                    # If player is on foot and radio was active, deactivate it
-                    if self.is_user_radio:
-                        self.is_user_radio = False
-                        print("🚶 Player exited vehicle (on foot) - User Radio deactivated")
-                        self.on_user_radio_deactivated()
-                    continue  # Skip radio check when on foot
-                
-                # Player is in vehicle, check radio
-                user_radio_active = self.check_user_radio()
-                
-                # Update state and notify on change
-                if user_radio_active != self.is_user_radio:
-                    self.is_user_radio = user_radio_active
-                    if self.is_user_radio:
-                        print("🎵 User Radio activated in vehicle - Starting Spotify")
-                        self.on_user_radio_activated()
-                    else:
-                        print("🔇 User Radio deactivated in vehicle - Pausing Spotify")
-                        self.on_user_radio_deactivated()
+                # One batched read per tick; read_radio_station/is_player_in_vehicle decode from it
+                self.snapshot = self.memory.read_snapshot()
+                self.metrics.inc("gta_memory_reads_total", amount=len(self.memory.ranges))
+                self.read_failures = 0
+                if self.recorder:
+                    self.recorder.record(self.snapshot)
+                self.process_snapshot(self.snapshot)
                 
             except Exception as e:
-                print(f"✗ Error in monitor loop: {e}")
-                print("  → Attempting to reconnect...")
-                self.pm = None
+                self.read_failures += 1
+                retries = self.scheduler.policy.read_retries
+                if self.read_failures <= retries and self.memory.is_alive():
+                    # Game is still running: keep the handle and retry on the fast cadence
+                    self.metrics.inc("gta_memory_read_retries_total")
+                    log.error(f"✗ Error reading game memory (retry {self.read_failures}/{retries}): {e}",
+                              event="memory_read_failed", retry=self.read_failures, error=str(e))
+                    self.scheduler.wait(self.scheduler.policy.fast_interval)
+                    continue
+                log.error(f"✗ Error in monitor loop: {e}\n"
+                          "  → Attempting to reconnect...", event="game_detached", error=str(e))
+                self.metrics.inc("gta_reattaches_total")
+                self.read_failures = 0
+                self.snapshot = None
+                self.memory.detach()
+                if self.status_server:
+                    self._published = (False, None)
+                    self.status_server.publish("game_detached")
             
-            time.sleep(1)  # Check every second
+            self.scheduler.wait()
+        
+        self._close_recorder()
     
-    def on_user_radio_activated(self):
-        """Callback when User Radio is activated - Start Spotify playback"""
-        if self.use_pywinauto:
-            self._start_spotify_pywinauto()
-        else:
-            self._start_spotify_api()
-    
-    def _start_spotify_pywinauto(self):
-        """Start Spotify playback using pywinauto (Method B)"""
-        if not self.spotify_pywinauto_enabled:
-            # Try to reconnect
-            self.spotify_app = self._get_spotify_app()
-            if self.spotify_app:
-                self.spotify_pywinauto_enabled = True
-            else:
-                print("  ⚠ Spotify not found - Make sure Spotify desktop app is open")
-                return
+    def process_snapshot(self, snapshot):
+        """Update vehicle/User Radio state from one memory snapshot and notify on changes"""
+        self.snapshot = snapshot
+        in_vehicle = self.is_player_in_vehicle()
+        self.scheduler.update(IN_VEHICLE if in_vehicle else ON_FOOT)
+        if self.status_server:
+            self._publish_changes(in_vehicle)
         
-        if self.spotify_app:
-            try:
-                # Send Space key to play/pause (will play if paused)
-                self.spotify_app.send_keystrokes("{SPACE}")
-                print("  ✓ Spotify playback started (Method B)")
-            except Exception as e:
-                print(f"  ⚠ Failed to start Spotify playback: {e}")
-                print("  → Trying to reconnect to Spotify...")
-                self.spotify_app = self._get_spotify_app()
-                if self.spotify_app:
-                    self.spotify_pywinauto_enabled = True
+        # Only check radio when player is in a vehicle
+        if not in_vehicle:
+            # If player is on foot and radio was active, deactivate it
+            if self.is_user_radio:
+                self.is_user_radio = False
+                log.info("🚶 Player exited vehicle (on foot) - User Radio deactivated", event="vehicle_exit")
+                self.on_user_radio_deactivated()
         else:
-            print("  ⚠ Spotify app not available")
-    
-    def _start_spotify_api(self):
-        """Start Spotify playback using Spotify API (Method A)"""
-        if self.spotify_enabled and self.spotify:
-            try:
-                # Check if already playing
-                current = self.spotify.current_playback()
-                if current and current['is_playing']:
-                    print("  ✓ Spotify is already playing - No action needed")
-                    return
-                
-                # Refresh device if needed
-                if not self.spotify_device_id:
-                    self._refresh_spotify_device()
-                
-                # Start playback
-                if self.spotify_device_id:
-                    self.spotify.start_playback(device_id=self.spotify_device_id)
-                    print("  ✓ Spotify playback started successfully")
-                else:
-                    # Try without device ID (uses active device)
-                    self.spotify.start_playback()
-                    print("  ✓ Spotify playback started on active device")
-            except spotipy.exceptions.SpotifyException as e:
-                if e.http_status == 404:
-                    print("  ⚠ No active Spotify device found")
-                    print("  → Please open Spotify on a device (desktop app, web player, or phone)")
-                    self._refresh_spotify_device()
-                elif e.http_status == 403:
-                    print("  ⚠ Spotify playback control denied")
-                    print("  → Check your Spotify app permissions")
+            # Player is in vehicle, check radio
+            user_radio_active = self.check_user_radio()
+            station = self.read_radio_station()
+            
+            # Update state and notify on change
+            if user_radio_active != self.is_user_radio:
+                self.is_user_radio = user_radio_active
+                self.scheduler.mark_activity()
+                if self.is_user_radio:
+                    self.spotify_station = station
+                    log.info(f"🎵 {station_name(station)} activated in vehicle - Starting Spotify",
+                             event="user_radio_on", station=station)
+                    self.on_user_radio_activated()
                 else:
-                    print(f"  ⚠ Failed to start Spotify playback: {e}")
-            except Exception as e:
-                print(f"  ⚠ Unexpected error starting Spotify: {e}")
-        else:
-            print("  ⚠ Spotify integration is disabled")
-            print("  → Set SPOTIPY_CLIENT_ID and SPOTIPY_CLIENT_SECRET environment variables")
+                    log.info("🔇 User Radio deactivated in vehicle - Pausing Spotify", event="user_radio_off")
+                    self.on_user_radio_deactivated()
+            elif user_radio_active and station != self.spotify_station:
+                # Tuned from one Spotify station to another: switch context, no pause in between
+                self.spotify_station = station
+                self.scheduler.mark_activity()
+                log.info(f"📻 Switched to {station_name(station)} - Switching Spotify",
+                         event="station_changed", station=station)
+                self.on_user_radio_activated()
     
-    def on_user_radio_deactivated(self):
-        """Callback when User Radio is deactivated - Stop Spotify playback"""
-        if self.use_pywinauto:
-            self._stop_spotify_pywinauto()
-        else:
-            self._stop_spotify_api()
-    
-    def _stop_spotify_pywinauto(self):
-        """Stop Spotify playback using pywinauto (Method B)"""
-        if not self.spotify_pywinauto_enabled:
+    def _publish_changes(self, in_vehicle):
+        """Push vehicle enter/exit and station changes to status subscribers"""
+        station = self.read_radio_station() if in_vehicle else None
+        if (in_vehicle, station) == self._published:
             return
-        
-        if self.spotify_app:
-            try:
-                # Send Space key to pause
-                self.spotify_app.send_keystrokes("{SPACE}")
-                print("  ✓ Spotify playback stopped (Method B)")
-            except Exception as e:
-                print(f"  ⚠ Failed to stop Spotify playback: {e}")
-                print("  → Trying to reconnect to Spotify...")
-                self.spotify_app = self._get_spotify_app()
-                if self.spotify_app:
-                    self.spotify_pywinauto_enabled = True
-        else:
-            print("  ⚠ Spotify app not available")
+        was_in_vehicle, _ = self._published
+        self._published = (in_vehicle, station)
+        if in_vehicle != was_in_vehicle:
+            self.status_server.publish("vehicle_enter" if in_vehicle else "vehicle_exit")
+        if station is not None:
+            self.status_server.publish("station_changed", station=station, name=station_name(station),
+                                       spotify=self.stations.plays_spotify(station))
     
-    def _stop_spotify_api(self):
-        """Stop Spotify playback using Spotify API (Method A)"""
-        if self.spotify_enabled and self.spotify:
-            try:
-                # Check if already paused
-                current = self.spotify.current_playback()
-                if current and not current['is_playing']:
-                    print("  ✓ Spotify is already paused - No action needed")
-                    return
-                
-                # Pause playback instead of stopping (preserves position)
-                if self.spotify_device_id:
-                    self.spotify.pause_playback(device_id=self.spotify_device_id)
-                    print("  ✓ Spotify playback paused successfully")
-                else:
-                    self.spotify.pause_playback()
-                    print("  ✓ Spotify playback paused on active device")
-            except spotipy.exceptions.SpotifyException as e:
-                if e.http_status == 404:
-                    print("  ⚠ No active Spotify device found")
-                    print("  → Spotify may have been closed")
-                    # Try to refresh device list
-                    self._refresh_spotify_device()
-                elif e.http_status == 403:
-                    print("  ⚠ Spotify pause control denied")
-                    print("  → Check your Spotify app permissions")
-                else:
-                    print(f"  ⚠ Failed to pause Spotify playback: {e}")
-            except Exception as e:
-                print(f"  ⚠ Unexpected error pausing Spotify: {e}")
+    def _on_spotify_command(self, command, **details):
+        """Dispatcher listener: push each play, pause and skip the backend completed (never a failed one)"""
+        if self.status_server:
+            if command in (NEXT, PREVIOUS):
+                self.status_server.publish("skip", **details)
+            else:
+                self.status_server.publish(command, station=self.spotify_station, context=details.get("context"))
+    
+    def _on_track_changed(self, track, confirmed):
+        """Now-playing listener: push the new track (confirmed=False right after a skip, from the queue)"""
+        if self.status_server:
+            self.status_server.publish("now_playing", confirmed=confirmed,
+                                       art_path=self.backend.now_playing.art_path(track), **track)
+    
+    def status(self):
+        """Current game and playback state, as sent to new status subscribers"""
+        in_vehicle = self.is_player_in_vehicle()
+        station = self.read_radio_station() if in_vehicle else None
+        return {
+            "attached": self.memory.attached,
+            "game_version": self.game_version,
+            "in_vehicle": in_vehicle,
+            "station": station,
+            "station_name": station_name(station) if station is not None else None,
+            "user_radio": self.is_user_radio,
+            "playing": self.dispatcher.state == PLAY,
+            "backend": self.backend.name,
+            "track": self._current_track(),
+        }
+    
+    def _current_track(self):
+        """Now-playing track with the local path of its cached album art, or None"""
+        now_playing = self.backend.now_playing
+        track = now_playing.current if now_playing else None
+        if track is None:
+            return None
+        return dict(track, art_path=now_playing.art_path(track))
+    
+    def handle_command(self, command):
+        """Control command from a status subscriber (runs on the status server thread)"""
+        if command == "status":
+            return self.status()
+        if command not in ("next", "previous", "toggle"):
+            return {"ok": False, "error": f"unknown command {command!r} (next, previous, toggle, status)"}
+        if not self.is_user_radio:
+            # Same rule as the arrow keys: Spotify is only driven while it is the radio
+            return {"ok": False, "error": "User Radio is not active"}
+        if command == "next":
+            self.dispatcher.submit(NEXT)
+        elif command == "previous":
+            self.dispatcher.submit(PREVIOUS)
+        elif self.dispatcher.state == PLAY:
+            self.dispatcher.submit(PAUSE)
         else:
-            print("  ⚠ Spotify integration is disabled")
-            print("  → Set SPOTIPY_CLIENT_ID and SPOTIPY_CLIENT_SECRET environment variables")
+            self.on_user_radio_activated()
+        return {}
     
-    def _refresh_spotify_device(self):
-        """Refresh the Spotify device list"""
-        if not self.spotify:
+    def _open_recorder(self):
+        """Record the watched fields to a trace file if [trace] record_path is set (a new file when they change)"""
+        path = self.config.get("trace", "record_path", fallback="").strip()
+        if not path:
             return
+        if self.recorder:
+            if self.recorder.fields == self.memory.fields:
+                return
+            self._close_recorder()
         
+        path = time.strftime(path)
         try:
-            devices = self.spotify.devices()
-            if devices['devices']:
-                active_device = next((d for d in devices['devices'] if d['is_active']), None)
-                if active_device:
-                    self.spotify_device_id = active_device['id']
-                    print(f"  ✓ Found active Spotify device: {active_device['name']}")
-                elif devices['devices']:
-                    self.spotify_device_id = devices['devices'][0]['id']
-                    print(f"  ✓ Found available Spotify device: {devices['devices'][0]['name']} (not active)")
-            else:
-                print("  ⚠ No Spotify devices available")
-                print("  → Open Spotify on a device to continue")
-        except Exception as e:
-            print(f"  ⚠ Failed to refresh Spotify devices: {e}")
-    
-    def _navigate_spotify_track(self, direction):
-        """Navigate to next/previous track - sends keys directly to Spotify window without changing focus"""
-        if self.use_pywinauto:
-            # Method B: Use pywinauto send_keystrokes (same as SpotifyGlobal - no focus change needed)
-            if not self.spotify_pywinauto_enabled or not self.spotify_app:
-                # Try to reconnect
-                self.spotify_app = self._get_spotify_app()
-                if self.spotify_app:
-                    self.spotify_pywinauto_enabled = True
-                else:
-                    return
-            
-            if self.spotify_app:
-                try:
-                    if direction == "next":
-                        # Ctrl+Right for next track - using pywinauto format
-                        self.spotify_app.send_keystrokes("^({RIGHT})")
-                        print("  ⏭ Next track")
-                    elif direction == "previous":
-                        # Ctrl+Left for previous track
-                        self.spotify_app.send_keystrokes("^({LEFT})")
-                        print("  ⏮ Previous track")
-                except Exception as e:
-                    print(f"  ⚠ Failed to navigate track: {e}")
-                    # Try reconnecting
-                    self.spotify_app = self._get_spotify_app()
-                    if self.spotify_app:
-                        self.spotify_pywinauto_enabled = True
-        else:
-            # Method A: Use Spotify API (doesn't require focus)
-            if self.spotify_enabled and self.spotify:
-                try:
-                    if direction == "next":
-                        self.spotify.next_track(device_id=self.spotify_device_id)
-                        print("  ⏭ Next track")
-                    elif direction == "previous":
-                        self.spotify.previous_track(device_id=self.spotify_device_id)
-                        print("  ⏮ Previous track")
-                except Exception as e:
-                    print(f"  ⚠ Failed to navigate track: {e}")
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.recorder = TraceWriter(path, self.memory.fields,
+                                        changes_only=self.config.getboolean("trace", "changes_only", fallback=True))
+            log.info(f"✓ Recording game-state trace to {path}", event="trace_recording", path=path)
+        except OSError as e:
+            log.warning(f"⚠ Failed to open trace file {path}: {e}", event="trace_failed", error=str(e))
+    
+    def _close_recorder(self):
+        if self.recorder:
+            self.recorder.close()
+            log.info(f"✓ Trace saved: {self.recorder.path} ({self.recorder.records} records)",
+                     event="trace_saved", records=self.recorder.records)
+            self.recorder = None
+    
+    def on_user_radio_activated(self):
+        """Callback when User Radio is activated - Queue Spotify playback of the station's context"""
+        context = self.stations.context(self.spotify_station) if self.backend.supports_contexts else None
+        self.dispatcher.submit(PLAY, self._trace(), context=context)
+    
+    def _trace(self):
+        """(memory read, change detected) timestamps for end-to-end latency metrics"""
+        if not self.metrics.enabled or self.snapshot is None:
+            return None
+        return (self.snapshot.timestamp, time.monotonic())
+    
+    def on_user_radio_deactivated(self):
+        """Callback when User Radio is deactivated - Queue Spotify pause"""
+        self.dispatcher.submit(PAUSE, self._trace())
     
     def _setup_keyboard_hotkeys(self):
         """Setup keyboard hotkeys for track navigation"""
         try:
+            # Imported here: hooking the keyboard is only needed once the monitor starts
+            import keyboard
+            
             # Register hotkeys for LEFT and RIGHT arrow keys
             keyboard.add_hotkey('left', self._on_left_arrow_pressed)
             keyboard.add_hotkey('right', self._on_right_arrow_pressed)
-            print("✓ Keyboard controls enabled")
-            print("  → LEFT Arrow: Previous track")
-            print("  → RIGHT Arrow: Next track")
+            log.info("✓ Keyboard controls enabled\n"
+                     "  → LEFT Arrow: Previous track\n"
+                     "  → RIGHT Arrow: Next track")
         except Exception as e:
-            print(f"⚠ Failed to setup keyboard hotkeys: {e}")
-            print("  → Keyboard controls will be disabled")
+            log.warning(f"⚠ Failed to setup keyboard hotkeys: {e}\n"
+                        "  → Keyboard controls will be disabled")
     
     def _on_left_arrow_pressed(self):
-        """Handle LEFT arrow key press"""
-        if not self.last_arrow_left:
-            self.last_arrow_left = True
-            if self.is_user_radio:
-                self._navigate_spotify_track("previous")
-            # Reset after a short delay to allow repeated presses
-            Thread(target=self._reset_left_arrow, daemon=True).start()
+        """Handle LEFT arrow key press (debounced and batched by the dispatcher)"""
+        if self.is_user_radio:
+            self.dispatcher.submit(PREVIOUS)
     
     def _on_right_arrow_pressed(self):
-        """Handle RIGHT arrow key press"""
-        if not self.last_arrow_right:
-            self.last_arrow_right = True
-            if self.is_user_radio:
-                self._navigate_spotify_track("next")
-            # Reset after a short delay to allow repeated presses
-            Thread(target=self._reset_right_arrow, daemon=True).start()
-    
-    def _reset_left_arrow(self):
-        """Reset left arrow flag after a delay"""
-        time.sleep(0.3)
-        self.last_arrow_left = False
-    
-    def _reset_right_arrow(self):
-        """Reset right arrow flag after a delay"""
-        time.sleep(0.3)
-        self.last_arrow_right = False
+        """Handle RIGHT arrow key press (debounced and batched by the dispatcher)"""
+        if self.is_user_radio:
+            self.dispatcher.submit(NEXT)
     
     def start(self):
         """Start the monitoring thread"""
         self.running.set()
+        self.dispatcher.start()
+        self._start_metrics()
         monitor_thread = Thread(target=self.monitor_loop, daemon=True)
         monitor_thread.start()
         
+        # Background helpers of the selected backend (window refresh, playback sync, token refresh, ...)
+        self.backend.start()
+        
         # Setup keyboard hotkeys
         self._setup_keyboard_hotkeys()
+        self._start_status_server()
         
         return monitor_thread
     
+    def _start_metrics(self):
+        """Start the optional Prometheus endpoint and periodic summary dump"""
+        if not self.metrics.enabled:
+            return
+        
+        port = self.config.getint("metrics", "port", fallback=0)
+        if port:
+            try:
+                self.metrics_server = MetricsServer(self.metrics, port=port)
+                self.metrics_server.start()
+                log.info(f"✓ Metrics available at http://127.0.0.1:{self.metrics_server.port}/metrics")
+            except OSError as e:
+                log.warning(f"⚠ Failed to start metrics endpoint: {e}")
+                self.metrics_server = None
+        
+        interval = self.config.getfloat("metrics", "summary_interval", fallback=0)
+        if interval > 0:
+            self.metrics_reporter = SummaryReporter(self.metrics, interval)
+            self.metrics_reporter.start()
+    
+    def _start_status_server(self):
+        """Start the optional push API for overlays"""
+        if not self.status_server:
+            return
+        
+        try:
+            self.status_server.start()
+            log.info(f"✓ Status events available at {self.status_server.address} (JSON lines)")
+        except OSError as e:
+            log.warning(f"⚠ Failed to start status server: {e}")
+            self.status_server = None
+    
     def stop(self):
         """Stop monitoring"""
         self.running.clear()
-        print("Stopping GTA SA Radio Monitor...")
+        self.scheduler.wake()
+        self.backend.stop()
+        self.dispatcher.stop()
+        if self.status_server:
+            self.status_server.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        if self.metrics_reporter:
+            self.metrics_reporter.stop()
+        log.info("Stopping GTA SA Radio Monitor...")
     
     def get_status(self):
         """Get current User Radio status"""
@@ -471,27 +471,51 @@ class GTARadioMonitor:
 
 
 if __name__ == "__main__":    
+    parser = argparse.ArgumentParser(description="GTA SA User Radio -> Spotify")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="start up, print import and init timings against [startup] budget_ms, and exit")
+    args = parser.parse_args()
+    
     # Read method selection from .env file
     # SPOTIFY_METHOD can be "pywinauto" (Method B) or "api" (Method A)
     # Defaults to "pywinauto" if not set
     spotify_method = os.getenv('SPOTIFY_METHOD', 'pywinauto').lower()
     use_pywinauto = spotify_method == 'pywinauto'
     
+    # Polling cadence, Spotify API tuning and logging live in config.ini
+    with PROFILER.phase("read config"):
+        config = configparser.ConfigParser()
+        config.read("config.ini")
+        logs.configure(config)
+    
     if use_pywinauto:
-        print("Using Method B: pywinauto (window automation)")
+        log.info("Using Method B: pywinauto (window automation)")
     else:
-        print("Using Method A: Spotify API")
+        log.info("Using Method A: Spotify API")
     
-    monitor = GTARadioMonitor(use_pywinauto=use_pywinauto)
-    thread = monitor.start()
+    monitor = GTARadioMonitor(use_pywinauto=use_pywinauto,
+                              polling_policy=PollingPolicy.from_config(config),
+                              config=config,
+                              profiler=PROFILER)
+    with PROFILER.phase("start monitor"):
+        thread = monitor.start()
+    PROFILER.mark_ready()
+    
+    if args.profile_startup:
+        PROFILER.budget_ms = config.getfloat("startup", "budget_ms", fallback=0)
+        print(PROFILER.report())
+        monitor.stop()
+        thread.join(timeout=2)
+        logs.shutdown()
+        sys.exit(1 if PROFILER.over_budget else 0)
     
     try:
         # Keep the program running
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
-        print("\n" + "=" * 60)
-        print("Shutdown requested by user (Ctrl+C)")
+        log.info("\n" + "=" * 60 + "\nShutdown requested by user (Ctrl+C)")
         monitor.stop()
         thread.join(timeout=2)
-        print("Goodbye!")
\ No newline at end of file
+        log.info("Goodbye!")
+        logs.shutdown()
\ No newline at end of file
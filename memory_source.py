@@ -0,0 +1,224 @@
+"""Batched game-memory reads: watched fields -> coalesced ranges -> compact snapshots"""
+import struct
+import time
+
+from processes import PsutilProcessEnumerator
+
+
+# Fields closer than this many bytes are fetched with a single read_bytes call
+DEFAULT_MAX_GAP = 256
+
+
+class WatchedField:
+    """A named value at a fixed address, decoded with a struct format code"""
+    __slots__ = ("name", "address", "fmt", "size")
+
+    def __init__(self, name, address, fmt):
+        self.name = name
+        self.address = address
+        self.fmt = "<" + fmt.lstrip("<")
+        self.size = struct.calcsize(self.fmt)
+
+    def __repr__(self):
+        return f"WatchedField({self.name!r}, {self.address:#x}, {self.fmt!r})"
+
+
+class ReadRange:
+    """One read_bytes call covering one or more watched fields"""
+    __slots__ = ("start", "size", "fields")
+
+    def __init__(self, start, size, fields):
+        self.start = start
+        self.size = size
+        self.fields = fields  # [(name, struct.Struct, offset), ...]
+
+    def __repr__(self):
+        names = ", ".join(name for name, _, _ in self.fields)
+        return f"ReadRange({self.start:#x}, {self.size}, [{names}])"
+
+
+def coalesce(fields, max_gap=DEFAULT_MAX_GAP):
+    """Group fields into the fewest contiguous ranges, merging neighbours within max_gap bytes"""
+    ranges = []
+    for field in sorted(fields, key=lambda f: f.address):
+        end = field.address + field.size
+        if ranges and field.address - (ranges[-1].start + ranges[-1].size) <= max_gap:
+            current = ranges[-1]
+            current.size = max(current.size, end - current.start)
+        else:
+            current = ReadRange(field.address, field.size, [])
+            ranges.append(current)
+        current.fields.append((field.name, struct.Struct(field.fmt), field.address - current.start))
+    return ranges
+
+
+class Snapshot:
+    """Base class for decoded snapshots; concrete types are built by make_snapshot_type()"""
+    __slots__ = ()
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({values})"
+
+
+def make_snapshot_type(fields, name="GameSnapshot"):
+    """Create a __slots__ class with a timestamp plus one attribute per watched field"""
+    return type(name, (Snapshot,), {"__slots__": ("timestamp",) + tuple(f.name for f in fields)})
+
+
+class MemorySource:
+    """Reads every watched field once per tick with as few cross-process reads as possible
+
+    Backends implement attach(), detach() and read_bytes(address, size).
+    """
+
+    def __init__(self, fields, max_gap=DEFAULT_MAX_GAP):
+        self.set_fields(fields, max_gap)
+        self.attached = False
+        self.read_calls = 0
+
+    def set_fields(self, fields, max_gap=DEFAULT_MAX_GAP):
+        """(Re)build the read plan for a new set of watched fields"""
+        self.fields = tuple(fields)
+        self.ranges = coalesce(self.fields, max_gap)
+        self.snapshot_type = make_snapshot_type(self.fields)
+
+    def attach(self):
+        """Connect to the game; returns True on success, False if it isn't running"""
+        raise NotImplementedError
+
+    def detach(self):
+        """Drop the connection to the game"""
+        self.attached = False
+
+    def is_alive(self):
+        """Whether the attached game process is still running (cheap, no process scan)"""
+        return self.attached
+
+    def read_bytes(self, address, size):
+        raise NotImplementedError
+
+    def module(self):
+        """(base address, image size) of the game's main module, or None if the backend can't tell"""
+        return None
+
+    def read_snapshot(self):
+        """Read and decode all watched fields; raises if the game can't be read"""
+        snapshot = self.snapshot_type()
+        for read_range in self.ranges:
+            data = self.read_bytes(read_range.start, read_range.size)
+            self.read_calls += 1
+            for name, decoder, offset in read_range.fields:
+                setattr(snapshot, name, decoder.unpack_from(data, offset)[0])
+        snapshot.timestamp = time.monotonic()
+        return snapshot
+
+
+class PymemMemorySource(MemorySource):
+    """Reads GTA SA memory through pymem (Windows only)
+
+    The process is opened by the PID found during the scan and pinned by
+    (pid, create_time), so liveness checks never rescan the process list.
+    """
+
+    def __init__(self, process_name, fields, max_gap=DEFAULT_MAX_GAP, enumerator=None):
+        super().__init__(fields, max_gap)
+        self.process_name = process_name
+        self.enumerator = enumerator or PsutilProcessEnumerator()
+        self.process = None
+        self.pm = None
+
+    def attach(self):
+        """Find the game process and open it; raises if it exists but can't be opened"""
+        import pymem
+
+        for proc in self.enumerator.find(self.process_name):
+            pm = pymem.Pymem()
+            pm.open_process_from_id(proc.pid)
+            self.pm = pm
+            self.process = proc
+            self.attached = True
+            return True
+        return False
+
+    def detach(self):
+        if self.pm is not None:
+            try:
+                self.pm.close_process()
+            except Exception:
+                pass
+        self.pm = None
+        self.process = None
+        self.attached = False
+
+    def is_alive(self):
+        return self.attached and self.enumerator.is_alive(*self.process.key)
+
+    def read_bytes(self, address, size):
+        return self.pm.read_bytes(address, size)
+
+    def module(self):
+        import pymem.process
+
+        info = pymem.process.module_from_name(self.pm.process_handle, self.process_name)
+        if info is None:
+            return None
+        return info.lpBaseOfDll, info.SizeOfImage
+
+
+class FakeMemorySource(MemorySource):
+    """In-process memory backend for running and benchmarking the monitor without the game"""
+
+    def __init__(self, fields, max_gap=DEFAULT_MAX_GAP, running=True, image=None, image_base=0x400000):
+        super().__init__(fields, max_gap)
+        self.running = running  # Whether the "game" is up and attachable
+        self.fail_reads = 0     # Fail this many upcoming reads (simulated transient faults)
+        self.image = image      # Optional bytes of a fake gta_sa.exe module mapped at image_base
+        self.image_base = image_base
+
+    def set_fields(self, fields, max_gap=DEFAULT_MAX_GAP):
+        super().set_fields(fields, max_gap)
+        self._by_name = {f.name: f for f in self.fields}
+        self._segments = {r.start: bytearray(r.size) for r in self.ranges}
+
+    def attach(self):
+        self.attached = self.running
+        return self.attached
+
+    def is_alive(self):
+        return self.attached and self.running
+
+    def set(self, name, value):
+        """Write a watched field by name"""
+        field = self._by_name[name]
+        self.write(field.address, field.fmt, value)
+
+    def write(self, address, fmt, value):
+        """Write a value at an address covered by one of the watched ranges"""
+        for start, segment in self._segments.items():
+            if start <= address < start + len(segment):
+                struct.pack_into(fmt, segment, address - start, value)
+                return
+        raise KeyError(f"Address {address:#x} is not covered by any watched field")
+
+    def read_bytes(self, address, size):
+        if not self.running:
+            raise OSError("Could not read memory: process is not running")
+        if self.fail_reads > 0:
+            self.fail_reads -= 1
+            raise OSError(f"Could not read memory at {address:#x} (simulated fault)")
+        segment = self._segments.get(address)
+        if segment is not None and size <= len(segment):
+            return bytes(segment[:size])
+        if self.image is not None and self.image_base <= address and address + size <= self.image_base + len(self.image):
+            offset = address - self.image_base
+            return bytes(self.image[offset:offset + size])
+        raise OSError(f"Could not read memory at {address:#x}")
+
+    def module(self):
+        if self.image is None:
+            return None
+        return self.image_base, len(self.image)
@@ -0,0 +1,177 @@
+"""Disk-cached metadata for the Spotify contexts mapped to radio stations (Method A)"""
+import json
+import os
+import time
+from threading import Event, Lock, Thread
+
+from logs import get_logger
+from rate_limit import BACKGROUND_RESERVE
+
+
+log = get_logger("metadata")
+
+
+# Fields kept per context type; playlists only fetch these instead of the full track list
+PLAYLIST_FIELDS = "name,snapshot_id,uri,owner(display_name),tracks(total),images"
+
+
+def summarize(kind, data):
+    """The few fields the monitor shows for a playlist, album or artist API object"""
+    images = data.get("images") or []
+    summary = {"type": kind, "name": data.get("name"), "image": images[0]["url"] if images else None}
+    if kind == "playlist":
+        summary["owner"] = (data.get("owner") or {}).get("display_name")
+        summary["tracks"] = (data.get("tracks") or {}).get("total")
+        summary["snapshot_id"] = data.get("snapshot_id")
+    elif kind == "album":
+        summary["owner"] = ", ".join(artist["name"] for artist in data.get("artists") or [])
+        summary["tracks"] = data.get("total_tracks")
+    return summary
+
+
+class ContextMetadataCache:
+    """Name, owner, track count and artwork of Spotify contexts, persisted to a JSON file
+
+    Lookups only read memory, so switching stations never waits on the API.
+    prefetch() revalidates entries older than `revalidate_after` seconds on a
+    background thread: with the stored ETag the API answers 304 Not Modified
+    for unchanged contexts, and a playlist whose snapshot_id is unchanged is
+    kept as is. With a RateLimiter the prefetch leaves tokens for commands.
+    """
+
+    def __init__(self, client, path=".spotify_metadata.json", revalidate_after=3600.0, limiter=None,
+                 clock=time.time):
+        self.client = client
+        self.path = path
+        self.revalidate_after = revalidate_after
+        self.limiter = limiter
+        self.clock = clock
+        self._entries = {}
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread = None
+        self.fetched = 0      # 200 responses
+        self.not_modified = 0  # 304 responses or unchanged snapshot_id
+        self.load()
+
+    @classmethod
+    def from_config(cls, client, config, section="stations", **kwargs):
+        return cls(
+            client,
+            path=config.get(section, "metadata_cache", fallback=".spotify_metadata.json").strip() or None,
+            revalidate_after=config.getfloat(section, "metadata_revalidate", fallback=3600.0),
+            **kwargs,
+        )
+
+    def get(self, uri):
+        """Cached summary for a context URI, or None; never touches the network"""
+        with self._lock:
+            return self._entries.get(uri)
+
+    def describe(self, uri):
+        """'playlist "Name"' for log lines, falling back to the URI"""
+        entry = self.get(uri)
+        if not entry or not entry.get("name"):
+            return uri
+        return f"{entry['type']} \"{entry['name']}\""
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning(f"⚠ Ignoring unreadable metadata cache {self.path}: {e}", event="metadata_cache_invalid",
+                        error=str(e))
+            return
+        with self._lock:
+            self._entries = entries
+
+    def save(self):
+        """Write the cache atomically (temp file + rename)"""
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps(self._entries, ensure_ascii=False, indent=1)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp = self.path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(temp, self.path)
+
+    def validate(self, uri):
+        """Revalidate one context against the API; True if the cached entry changed"""
+        _, kind, context_id = uri.split(":")
+        cached = self.get(uri)
+        etag = cached.get("etag") if cached else None
+        params = {"fields": PLAYLIST_FIELDS} if kind == "playlist" else None
+        data, etag = self.client.get_if_changed(f"{kind}s/{context_id}", etag=etag, params=params)
+
+        now = self.clock()
+        if data is not None:
+            summary = summarize(kind, data)
+            # Without a usable ETag, an unchanged snapshot_id still means the playlist is the same
+            unchanged = cached and kind == "playlist" and summary["snapshot_id"] == cached.get("snapshot_id")
+            if not unchanged:
+                summary.update(etag=etag, checked_at=now)
+                with self._lock:
+                    self._entries[uri] = summary
+                self.fetched += 1
+                return True
+        self.not_modified += 1
+        with self._lock:
+            entry = self._entries[uri]
+            entry["checked_at"] = now
+            if etag:
+                entry["etag"] = etag
+        return False
+
+    def stale(self, uris):
+        now = self.clock()
+        with self._lock:
+            return [uri for uri in uris if uri not in self._entries
+                    or now - self._entries[uri].get("checked_at", 0) >= self.revalidate_after]
+
+    def prefetch(self, uris, stop=None):
+        """Revalidate every stale context, then save; returns how many changed"""
+        stop = stop or Event()
+        changed = 0
+        for uri in self.stale(uris):
+            if stop.is_set() or (self.limiter is not None
+                                 and not self.limiter.wait_acquire(BACKGROUND_RESERVE, stop)):
+                break
+            try:
+                changed += self.validate(uri)
+            except Exception as e:
+                log.warning(f"⚠ Failed to fetch Spotify metadata for {uri}: {e}", event="metadata_failed",
+                            uri=uri, error=str(e))
+        try:
+            self.save()
+        except OSError as e:
+            log.warning(f"⚠ Failed to save metadata cache {self.path}: {e}", event="metadata_cache_failed",
+                        error=str(e))
+        return changed
+
+    def start(self, uris):
+        """Prefetch in the background"""
+        if self._thread is not None or not uris:
+            return
+        self._stop = Event()
+        self._thread = Thread(target=self._prefetch_loop, args=(list(uris), self._stop), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _prefetch_loop(self, uris, stop):
+        while not stop.is_set():
+            started = time.monotonic()
+            changed = self.prefetch(uris, stop)
+            log.debug(f"Spotify context metadata checked in {time.monotonic() - started:.2f} s "
+                      f"({changed} updated)", event="metadata_prefetched", updated=changed)
+            if self.revalidate_after <= 0 or stop.wait(self.revalidate_after):
+                return
@@ -0,0 +1,267 @@
+"""Hot-path latency histograms and counters with a Prometheus text export"""
+import time
+from threading import Event, Lock, Thread
+
+from logs import get_logger
+
+
+log = get_logger("metrics")
+
+
+class LatencyHistogram:
+    """Fixed-size HDR-style histogram of durations (microsecond resolution)
+
+    Values are bucketed log-linearly: exact below 32 µs, then 16 buckets per
+    power of two (~6% relative error), up to max_seconds. Recording is O(1)
+    and the bucket array never grows.
+    """
+
+    SUB_BITS = 5
+    SUB_COUNT = 1 << SUB_BITS    # 32
+    HALF_COUNT = SUB_COUNT >> 1  # 16
+
+    def __init__(self, max_seconds=60.0):
+        self.max_value = int(max_seconds * 1e6)
+        self.counts = [0] * (self._index(self.max_value) + 1)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self._lock = Lock()
+
+    @classmethod
+    def _index(cls, value):
+        if value < cls.SUB_COUNT:
+            return value
+        shift = value.bit_length() - cls.SUB_BITS
+        return (shift + 1) * cls.HALF_COUNT + (value >> shift) - cls.HALF_COUNT
+
+    @classmethod
+    def _bucket_value(cls, index):
+        """Upper bound (µs) of the values that land in a bucket"""
+        if index < cls.SUB_COUNT:
+            return index
+        shift = index // cls.HALF_COUNT - 1
+        sub = index % cls.HALF_COUNT + cls.HALF_COUNT
+        return ((sub + 1) << shift) - 1
+
+    def record(self, seconds):
+        value = min(self.max_value, max(0, int(seconds * 1e6)))
+        index = self._index(value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+            if self.min is None or value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, pct):
+        """Value (seconds) at or below which pct percent of the samples fall"""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = max(1, int(round(pct / 100.0 * self.count)))
+            seen = 0
+            for index, bucket in enumerate(self.counts):
+                seen += bucket
+                if seen >= target:
+                    return min(self._bucket_value(index), self.max) / 1e6
+            return self.max / 1e6
+
+    @property
+    def sum(self):
+        return self.total / 1e6
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * len(self.counts)
+            self.count = 0
+            self.total = 0
+            self.min = None
+            self.max = 0
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Metrics:
+    """Registry of counters and latency histograms, keyed by name plus labels"""
+
+    enabled = True
+    QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+    def __init__(self, prefix=""):
+        self.prefix = prefix
+        self._counters = {}
+        self._histograms = {}
+        self._lock = Lock()
+        self.started = time.time()
+
+    def inc(self, name, labels=None, amount=1):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def histogram(self, name, labels=None):
+        key = (name, _label_key(labels))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, LatencyHistogram())
+        return histogram
+
+    def observe(self, name, seconds, labels=None):
+        self.histogram(name, labels).record(seconds)
+
+    def counter(self, name, labels=None):
+        return self._counters.get((name, _label_key(labels)), 0)
+
+    def prometheus(self):
+        """Everything in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+
+        typed = set()
+        for (name, key), value in counters:
+            full = f"{self.prefix}{name}"
+            if full not in typed:
+                lines.append(f"# TYPE {full} counter")
+                typed.add(full)
+            lines.append(f"{full}{_format_labels(key)} {value}")
+
+        for (name, key), histogram in histograms:
+            full = f"{self.prefix}{name}"
+            if full not in typed:
+                lines.append(f"# TYPE {full} summary")
+                typed.add(full)
+            for quantile in self.QUANTILES:
+                value = histogram.percentile(quantile * 100)
+                lines.append(f"{full}{_format_labels(key, [('quantile', quantile)])} {value:.6f}")
+            lines.append(f"{full}_sum{_format_labels(key)} {histogram.sum:.6f}")
+            lines.append(f"{full}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Short human-readable dump for the console"""
+        lines = ["📊 Metrics summary"]
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+        for (name, key), value in counters:
+            lines.append(f"  {name}{_format_labels(key)}: {value}")
+        for (name, key), histogram in histograms:
+            if histogram.count:
+                lines.append(f"  {name}{_format_labels(key)}: n={histogram.count} "
+                             f"p50={histogram.percentile(50) * 1000:.1f}ms "
+                             f"p99={histogram.percentile(99) * 1000:.1f}ms "
+                             f"max={histogram.max / 1000:.1f}ms")
+        return "\n".join(lines)
+
+
+class NullMetrics:
+    """Drop-in for Metrics when instrumentation is disabled; every call is a no-op"""
+
+    enabled = False
+
+    def inc(self, name, labels=None, amount=1):
+        pass
+
+    def observe(self, name, seconds, labels=None):
+        pass
+
+    def counter(self, name, labels=None):
+        return 0
+
+    def prometheus(self):
+        return ""
+
+    def summary(self):
+        return ""
+
+
+NULL_METRICS = NullMetrics()
+
+
+def metrics_from_config(config, section="metrics"):
+    """Metrics registry if [metrics] enabled = true, else the shared no-op instance"""
+    if config.getboolean(section, "enabled", fallback=False):
+        return Metrics()
+    return NULL_METRICS
+
+
+class MetricsServer:
+    """Serves GET /metrics in Prometheus text format on a local port"""
+
+    def __init__(self, metrics, host="127.0.0.1", port=9464):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server = None
+
+    def start(self):
+        # http.server pulls in the email package; only import it when the endpoint is enabled
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class SummaryReporter:
+    """Prints Metrics.summary() every `interval` seconds"""
+
+    def __init__(self, metrics, interval=60.0):
+        self.metrics = metrics
+        self.interval = interval
+        self._stop = Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None or self.interval <= 0:
+            return
+        self._stop = Event()
+        self._thread = Thread(target=self._run, args=(self._stop,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _run(self, stop):
+        while not stop.wait(self.interval):
+            log.info(self.metrics.summary(), event="metrics_summary")
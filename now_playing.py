@@ -0,0 +1,408 @@
+"""Now-playing track info and album art for the API backend (Method A)
+
+NowPlaying follows what Spotify plays with as few current_playback() calls as
+possible and keeps the next queued tracks, with their album art, ready before
+a skip. AlbumArtCache keeps the art on disk, least recently used evicted past
+a size limit, with the most recent images also held in memory.
+"""
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from threading import Event, Lock, Thread
+
+from logs import get_logger
+from metrics import NULL_METRICS
+from rate_limit import BACKGROUND_RESERVE, is_rate_limited, retry_after
+
+
+log = get_logger("now_playing")
+
+MB = 1024 * 1024
+
+
+def track_info(item, art_width=300):
+    """The fields a radio-HUD style display needs from a Spotify track object, or None"""
+    if not item or not item.get("id"):
+        return None
+    album = item.get("album") or {}
+    images = [image for image in album.get("images") or [] if image.get("url")]
+    # Smallest image at least art_width wide, else the largest there is
+    wide = [image for image in images if (image.get("width") or 0) >= art_width]
+    image = (min(wide, key=lambda image: image["width"]) if wide
+             else max(images, key=lambda image: image.get("width") or 0, default=None))
+    return {
+        "id": item["id"],
+        "name": item.get("name"),
+        "artists": ", ".join(artist["name"] for artist in item.get("artists") or []),
+        "album": album.get("name"),
+        "duration_ms": item.get("duration_ms"),
+        "art_url": image["url"] if image else None,
+    }
+
+
+def describe(track):
+    """'Artist - Title' for log lines"""
+    if not track:
+        return "nothing"
+    return f"{track['artists']} - {track['name']}" if track.get("artists") else track["name"]
+
+
+class AlbumArtCache:
+    """Album art images on disk, bounded to max_bytes, least recently used evicted first
+
+    get() only reads memory and disk. The `hot_items` most recently used
+    images stay in memory. Disk recency is the file mtime, touched on every
+    hit, so the LRU order survives restarts. fetch(url) -> bytes downloads
+    an image; it only runs from prefetch(), on a background thread.
+    """
+
+    def __init__(self, directory=".spotify_art", max_bytes=20 * MB, hot_items=16, fetch=None,
+                 metrics=NULL_METRICS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hot_items = hot_items
+        self.fetch = fetch or self._download
+        self.metrics = metrics
+        self._index = OrderedDict()  # key -> size on disk, least recently used first
+        self._hot = OrderedDict()    # key -> bytes, least recently used first
+        self._lock = Lock()
+        self._session = None
+        self.size = 0
+        self.downloads = 0
+        self.load()
+
+    @classmethod
+    def from_config(cls, config, section="now_playing", **kwargs):
+        return cls(
+            directory=config.get(section, "art_cache", fallback=".spotify_art").strip() or ".spotify_art",
+            max_bytes=int(config.getfloat(section, "art_cache_mb", fallback=20.0) * MB),
+            hot_items=config.getint(section, "art_hot_items", fallback=16),
+            **kwargs,
+        )
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".img")
+
+    def load(self):
+        """Index the images already on disk, oldest first"""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        entries = []
+        for name in names:
+            if not name.endswith(".img"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        with self._lock:
+            for _, key, size in sorted(entries):
+                self._index[key] = size
+                self.size += size
+            self._evict()
+
+    def __contains__(self, url):
+        with self._lock:
+            return self.key(url) in self._index
+
+    def get(self, url):
+        """Image bytes from memory or disk, or None; never touches the network"""
+        key = self.key(url)
+        with self._lock:
+            data = self._hot.get(key)
+            if data is not None:
+                self._hot.move_to_end(key)
+                self._index.move_to_end(key)
+                self.metrics.inc("album_art_hits_total", {"tier": "memory"})
+                return data
+            if key not in self._index:
+                self.metrics.inc("album_art_misses_total")
+                return None
+        try:
+            with open(self.path(key), "rb") as f:
+                data = f.read()
+            os.utime(self.path(key))
+        except OSError:
+            with self._lock:
+                self.size -= self._index.pop(key, 0)
+            return None
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+            self._remember(key, data)
+        self.metrics.inc("album_art_hits_total", {"tier": "disk"})
+        return data
+
+    def local_path(self, url):
+        """Absolute path of the cached image file, or None; counts as a use for the LRU order"""
+        key = self.key(url)
+        with self._lock:
+            if key not in self._index:
+                return None
+            self._index.move_to_end(key)
+        path = os.path.abspath(self.path(key))
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.size -= self._index.pop(key, 0)
+                self._hot.pop(key, None)
+            return None
+        return path
+
+    def put(self, url, data):
+        key = self.key(url)
+        os.makedirs(self.directory, exist_ok=True)
+        temp = self.path(key) + ".tmp"
+        with open(temp, "wb") as f:
+            f.write(data)
+        os.replace(temp, self.path(key))
+        with self._lock:
+            self.size += len(data) - self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._remember(key, data)
+            self._evict()
+
+    def prefetch(self, url):
+        """Download an image unless it is cached; True if it was downloaded"""
+        if not url or url in self:
+            return False
+        data = self.fetch(url)
+        self.downloads += 1
+        self.put(url, data)
+        return True
+
+    def _remember(self, key, data):
+        self._hot[key] = data
+        self._hot.move_to_end(key)
+        while len(self._hot) > self.hot_items:
+            self._hot.popitem(last=False)
+
+    def _evict(self):
+        # Keeps at least the newest image, however large
+        while self.size > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self._hot.pop(key, None)
+            self.size -= size
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+            self.metrics.inc("album_art_evictions_total")
+
+    def _download(self, url):
+        if self._session is None:
+            # Own session: the API client's pool is sized for api.spotify.com alone
+            import requests
+            self._session = requests.Session()
+        response = self._session.get(url, timeout=(2.0, 5.0))
+        response.raise_for_status()
+        return response.content
+
+
+class NowPlaying:
+    """What Spotify is playing, refreshed only when a change is due
+
+    Instead of polling current_playback() on a fixed cadence, the next poll
+    is scheduled for when the current track should end, `confirm_delay`
+    after the monitor plays or skips, and at least every `max_interval`
+    seconds to notice changes made elsewhere. After each change the queue is
+    read once and the next `queue_depth` tracks' art is prefetched, so
+    skipped() can show the new track at once from memory. Polling only runs
+    while the monitor has Spotify playing.
+    """
+
+    def __init__(self, client, art=None, limiter=None, max_interval=30.0, confirm_delay=0.5, queue_depth=3,
+                 listener=None, clock=time.monotonic, metrics=NULL_METRICS):
+        self.client = client
+        self.art = art
+        self.limiter = limiter
+        self.max_interval = max_interval
+        self.confirm_delay = confirm_delay
+        self.queue_depth = queue_depth
+        self.listener = listener  # listener(track, confirmed) on every track change and once its art is cached
+        self.clock = clock
+        self.metrics = metrics
+        self.current = None   # track_info() of the playing track
+        self.confirmed = False  # Whether Spotify reported `current` (False: taken from the queue)
+        self.upcoming = []    # track_info() of the next queued tracks
+        self.is_playing = False
+        self.active = False   # Whether to poll at all
+        self._next_poll = 0.0
+        self._queue_stale = True
+        self._lock = Lock()
+        self._wake = Event()
+        self._stop = Event()
+        self._thread = None
+        self.polls = 0
+        self.queue_reads = 0
+
+    @classmethod
+    def from_config(cls, client, config, section="now_playing", **kwargs):
+        return cls(
+            client,
+            max_interval=config.getfloat(section, "max_interval", fallback=30.0),
+            confirm_delay=config.getfloat(section, "confirm_delay", fallback=0.5),
+            queue_depth=config.getint(section, "queue_depth", fallback=3),
+            **kwargs,
+        )
+
+    def art_path(self, track=None):
+        """Local file of a track's cached album art (the current track by default), or None"""
+        track = track or self.current
+        if not track or not track.get("art_url") or self.art is None:
+            return None
+        return self.art.local_path(track["art_url"])
+
+    def resume(self):
+        """Spotify was told to play: start polling and confirm what it plays shortly"""
+        self.active = True
+        self._schedule(self.confirm_delay, queue=True)
+
+    def pause(self):
+        """Spotify was paused by the monitor: stop polling until the next play"""
+        self.active = False
+        self.is_playing = False
+
+    def skipped(self, count):
+        """The monitor skipped `count` tracks (< 0 for previous): update at once, confirm later"""
+        with self._lock:
+            upcoming = self.upcoming
+            if 0 < count <= len(upcoming):
+                track = upcoming[count - 1]
+                self.upcoming = upcoming[count:]
+            else:
+                # Previous tracks and skips past the known queue can only be read from Spotify
+                track = None
+        if track is not None:
+            self._changed(track, confirmed=False)
+        self._schedule(self.confirm_delay, queue=True)
+        return track
+
+    def _schedule(self, delay, queue=False):
+        due = self.clock() + delay
+        with self._lock:
+            # An earlier poll already scheduled stays
+            self._next_poll = min(self._next_poll, due) if self._next_poll else due
+            if queue:
+                self._queue_stale = True
+        self._wake.set()
+
+    def _changed(self, track, confirmed):
+        with self._lock:
+            self.current = track
+            self.confirmed = confirmed
+        log.info(f"  🎶 Now playing: {describe(track)}", event="now_playing", track=track["id"],
+                 confirmed=confirmed)
+        if self.listener is not None:
+            self.listener(track, confirmed)
+
+    def poll(self, stop=None):
+        """Read the playback state once; returns True if the track or play state changed"""
+        stop = stop or Event()
+        if stop.is_set() or (self.limiter is not None
+                             and not self.limiter.wait_acquire(BACKGROUND_RESERVE, stop)):
+            return False
+        self.polls += 1
+        playback = self.client.current_playback() or {}
+        track = track_info(playback.get("item"))
+        is_playing = bool(playback.get("is_playing"))
+        with self._lock:
+            previous = self.current
+            changed = (track or {}).get("id") != (previous or {}).get("id")
+            state_changed = is_playing != self.is_playing
+            self.is_playing = is_playing
+            if changed:
+                # Known queue entries before the new track have been played or skipped
+                ids = [entry["id"] for entry in self.upcoming]
+                if track and track["id"] in ids:
+                    self.upcoming = self.upcoming[ids.index(track["id"]) + 1:]
+                else:
+                    self._queue_stale = True
+
+        if changed and track is not None:
+            self._changed(track, confirmed=True)
+        elif changed:
+            with self._lock:
+                self.current = None
+        if self._queue_stale and track is not None and (
+                self.limiter is None or self.limiter.wait_acquire(BACKGROUND_RESERVE, stop)):
+            self._read_queue()
+        self._prefetch_art(stop)
+
+        # Next poll: when this track should end, or max_interval from now
+        delay = self.max_interval
+        if is_playing and track and track.get("duration_ms"):
+            remaining = (track["duration_ms"] - (playback.get("progress_ms") or 0)) / 1000
+            delay = min(delay, max(self.confirm_delay, remaining + 0.5))
+        with self._lock:
+            self._next_poll = self.clock() + delay
+        return changed or state_changed
+
+    def _read_queue(self):
+        self.queue_reads += 1
+        queue = (self.client.queue() or {}).get("queue") or []
+        upcoming = [track for track in (track_info(item) for item in queue[:self.queue_depth]) if track]
+        with self._lock:
+            self.upcoming = upcoming
+            self._queue_stale = False
+
+    def _prefetch_art(self, stop):
+        if self.art is None:
+            return
+        with self._lock:
+            tracks = [self.current] + self.upcoming
+        for track in tracks:
+            if stop.is_set():
+                return
+            if track and track.get("art_url"):
+                try:
+                    fetched = self.art.prefetch(track["art_url"])
+                except Exception as e:
+                    log.debug(f"Failed to fetch album art {track['art_url']}: {e}", event="album_art_failed",
+                              error=str(e))
+                    continue
+                with self._lock:
+                    shown, confirmed = track is self.current, self.confirmed
+                if fetched and shown and self.listener is not None:
+                    # Announced before its art was cached: announce it again so the art can be shown
+                    self.listener(track, confirmed)
+
+    def start(self):
+        """Start the background poller"""
+        if self._thread is not None:
+            return
+        self._stop = Event()
+        self._thread = Thread(target=self._poll_loop, args=(self._stop,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread = None
+
+    def _poll_loop(self, stop):
+        while not stop.is_set():
+            with self._lock:
+                due = self._next_poll - self.clock() if self.active and self._next_poll else None
+            if due is None or due > 0:
+                self._wake.wait(due)
+                self._wake.clear()
+                continue
+            try:
+                self.poll(stop)
+            except Exception as e:
+                with self._lock:
+                    self._next_poll = self.clock() + self.max_interval
+                if self.limiter is not None and is_rate_limited(e):
+                    self.limiter.penalize(retry_after(e))
+                else:
+                    log.debug(f"Now-playing poll failed: {e}", event="now_playing_failed", error=str(e))
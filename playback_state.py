@@ -0,0 +1,92 @@
+"""Locally tracked Spotify playback state (Method A)"""
+import time
+from threading import Event, Lock, Thread
+
+from logs import get_logger
+from rate_limit import BACKGROUND_RESERVE, is_rate_limited, retry_after
+
+
+log = get_logger("playback_state")
+
+
+class PlaybackStateCache:
+    """Remembers whether Spotify is playing so transitions don't need a current_playback() first
+
+    The state is updated from the results of our own commands, refreshed by a
+    low-rate background sync, and only trusted for max_staleness seconds. The
+    sync has to run more often than that or commands find the state stale and
+    read it themselves, so a longer sync_interval is shortened. With a
+    RateLimiter the sync only runs when tokens are spare and backs off on 429.
+    """
+
+    def __init__(self, fetch, max_staleness=10.0, sync_interval=8.0, clock=time.monotonic, limiter=None):
+        self.fetch = fetch  # Callable returning a current_playback()-style dict or None
+        self.limiter = limiter
+        if 0 < max_staleness <= sync_interval:
+            log.warning(f"⚠ playback_sync_interval {sync_interval:g} s is not below playback_max_staleness "
+                        f"{max_staleness:g} s\n"
+                        f"  → Syncing every {max_staleness * 0.8:g} s", event="playback_sync_clamped")
+            sync_interval = max_staleness * 0.8
+        self.max_staleness = max_staleness
+        self.sync_interval = sync_interval
+        self.clock = clock
+        self._lock = Lock()
+        self._is_playing = None
+        self._updated_at = float("-inf")
+        self._stop = Event()
+        self._thread = None
+        self.fetches = 0
+
+    def update(self, is_playing):
+        """Record a known playback state (e.g. after our own play/pause succeeded)"""
+        with self._lock:
+            self._is_playing = bool(is_playing)
+            self._updated_at = self.clock()
+
+    def invalidate(self):
+        """Forget the cached state; the next lookup goes to the API"""
+        with self._lock:
+            self._is_playing = None
+            self._updated_at = float("-inf")
+
+    def is_fresh(self):
+        with self._lock:
+            return self._is_playing is not None and self.clock() - self._updated_at <= self.max_staleness
+
+    def cached(self):
+        """Cached playing state, or None if unknown or stale"""
+        with self._lock:
+            if self._is_playing is None or self.clock() - self._updated_at > self.max_staleness:
+                return None
+            return self._is_playing
+
+    def refresh(self):
+        """Fetch the real state from the API and cache it"""
+        self.fetches += 1
+        current = self.fetch()
+        is_playing = bool(current and current.get('is_playing'))
+        self.update(is_playing)
+        return is_playing
+
+    def start_sync(self):
+        """Start the low-rate background sync thread"""
+        if self._thread is not None or self.sync_interval <= 0:
+            return
+        self._stop = Event()
+        self._thread = Thread(target=self._sync_loop, args=(self._stop,), daemon=True)
+        self._thread.start()
+
+    def stop_sync(self):
+        self._stop.set()
+        self._thread = None
+
+    def _sync_loop(self, stop):
+        while not stop.wait(self.sync_interval):
+            if self.limiter is not None and self.limiter.try_acquire(BACKGROUND_RESERVE) > 0:
+                continue
+            try:
+                self.refresh()
+            except Exception as e:
+                # Keep the old value; it expires on its own after max_staleness
+                if self.limiter is not None and is_rate_limited(e):
+                    self.limiter.penalize(retry_after(e))
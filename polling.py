@@ -0,0 +1,110 @@
+"""Adaptive polling scheduler for the GTA SA memory monitor"""
+import time
+from threading import Event
+
+
+# Monitor states the scheduler knows how to pace
+DETACHED = "detached"      # GTA SA is not running / not attached
+ON_FOOT = "on_foot"        # Player on foot (or in a menu)
+IN_VEHICLE = "in_vehicle"  # Player in a vehicle, radio can change at any time
+
+
+class PollingPolicy:
+    """Cadence policy for the monitor loop (all intervals are in seconds)"""
+
+    def __init__(self, fast_interval=0.05, vehicle_interval=0.05, idle_interval=0.5,
+                 detached_interval=5.0, burst_duration=2.0, attach_backoff_initial=0.25,
+                 attach_backoff_factor=2.0, read_retries=3):
+        self.fast_interval = fast_interval          # Right after a state change
+        self.vehicle_interval = vehicle_interval    # Steady state while in a vehicle
+        self.idle_interval = idle_interval          # Steady state on foot / in menus
+        self.detached_interval = detached_interval  # Game not attached (cap for the attach backoff)
+        self.burst_duration = burst_duration        # How long to keep fast polling after a change
+        self.attach_backoff_initial = attach_backoff_initial  # First retry delay after a failed attach
+        self.attach_backoff_factor = attach_backoff_factor    # Growth per consecutive failed attach
+        self.read_retries = read_retries            # Failed reads tolerated before dropping the handle
+
+    @classmethod
+    def from_config(cls, config, section="polling"):
+        """Build a policy from a ConfigParser section, falling back to defaults"""
+        policy = cls()
+        if not config.has_section(section):
+            return policy
+
+        for name in ("fast_interval", "vehicle_interval", "idle_interval",
+                     "detached_interval", "burst_duration", "attach_backoff_initial",
+                     "attach_backoff_factor"):
+            value = config.getfloat(section, name, fallback=getattr(policy, name))
+            if value < 0:
+                raise ValueError(f"[{section}] {name} must be >= 0, got {value}")
+            setattr(policy, name, value)
+        policy.read_retries = config.getint(section, "read_retries", fallback=policy.read_retries)
+        return policy
+
+    def attach_delay(self, failures):
+        """Capped exponential backoff while waiting for the game"""
+        if failures <= 0:
+            return self.attach_backoff_initial
+        delay = self.attach_backoff_initial * self.attach_backoff_factor ** (failures - 1)
+        return min(self.detached_interval, delay)
+
+    def __repr__(self):
+        return (f"PollingPolicy(fast={self.fast_interval}, vehicle={self.vehicle_interval}, "
+                f"idle={self.idle_interval}, detached={self.detached_interval}, "
+                f"burst={self.burst_duration}, backoff={self.attach_backoff_initial}"
+                f"x{self.attach_backoff_factor}, retries={self.read_retries})")
+
+
+class PollScheduler:
+    """Decides how long the monitor sleeps between ticks and sleeps interruptibly"""
+
+    def __init__(self, policy=None, clock=time.monotonic):
+        self.policy = policy or PollingPolicy()
+        self.clock = clock
+        self.state = DETACHED
+        self._last_activity = float("-inf")
+        self._wake = Event()
+        self.attach_failures = 0
+
+    def update(self, state):
+        """Record the current monitor state; a change starts a fast-polling burst"""
+        if state != self.state:
+            self.state = state
+            self.mark_activity()
+        if state != DETACHED:
+            self.attach_failures = 0
+
+    def attach_failed(self):
+        """Record a failed attach attempt; the next detached wait backs off further"""
+        self.attach_failures += 1
+        self.update(DETACHED)
+
+    def mark_activity(self):
+        """Start a fast-polling burst (e.g. after the radio station changed)"""
+        self._last_activity = self.clock()
+
+    def next_interval(self):
+        """Delay before the next tick for the current state"""
+        policy = self.policy
+        if self.state == DETACHED:
+            return policy.attach_delay(self.attach_failures)
+
+        if self.clock() - self._last_activity < policy.burst_duration:
+            return policy.fast_interval
+
+        if self.state == IN_VEHICLE:
+            return policy.vehicle_interval
+        return policy.idle_interval
+
+    def wait(self, interval=None):
+        """Sleep until the next tick; returns early if wake() is called"""
+        if interval is None:
+            interval = self.next_interval()
+        if self._wake.wait(interval):
+            self._wake.clear()
+            return True
+        return False
+
+    def wake(self):
+        """Interrupt a pending wait() (used on shutdown)"""
+        self._wake.set()
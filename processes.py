@@ -0,0 +1,92 @@
+"""Process enumeration behind a small interface so it can be faked and benchmarked"""
+import itertools
+import time
+
+
+class ProcessInfo:
+    """A process identified by PID plus create-time (PIDs get reused, the pair doesn't)"""
+    __slots__ = ("pid", "name", "create_time")
+
+    def __init__(self, pid, name, create_time):
+        self.pid = pid
+        self.name = name
+        self.create_time = create_time
+
+    @property
+    def key(self):
+        return (self.pid, self.create_time)
+
+    def __repr__(self):
+        return f"ProcessInfo(pid={self.pid}, name={self.name!r}, create_time={self.create_time})"
+
+
+class ProcessEnumerator:
+    """Lists processes and checks whether a known one is still alive"""
+
+    def __init__(self):
+        self.scans = 0
+        self.liveness_checks = 0
+
+    def iter_processes(self):
+        """Yield a ProcessInfo for every running process (the expensive call)"""
+        raise NotImplementedError
+
+    def is_alive(self, pid, create_time):
+        """Cheap check that this exact process is still running"""
+        raise NotImplementedError
+
+    def find(self, name):
+        """All processes whose name matches, case-insensitively"""
+        self.scans += 1
+        name = name.lower()
+        return [proc for proc in self.iter_processes() if (proc.name or "").lower() == name]
+
+
+class PsutilProcessEnumerator(ProcessEnumerator):
+    """Real process table via psutil"""
+
+    def iter_processes(self):
+        import psutil
+
+        for proc in psutil.process_iter(['name', 'create_time']):
+            yield ProcessInfo(proc.pid, proc.info['name'], proc.info['create_time'])
+
+    def is_alive(self, pid, create_time):
+        import psutil
+
+        self.liveness_checks += 1
+        try:
+            return psutil.Process(pid).create_time() == create_time
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return False
+
+
+class FakeProcessEnumerator(ProcessEnumerator):
+    """In-memory process table for benchmarks; spawn() and kill() simulate launches and exits"""
+
+    def __init__(self, names=(), scan_cost=0.0):
+        super().__init__()
+        self.scan_cost = scan_cost  # Simulated seconds per process listed
+        self._pids = itertools.count(1000, 4)
+        self.processes = {}
+        for name in names:
+            self.spawn(name)
+
+    def spawn(self, name):
+        proc = ProcessInfo(next(self._pids), name, time.time())
+        self.processes[proc.pid] = proc
+        return proc
+
+    def kill(self, pid):
+        self.processes.pop(pid, None)
+
+    def iter_processes(self):
+        for proc in list(self.processes.values()):
+            if self.scan_cost:
+                time.sleep(self.scan_cost)
+            yield proc
+
+    def is_alive(self, pid, create_time):
+        self.liveness_checks += 1
+        proc = self.processes.get(pid)
+        return proc is not None and proc.create_time == create_time
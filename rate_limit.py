@@ -0,0 +1,136 @@
+"""Client-side Spotify Web API rate limiting: adaptive token bucket and 429 helpers"""
+import time
+from threading import Lock
+
+from metrics import NULL_METRICS
+
+# Bucket tokens background work (polling, syncs, prefetches) leaves for play/pause and skips
+BACKGROUND_RESERVE = 2
+
+
+class RateLimited(Exception):
+    """A command was refused with HTTP 429; `remaining` is the part of it that was not done
+
+    local=True means the client's own bucket had no token for a follow-up
+    request: wait, but don't slow down as for a 429.
+    """
+
+    def __init__(self, retry_after=None, remaining=None, local=False):
+        super().__init__(f"rate limited, retry after {retry_after} s")
+        self.retry_after = retry_after
+        self.remaining = remaining
+        self.local = local
+
+
+def is_rate_limited(error):
+    if isinstance(error, RateLimited):
+        return True
+    if getattr(error, "http_status", None) != 429:
+        return False
+    # spotipy also reports retries used up on 5xx responses as a 429 ("too many 502 error responses")
+    reason = str(getattr(error, "reason", None) or "")
+    return not reason.startswith("too many ") or "429" in reason
+
+
+def retry_after(error, default=1.0):
+    """Seconds to wait from a RateLimited or a spotipy 429 (Retry-After header), else default"""
+    if isinstance(error, RateLimited):
+        return error.retry_after if error.retry_after is not None else default
+    headers = getattr(error, "headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return default
+
+
+class RateLimiter:
+    """Token bucket whose refill rate backs off on 429s and creeps back on success
+
+    Each API command takes one token; `burst` tokens allow a quick run of
+    commands after an idle period. A 429 empties the bucket, blocks it for the
+    server's Retry-After and halves the rate (down to min_rate); every success
+    adds `recovery` tokens/s back up to the configured rate. Low-priority
+    callers pass `reserve` so they never take the last tokens a play/pause
+    might need.
+    """
+
+    def __init__(self, rate=5.0, burst=10, min_rate=0.5, recovery=0.1, clock=time.monotonic,
+                 metrics=NULL_METRICS):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.recovery = recovery
+        self.clock = clock
+        self.metrics = metrics
+        self.tokens = float(burst)
+        self.blocked_until = 0.0
+        self.throttled = 0  # 429s seen
+        self._updated = clock()
+        self._lock = Lock()
+
+    @classmethod
+    def from_config(cls, config, section="rate_limit", **kwargs):
+        return cls(
+            rate=config.getfloat(section, "rate", fallback=5.0),
+            burst=config.getint(section, "burst", fallback=10),
+            min_rate=config.getfloat(section, "min_rate", fallback=0.5),
+            recovery=config.getfloat(section, "recovery", fallback=0.1),
+            **kwargs,
+        )
+
+    def _refill(self, now):
+        if now > self._updated:
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def _wait(self, now, reserve):
+        """Seconds until a token above `reserve` is available (caller holds the lock)"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        missing = reserve + 1 - self.tokens
+        return 0.0 if missing <= 0 else missing / self.rate
+
+    def delay(self, reserve=0):
+        """Seconds until try_acquire(reserve) would succeed, without taking a token"""
+        with self._lock:
+            return self._wait(self.clock(), reserve)
+
+    def try_acquire(self, reserve=0):
+        """Take a token if one is free above `reserve`; returns 0.0 on success, else seconds to wait"""
+        with self._lock:
+            wait = self._wait(self.clock(), reserve)
+            if wait == 0.0:
+                self.tokens -= 1
+            return wait
+
+    def wait_acquire(self, reserve, stop):
+        """Block until a token above `reserve` is taken; False if `stop` is set first"""
+        while True:
+            wait = self.try_acquire(reserve)
+            if wait <= 0:
+                return not stop.is_set()
+            if stop.wait(wait):
+                return False
+
+    def penalize(self, retry_after=None):
+        """Record a 429: block for Retry-After and slow down (once per block)"""
+        with self._lock:
+            now = self.clock()
+            if now >= self.blocked_until:
+                self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0.0
+            self._updated = now
+            self.blocked_until = max(self.blocked_until, now + (1.0 / self.rate if retry_after is None else retry_after))
+            self.throttled += 1
+        self.metrics.inc("spotify_rate_limited_total")
+
+    def succeeded(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.recovery)
+
+    def __repr__(self):
+        return (f"RateLimiter(rate={self.rate:.2f}/{self.max_rate:g}, burst={self.burst}, "
+                f"tokens={self.tokens:.1f}, throttled={self.throttled})")
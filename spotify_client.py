@@ -0,0 +1,206 @@
+"""spotipy client extensions for the Spotify API backend (Method A)"""
+import re
+import time
+from threading import Event, Lock, Thread
+
+import requests
+import spotipy
+from spotipy.cache_handler import CacheHandler
+from urllib3.util.retry import Retry
+
+from logs import get_logger
+from metrics import NULL_METRICS
+
+
+log = get_logger("spotify")
+
+
+# Spotify IDs are 22 base62 characters; collapse them so endpoint labels stay bounded
+_ID_SEGMENT = re.compile(r"/[0-9A-Za-z]{22}(?=/|$)")
+
+
+def endpoint_label(method, url, prefix):
+    """'PUT me/player/play' style label for a request URL"""
+    if url.startswith(prefix):
+        url = url[len(prefix):]
+    path = url.split("?", 1)[0].strip("/")
+    return f"{method} {_ID_SEGMENT.sub('/{id}', '/' + path)[1:]}"
+
+
+class InstrumentedSpotify(spotipy.Spotify):
+    """spotipy.Spotify with a tuned keep-alive pool that counts and times every Web API request by endpoint"""
+
+    # 429s are not retried inside the request (urllib3 would sleep out Retry-After on the
+    # dispatcher thread); they surface to the dispatcher, which reschedules by priority
+    default_retry_codes = (500, 502, 503, 504)
+
+    def __init__(self, *args, metrics=NULL_METRICS, pool_maxsize=4, **kwargs):
+        self.metrics = metrics
+        self.pool_maxsize = pool_maxsize
+        self.last_request = None  # time.monotonic() of the last API call, for the keep-alive
+        super().__init__(*args, **kwargs)
+
+    def _build_session(self):
+        """One host, so one pool; a few connections so a sync never queues behind a command"""
+        self._session = requests.Session()
+        retry = Retry(
+            total=self.retries,
+            connect=None,
+            read=False,
+            allowed_methods=frozenset(["GET", "POST", "PUT", "DELETE"]),
+            status=self.status_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=self.status_forcelist)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize,
+                                                max_retries=retry)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def _internal_call(self, method, url, payload, params):
+        self.last_request = time.monotonic()
+        if not self.metrics.enabled:
+            return super()._internal_call(method, url, payload, params)
+
+        labels = {"endpoint": endpoint_label(method, url, self.prefix)}
+        started = time.monotonic()
+        try:
+            return super()._internal_call(method, url, payload, params)
+        except spotipy.exceptions.SpotifyException as e:
+            self.metrics.inc("spotify_api_errors_total", {**labels, "status": e.http_status})
+            raise
+        finally:
+            self.metrics.inc("spotify_api_calls_total", labels)
+            self.metrics.observe("spotify_api_request_seconds", time.monotonic() - started, labels)
+
+    def get_if_changed(self, path, etag=None, params=None):
+        """Conditional GET: (json, etag) for a changed resource, (None, etag) on 304 Not Modified"""
+        headers = self._auth_headers()
+        if etag:
+            headers["If-None-Match"] = etag
+        self.last_request = time.monotonic()
+        response = self._session.get(self.prefix + path, headers=headers, params=params,
+                                     proxies=self.proxies, timeout=self.requests_timeout)
+        if self.metrics.enabled:
+            labels = {"endpoint": endpoint_label("GET", self.prefix + path, self.prefix)}
+            self.metrics.inc("spotify_api_calls_total", labels)
+            if response.status_code >= 400:
+                self.metrics.inc("spotify_api_errors_total", {**labels, "status": response.status_code})
+        if response.status_code == 304:
+            return None, etag
+        if response.status_code >= 400:
+            try:
+                message = response.json()["error"]["message"]
+            except (ValueError, KeyError, TypeError):
+                message = response.reason
+            raise spotipy.exceptions.SpotifyException(response.status_code, -1, f"{response.url}:\n {message}",
+                                                      headers=response.headers)
+        return response.json(), response.headers.get("ETag")
+
+    def warm(self):
+        """Cheap unauthenticated request that keeps a pooled connection open"""
+        self._session.head(self.prefix, proxies=self.proxies, timeout=self.requests_timeout)
+        self.last_request = time.monotonic()
+
+
+class CachedTokenHandler(CacheHandler):
+    """Keeps the token in memory and writes through to another cache handler
+
+    spotipy asks the cache for the token on every request; the default file
+    cache means a disk read per API call.
+    """
+
+    def __init__(self, inner):
+        self.inner = inner
+        self._token_info = None
+        self._loaded = False
+        self._lock = Lock()
+
+    def get_cached_token(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._token_info = self.inner.get_cached_token()
+                    self._loaded = True
+        return self._token_info
+
+    def save_token_to_cache(self, token_info):
+        with self._lock:
+            self._token_info = token_info
+            self._loaded = True
+        self.inner.save_token_to_cache(token_info)
+
+
+class TokenRefresher:
+    """Renews the OAuth access token before it expires and keeps the API connection warm
+
+    Every `interval` seconds: if the cached token expires within `margin`
+    seconds it is refreshed here, off the command path (spotipy itself only
+    refreshes inside a request, 60 s before expiry). If no API request went
+    out for `keepalive_interval` seconds, a HEAD request keeps a pooled
+    connection open so the next command skips the TCP/TLS handshake.
+    """
+
+    def __init__(self, client, margin=300.0, keepalive_interval=30.0, interval=None, metrics=NULL_METRICS):
+        self.client = client
+        self.margin = margin
+        self.keepalive_interval = keepalive_interval
+        self.interval = interval or (keepalive_interval if keepalive_interval > 0 else 30.0)
+        self.metrics = metrics
+        self.refreshes = 0
+        self.pings = 0
+        self._stop = Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop = Event()
+        self._thread = Thread(target=self._run, args=(self._stop,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _run(self, stop):
+        while not stop.wait(self.interval):
+            self.tick()
+
+    def tick(self):
+        try:
+            self.refresh_if_due()
+        except Exception as e:
+            log.warning(f"⚠ Background Spotify token refresh failed: {e}", event="token_refresh_failed",
+                        error=str(e))
+        try:
+            self.keep_warm()
+        except Exception as e:
+            log.debug(f"Spotify keep-alive request failed: {e}", event="keepalive_failed", error=str(e))
+
+    def refresh_if_due(self):
+        """Refresh the access token if it expires within the margin; True if refreshed"""
+        auth = self.client.auth_manager
+        if auth is None or not hasattr(auth, "refresh_access_token"):
+            return False
+        token_info = auth.cache_handler.get_cached_token()
+        if not token_info or "refresh_token" not in token_info:
+            return False
+        if token_info["expires_at"] - time.time() > self.margin:
+            return False
+        auth.refresh_access_token(token_info["refresh_token"])
+        self.refreshes += 1
+        self.metrics.inc("spotify_token_refreshes_total")
+        log.debug("Spotify access token refreshed in the background", event="token_refreshed")
+        return True
+
+    def keep_warm(self):
+        """Ping the API host if the pool has been idle for keepalive_interval; True if pinged"""
+        if self.keepalive_interval <= 0:
+            return False
+        last = self.client.last_request
+        if last is not None and time.monotonic() - last < self.keepalive_interval:
+            return False
+        self.client.warm()
+        self.pings += 1
+        self.metrics.inc("spotify_keepalive_requests_total")
+        return True
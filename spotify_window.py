@@ -0,0 +1,92 @@
+"""Cached handle to the Spotify desktop window for the pywinauto backend (Method B)"""
+from threading import Event, Lock, Thread
+
+from processes import PsutilProcessEnumerator
+
+
+SPOTIFY_PROCESS_NAME = "spotify.exe"
+
+
+def connect_pywinauto(pid):
+    """Connect to the main window of a Spotify process; raises for helper processes"""
+    from pywinauto import Application, findwindows
+
+    # Only the main Spotify window returns find_window(); helper processes raise
+    handle = findwindows.find_window(process=pid)
+    app = Application(backend="win32").connect(handle=handle)
+    return app.top_window()
+
+
+class SpotifyWindowIndex:
+    """Remembers which Spotify process owns the main window
+
+    The handle is keyed by PID and process create-time, so validating it costs
+    one liveness check instead of a full process scan. A low-frequency
+    background refresher only rescans when the cached process has died (or
+    when Spotify wasn't found yet).
+    """
+
+    def __init__(self, enumerator=None, connect=connect_pywinauto, refresh_interval=5.0,
+                 process_name=SPOTIFY_PROCESS_NAME):
+        self.enumerator = enumerator or PsutilProcessEnumerator()
+        self.connect = connect
+        self.refresh_interval = refresh_interval
+        self.process_name = process_name
+        self._lock = Lock()
+        self._key = None
+        self._window = None
+        self._stop = Event()
+        self._thread = None
+        self.rescans = 0
+
+    def get(self):
+        """Cached Spotify window, rescanning only if the owning process is gone"""
+        with self._lock:
+            if self._window is not None and self.enumerator.is_alive(*self._key):
+                return self._window
+        return self.rescan()
+
+    def invalidate(self):
+        """Drop the cached handle (e.g. after send_keystrokes failed)"""
+        with self._lock:
+            self._key = None
+            self._window = None
+
+    def rescan(self):
+        """Scan the process table for the Spotify process that owns the main window"""
+        with self._lock:
+            self.rescans += 1
+            self._key = None
+            self._window = None
+            for proc in self.enumerator.find(self.process_name):
+                try:
+                    window = self.connect(proc.pid)
+                except Exception:
+                    # Helper process without the main window
+                    continue
+                self._key = proc.key
+                self._window = window
+                return window
+            return None
+
+    def start(self):
+        """Start the background refresher"""
+        if self._thread is not None or self.refresh_interval <= 0:
+            return
+        self._stop = Event()
+        self._thread = Thread(target=self._refresh_loop, args=(self._stop,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _refresh_loop(self, stop):
+        while not stop.wait(self.refresh_interval):
+            with self._lock:
+                key = self._key
+            if key is None or not self.enumerator.is_alive(*key):
+                try:
+                    self.rescan()
+                except Exception:
+                    pass
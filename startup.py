@@ -0,0 +1,158 @@
+"""Startup profile: where the time goes between process launch and "monitor ready"
+
+`python main.py --profile-startup` installs an import timer before main.py
+imports anything else, times each startup phase (config, backend load,
+Spotify connect, start), prints the report, and fails if launch-to-ready
+took longer than [startup] budget_ms.
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+
+def process_launch_time():
+    """time.time() of the process launch, or None if it can't be told"""
+    if sys.platform.startswith("linux"):
+        # psutil adds the start tick to a boot time rounded to whole seconds; compare ticks to uptime instead
+        try:
+            with open("/proc/self/stat") as f:
+                fields = f.read().rpartition(")")[2].split()
+            with open("/proc/uptime") as f:
+                uptime = float(f.read().split()[0])
+            return time.time() - (uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK"))
+        except (OSError, ValueError, IndexError):
+            return None
+    try:
+        import psutil
+        return psutil.Process().create_time()
+    except Exception:
+        return None
+
+
+class _ImportTimer:
+    """Meta-path hook that times each module's execution (inclusive and self time)"""
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self._stack = []  # [child seconds] per module being executed
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        loader = spec.loader
+        # Builtin/frozen importers are classes shared by every module; leave them alone
+        if loader is not None and not isinstance(loader, type) and hasattr(loader, "exec_module") \
+                and "exec_module" not in vars(loader):
+            loader.exec_module = self._timed(name, loader.exec_module)
+        return spec
+
+    def _timed(self, name, exec_module):
+        def exec_timed(module):
+            self._stack.append(0.0)
+            started = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                elapsed = time.perf_counter() - started
+                children = self._stack.pop()
+                if self._stack:
+                    self._stack[-1] += elapsed
+                self.profiler.imports.append((name, elapsed, elapsed - children, len(self._stack)))
+        return exec_timed
+
+
+class StartupProfiler:
+    """Collects import and phase timings; report() summarises them against the budget"""
+
+    def __init__(self, budget_ms=None, launched=None):
+        self.budget_ms = budget_ms
+        self.launched = launched  # time.time() of process launch
+        self.created = time.time()
+        self.imports = []  # [(module, seconds, self seconds, depth)]
+        self.phases = []  # [(name, seconds)]
+        self.ready = None
+        self._timer = None
+
+    @classmethod
+    def from_argv(cls, argv, flag="--profile-startup"):
+        """A started profiler if `flag` is on the command line, else NULL_PROFILER"""
+        if flag not in argv:
+            return NULL_PROFILER
+        profiler = cls(launched=process_launch_time())
+        profiler.install()
+        return profiler
+
+    def install(self):
+        if self._timer is None:
+            self._timer = _ImportTimer(self)
+            sys.meta_path.insert(0, self._timer)
+
+    def uninstall(self):
+        if self._timer is not None:
+            sys.meta_path.remove(self._timer)
+            self._timer = None
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def mark_ready(self):
+        self.ready = time.time()
+        self.uninstall()
+
+    @property
+    def total_ms(self):
+        """Launch (or profiler creation, if the launch time is unknown) to ready, in ms"""
+        if self.ready is None:
+            return None
+        return (self.ready - (self.launched or self.created)) * 1000
+
+    @property
+    def over_budget(self):
+        return bool(self.budget_ms) and self.total_ms is not None and self.total_ms > self.budget_ms
+
+    def report(self, top=15):
+        lines = ["Startup profile"]
+        if self.launched is not None:
+            lines.append(f"  interpreter + site   : {(self.created - self.launched) * 1000:8.1f} ms")
+        for name, seconds in self.phases:
+            lines.append(f"  {name:21s}: {seconds * 1000:8.1f} ms")
+        if self.imports:
+            total = sum(seconds for _, seconds, _, depth in self.imports if depth == 0)
+            lines.append(f"  imports ({len(self.imports)} modules, {total * 1000:.1f} ms), slowest by self time:")
+            for name, seconds, own, _ in sorted(self.imports, key=lambda entry: -entry[2])[:top]:
+                lines.append(f"    {own * 1000:7.1f} ms self  {seconds * 1000:7.1f} ms total  {name}")
+        if self.total_ms is not None:
+            budget = f" (budget {self.budget_ms:.0f} ms{', OVER' if self.over_budget else ''})" \
+                if self.budget_ms else ""
+            start = "launch" if self.launched is not None else "profiler start"
+            lines.append(f"  {start} -> monitor ready: {self.total_ms:.1f} ms{budget}")
+        return "\n".join(lines)
+
+
+class _NullProfiler:
+    """Stand-in when --profile-startup isn't given; phases cost nothing"""
+
+    budget_ms = None
+    over_budget = False
+
+    @contextmanager
+    def phase(self, name):
+        yield
+
+    def mark_ready(self):
+        pass
+
+
+NULL_PROFILER = _NullProfiler()
@@ -0,0 +1,87 @@
+"""In-game radio stations and the Spotify contexts they are mapped to"""
+import re
+
+
+USER_RADIO = 12
+
+# Radio station byte at 0x8CB7A5 (GTA SA v1.0 US); 0 and 13 mean the radio is off
+STATION_NAMES = {
+    1: "Playback FM",
+    2: "K-Rose",
+    3: "K-DST",
+    4: "Bounce FM",
+    5: "SF-UR",
+    6: "Radio Los Santos",
+    7: "Radio X",
+    8: "CSR 103.9",
+    9: "K-Jah West",
+    10: "Master Sounds 98.3",
+    11: "WCTR",
+    USER_RADIO: "User Radio",
+}
+
+CONTEXT_TYPES = ("playlist", "album", "artist")
+
+_URI = re.compile(r"^spotify:(playlist|album|artist):([0-9A-Za-z]{22})$")
+_URL = re.compile(r"^https?://open\.spotify\.com/(?:intl-[a-z-]+/)?(playlist|album|artist)/([0-9A-Za-z]{22})")
+
+
+def station_name(station):
+    return STATION_NAMES.get(station, f"Station {station}")
+
+
+def parse_context(value):
+    """Spotify context URI from a spotify:<type>:<id> URI or an open.spotify.com link; ValueError otherwise"""
+    value = value.strip()
+    match = _URI.match(value) or _URL.match(value)
+    if not match:
+        raise ValueError(f"not a Spotify playlist, album or artist: {value!r}")
+    return f"spotify:{match.group(1)}:{match.group(2)}"
+
+
+class StationMap:
+    """Which stations Spotify plays for, and which context each one starts
+
+    A station mapped to None resumes whatever Spotify last played (the
+    original User Radio behaviour); stations that are not mapped leave the
+    game's own radio alone and pause Spotify.
+    """
+
+    def __init__(self, contexts=None):
+        self._contexts = {USER_RADIO: None} if contexts is None else dict(contexts)
+
+    @classmethod
+    def from_config(cls, config, section="stations", log=None):
+        """Read `<station id> = <context URI or empty>` lines; bad lines are reported and skipped"""
+        if not config.has_section(section):
+            return cls()
+        contexts = {}
+        for key, value in config.items(section):
+            if not key.strip().isdigit():
+                continue  # Other [stations] settings
+            try:
+                station = int(key)
+                contexts[station] = parse_context(value) if value.strip() else None
+            except ValueError as e:
+                if log is not None:
+                    log.warning(f"⚠ Ignoring [{section}] {key}: {e}", event="station_config_invalid", station=key)
+        return cls(contexts)
+
+    def plays_spotify(self, station):
+        return station in self._contexts
+
+    def context(self, station):
+        """Context URI for a station, None to resume (or if the station isn't mapped)"""
+        return self._contexts.get(station)
+
+    def contexts(self):
+        """Distinct context URIs, in station order"""
+        uris = []
+        for station in sorted(self._contexts):
+            uri = self._contexts[station]
+            if uri and uri not in uris:
+                uris.append(uri)
+        return uris
+
+    def __len__(self):
+        return len(self._contexts)
@@ -0,0 +1,239 @@
+"""Local push API: game and Spotify events as JSON lines over a socket
+
+Overlays and companion tools connect to a TCP port on localhost (or a Unix
+socket) instead of polling get_status(). Each subscriber first gets a "hello"
+line with the current state, then one line per event as it happens:
+
+    {"event": "station_changed", "time": 1760697600.123, "station": 6, "name": "Radio Los Santos", ...}
+
+and may send commands, one per line, as a bare word or {"command": "next"}:
+next, previous, toggle and status. Replies are {"reply": <command>, "ok": ...}.
+
+The asyncio loop runs on its own thread; publish() only hands the event over,
+so the monitor never waits on a subscriber. Every subscriber has a bounded
+queue, and one that falls `buffer` lines behind is disconnected.
+"""
+import asyncio
+import json
+import os
+import socket
+import time
+from threading import Event, Thread
+
+from logs import get_logger
+from metrics import NULL_METRICS
+
+
+log = get_logger("status")
+
+MAX_LINE = 4096  # Longest command line accepted from a subscriber
+SEND_BUFFER = 32768  # Bytes buffered per subscriber in asyncio and in the kernel, on top of the queue
+
+
+class _Subscriber:
+    __slots__ = ("writer", "queue", "peer")
+
+    def __init__(self, writer, size):
+        self.writer = writer
+        self.queue = asyncio.Queue(size)
+        self.peer = writer.get_extra_info("peername") or "local"
+
+
+class StatusServer:
+    """Fans events out to any number of subscribers on a background asyncio loop
+
+    status() returns the dict sent in each "hello" line; handler(command)
+    runs control commands on the server thread (it must not block) and
+    returns a dict merged into the reply.
+    """
+
+    def __init__(self, status=None, handler=None, host="127.0.0.1", port=8765, path=None, buffer=256,
+                 metrics=NULL_METRICS):
+        self.status = status
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.path = path  # Unix socket instead of TCP
+        self.buffer = buffer
+        self.metrics = metrics
+        self.dropped = 0  # Subscribers disconnected for falling behind
+        self._clients = set()
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = Event()
+        self._error = None
+
+    @classmethod
+    def from_config(cls, config, section="status_server", **kwargs):
+        return cls(
+            host=config.get(section, "host", fallback="127.0.0.1"),
+            port=config.getint(section, "port", fallback=8765),
+            path=config.get(section, "path", fallback="").strip() or None,
+            buffer=config.getint(section, "buffer", fallback=256),
+            **kwargs,
+        )
+
+    @property
+    def address(self):
+        return self.path or f"{self.host}:{self.port}"
+
+    @property
+    def subscribers(self):
+        return len(self._clients)
+
+    def start(self):
+        """Bind and start serving; raises OSError if the address can't be used"""
+        if self._thread is not None:
+            return
+        self._ready.clear()
+        self._error = None
+        self._thread = Thread(target=self._run, name="status-server", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=5)
+        if self._error is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+            raise self._error
+
+    def stop(self, timeout=2):
+        loop = self._loop
+        if self._thread is None or loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(loop.stop)
+        except RuntimeError:
+            pass  # Already closed
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def publish(self, event, **fields):
+        """Queue an event for every subscriber; never blocks the caller"""
+        loop = self._loop
+        if loop is None or not self._clients:
+            return
+        fields["event"] = event
+        fields["time"] = round(time.time(), 3)
+        try:
+            loop.call_soon_threadsafe(self._broadcast, fields)
+        except RuntimeError:
+            pass  # Loop closed while stopping
+
+    def _run(self):
+        loop = self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            self._server = loop.run_until_complete(self._listen())
+        except OSError as e:
+            self._error = e
+            self._loop = None
+            loop.close()
+            self._ready.set()
+            return
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            self._loop = None
+            loop.run_until_complete(self._shutdown())
+            loop.close()
+            if self.path:
+                try:
+                    os.unlink(self.path)
+                except OSError:
+                    pass
+
+    async def _shutdown(self):
+        self._server.close()
+        for client in list(self._clients):
+            # Their handlers see EOF and finish on their own
+            client.writer.transport.abort()
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        if tasks:
+            await asyncio.wait(tasks, timeout=1)
+
+    async def _listen(self):
+        if self.path:
+            if os.path.exists(self.path):
+                os.unlink(self.path)  # Left behind by an earlier run
+            return await asyncio.start_unix_server(self._serve, path=self.path, limit=MAX_LINE)
+        server = await asyncio.start_server(self._serve, self.host, self.port, limit=MAX_LINE)
+        self.port = server.sockets[0].getsockname()[1]
+        return server
+
+    async def _serve(self, reader, writer):
+        client = _Subscriber(writer, self.buffer)
+        # Keep the kernel from absorbing megabytes for a stalled reader, so the queue limit is what counts
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER)
+        writer.transport.set_write_buffer_limits(high=SEND_BUFFER)
+        self._clients.add(client)
+        self.metrics.inc("status_connections_total")
+        sender = asyncio.ensure_future(self._send(client))
+        try:
+            hello = self.status() if self.status else {}
+            self._offer(client, self._encode({"event": "hello", "time": round(time.time(), 3), **hello}))
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self._offer(client, self._encode(self._command(line)))
+        except (ConnectionError, ValueError):
+            # Reset by the peer, aborted as a slow consumer, or a line over MAX_LINE
+            pass
+        finally:
+            self._clients.discard(client)
+            sender.cancel()
+            writer.close()
+
+    async def _send(self, client):
+        writer = client.writer
+        while True:
+            writer.write(await client.queue.get())
+            # Waits while the socket buffer is full; the queue fills up meanwhile
+            await writer.drain()
+
+    def _command(self, line):
+        text = line.decode("utf-8", "replace").strip()
+        try:
+            command = json.loads(text).get("command") if text.startswith("{") else text
+        except (ValueError, AttributeError):
+            return {"reply": None, "ok": False, "error": "invalid JSON"}
+        command = str(command or "").lower()
+        self.metrics.inc("status_commands_total", {"command": command})
+        if self.handler is None:
+            return {"reply": command, "ok": False, "error": "commands are not accepted"}
+        try:
+            result = self.handler(command)
+        except Exception as e:
+            log.warning(f"⚠ Status command '{command}' failed: {e}", event="status_command_failed",
+                        command=command, error=str(e))
+            return {"reply": command, "ok": False, "error": str(e)}
+        return {"reply": command, "ok": True, **(result or {})}
+
+    @staticmethod
+    def _encode(data):
+        return (json.dumps(data, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+    def _broadcast(self, fields):
+        self.metrics.inc("status_events_total", {"event": fields["event"]})
+        line = self._encode(fields)
+        for client in list(self._clients):
+            self._offer(client, line)
+
+    def _offer(self, client, line):
+        try:
+            client.queue.put_nowait(line)
+        except asyncio.QueueFull:
+            self._drop(client)
+
+    def _drop(self, client):
+        if client not in self._clients:
+            return
+        self._clients.discard(client)
+        self.dropped += 1
+        self.metrics.inc("status_clients_dropped_total")
+        log.warning(f"⚠ Disconnected status subscriber {client.peer}: more than {self.buffer} events behind",
+                    event="status_client_dropped", peer=str(client.peer))
+        client.writer.transport.abort()
@@ -0,0 +1,275 @@
+"""Compact binary record/replay of game-state traces
+
+File layout (little-endian):
+    header   b"GTAT", version (B), field count (B), wall-clock start (d)
+    fields   per field: name length (B), name, address (Q), format length (B), struct format
+    records  fixed width: microseconds since the previous record (I) + one value per field
+
+Records are append-only and fixed width, so a trace can be memory-mapped and
+decoded with struct.iter_unpack without parsing. By default only snapshots
+whose values changed are written, which keeps hours of play to a few hundred KB.
+
+    python -m traces info session.gtat
+"""
+import argparse
+import math
+import mmap
+import struct
+import sys
+import time
+from itertools import accumulate
+
+from memory_source import WatchedField, FakeMemorySource, make_snapshot_type
+
+
+MAGIC = b"GTAT"
+VERSION = 1
+_HEADER = struct.Struct("<4sBBd")
+_MAX_DELTA = 0xFFFFFFFF  # ~71 minutes in microseconds
+
+
+def record_struct(fields):
+    return struct.Struct("<I" + "".join(field.fmt.lstrip("<") for field in fields))
+
+
+class TraceWriter:
+    """Appends timestamped snapshots of the watched fields to a trace file"""
+
+    def __init__(self, path, fields, changes_only=True, start_time=None):
+        self.path = path
+        self.fields = tuple(fields)
+        self.changes_only = changes_only
+        self.names = tuple(field.name for field in self.fields)
+        self._record = record_struct(self.fields)
+        self._last_time = None
+        self._last_values = None
+        self.records = 0
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, len(self.fields),
+                                      time.time() if start_time is None else start_time))
+        for field in self.fields:
+            name = field.name.encode()
+            fmt = field.fmt.lstrip("<").encode()
+            self._file.write(struct.pack("<B", len(name)) + name + struct.pack("<QB", field.address, len(fmt)) + fmt)
+
+    def record(self, snapshot):
+        """Append a snapshot (anything with .timestamp and one attribute per field)"""
+        values = tuple(getattr(snapshot, name) for name in self.names)
+        if self.changes_only and values == self._last_values:
+            return
+        self.write(snapshot.timestamp, values)
+
+    def write(self, timestamp, values):
+        """Append raw values at a monotonic timestamp (seconds)"""
+        if self._last_time is None:
+            delta = 0
+        else:
+            delta = max(0, int(round((timestamp - self._last_time) * 1e6)))
+            # Gaps longer than the delta field repeat the previous values as filler records
+            while delta > _MAX_DELTA:
+                self._file.write(self._record.pack(_MAX_DELTA, *self._last_values))
+                self.records += 1
+                delta -= _MAX_DELTA
+        self._file.write(self._record.pack(delta, *values))
+        self.records += 1
+        self._last_time = timestamp
+        self._last_values = values
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TraceReader:
+    """Memory-mapped reader for trace files"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        size = self._file.seek(0, 2)
+        if size < _HEADER.size:
+            raise ValueError(f"{path} is not a trace file (too short)")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, self.start_time = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a trace file")
+        if version != VERSION:
+            raise ValueError(f"{path} has unsupported trace version {version}")
+
+        offset = _HEADER.size
+        fields = []
+        for _ in range(count):
+            name_length = self._map[offset]
+            name = self._map[offset + 1:offset + 1 + name_length].decode()
+            offset += 1 + name_length
+            address, fmt_length = struct.unpack_from("<QB", self._map, offset)
+            offset += 9
+            fmt = self._map[offset:offset + fmt_length].decode()
+            offset += fmt_length
+            fields.append(WatchedField(name, address, fmt))
+        self.fields = tuple(fields)
+        self.names = tuple(field.name for field in self.fields)
+        self._record = record_struct(self.fields)
+        self._offset = offset
+        # A crash mid-write can leave a partial record at the end; ignore it
+        self.count = (size - offset) // self._record.size
+
+    def __len__(self):
+        return self.count
+
+    def iter_raw(self):
+        """(delta_us, value, ...) tuples straight from the mapped file"""
+        end = self._offset + self.count * self._record.size
+        return self._record.iter_unpack(memoryview(self._map)[self._offset:end])
+
+    def timestamps(self):
+        """Seconds since the first record, one per record"""
+        return (delta / 1e6 for delta in accumulate(record[0] for record in self.iter_raw()))
+
+    def iter_records(self):
+        """(seconds since first record, values tuple) for every record"""
+        elapsed = 0
+        for record in self.iter_raw():
+            elapsed += record[0]
+            yield elapsed / 1e6, record[1:]
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TraceClock:
+    """clock() for replay: the recorded time of the record being replayed"""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def replay(reader, monitor):
+    """Feed every record through monitor.process_snapshot() as fast as possible; returns the record count
+
+    The poll scheduler and the dispatcher (which must not be started) run on
+    the trace's clock, so hysteresis and skip debouncing see the pace of the
+    original run: before each record the dispatcher sends what fell due in the
+    gap, at the time it fell due. Commands go to monitor.dispatcher.controller;
+    swap in a recorder to see what the run would have sent. The rate limiter
+    runs on the wall clock and is left out.
+    """
+    clock = TraceClock()
+    dispatcher = monitor.dispatcher
+    monitor.scheduler.clock = dispatcher.clock = dispatcher.skips.clock = clock
+    dispatcher.limiter = None
+    snapshot_type = make_snapshot_type(reader.fields)
+    names = reader.names
+    count = 0
+    for at, values in reader.iter_records():
+        _catch_up(dispatcher, clock, at)
+        snapshot = snapshot_type()
+        snapshot.timestamp = at
+        for name, value in zip(names, values):
+            setattr(snapshot, name, value)
+        monitor.process_snapshot(snapshot)
+        count += 1
+    _catch_up(dispatcher, clock, math.inf)
+    return count
+
+
+def _catch_up(dispatcher, clock, until):
+    """Run the dispatcher's work due before `until`, moving the clock to each due time"""
+    wait = dispatcher.run_pending()
+    while wait is not None and clock.now + wait <= until:
+        clock.now += wait
+        wait = dispatcher.run_pending()
+    if math.isfinite(until):
+        clock.now = until
+
+
+class TraceMemorySource(FakeMemorySource):
+    """Replays a trace through the monitor in (scaled) real time
+
+    speed=1.0 replays at the recorded pace, 10.0 ten times faster. For
+    as-fast-as-possible replay use replay() instead: an unbounded speed
+    would apply every record on the first read and only show the last state.
+    """
+
+    def __init__(self, reader, speed=1.0, clock=time.monotonic):
+        if not (math.isfinite(speed) and speed > 0):
+            raise ValueError(f"replay speed must be finite and positive, not {speed!r} (use replay() for "
+                             "as fast as possible)")
+        super().__init__(reader.fields)
+        self.reader = reader
+        self.speed = speed
+        self.clock = clock
+        self.started = None
+        self._records = reader.iter_records()
+        self._pending = None
+        self.finished = False
+
+    def start(self):
+        self.started = self.clock()
+
+    def read_snapshot(self):
+        if self.started is None:
+            self.start()
+        elapsed = (self.clock() - self.started) * self.speed
+        while True:
+            if self._pending is None:
+                self._pending = next(self._records, None)
+                if self._pending is None:
+                    self.finished = True
+                    break
+            at, values = self._pending
+            if at > elapsed:
+                break
+            for name, value in zip(self.reader.names, values):
+                self.set(name, value)
+            self._pending = None
+        return super().read_snapshot()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect GTA SA game-state traces")
+    parser.add_argument("command", choices=("info", "dump"))
+    parser.add_argument("path")
+    parser.add_argument("--limit", type=int, default=50, help="records to print with dump")
+    args = parser.parse_args()
+
+    with TraceReader(args.path) as reader:
+        if args.command == "info":
+            duration = 0.0
+            for duration in reader.timestamps():
+                pass
+            print(f"{args.path}: {len(reader)} records, {duration:.1f} s, "
+                  f"started {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(reader.start_time))}")
+            for field in reader.fields:
+                print(f"  {field.name} @ {field.address:#x} ({field.fmt.lstrip('<')})")
+        else:
+            print("seconds," + ",".join(reader.names))
+            for index, (at, values) in enumerate(reader.iter_records()):
+                if index >= args.limit:
+                    break
+                print(f"{at:.6f}," + ",".join(str(value) for value in values))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())